@@ -0,0 +1,303 @@
+#The Sign Language Synthesis and Interaction Research Tools
+#    Copyright (C) 2014  Fabrizio Nunnari, Alexis Heloir, DFKI
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#
+# A single timed loop driving all the real-time input devices (Leap, FaceShift, head tracking, ...).
+# Instead of each modal operator registering its own TIMER, the devices register a poll and an update function here.
+# At each tick, only the devices having new data are updated, and the scene is updated and redrawn once.
+# The tick rate adapts between MIN_RATE and MAX_RATE according to how often new data arrives and to the time spent in the updates.
+#
+
+import bpy
+
+import time
+import select
+import traceback
+
+
+# Tick rate limits, in Hz
+MIN_RATE = 30.0
+MAX_RATE = 120.0
+
+# The rate is multiplied or divided by this factor at each adaptation
+RATE_FACTOR = 2.0
+
+# Number of ticks after which the rate is adapted
+ADAPTATION_TICKS = 30
+
+# If the device updates take more than this fraction of the tick period, the rate is decreased
+LOAD_HIGH = 0.5
+# The rate can be increased only if the device updates take less than this fraction of the tick period
+LOAD_LOW = 0.2
+
+# Fraction of the ticks bringing new data over which the rate is increased (we are probably missing data)
+HIT_HIGH = 0.9
+# Fraction of the ticks bringing new data below which the rate is decreased (we are polling for nothing)
+HIT_LOW = 0.4
+
+# Every how many seconds the time spent in each device is printed. 0 to disable.
+REPORT_PERIOD = 10.0
+
+
+def socketHasData(sock):
+    """Utility poll function for devices receiving from a socket: True if a recv() would not block."""
+    if(sock == None):
+        return False
+    readable, _, _ = select.select([sock], [], [], 0)
+    return len(readable) > 0
+
+
+class DeviceHandler:
+    """A device registered in the DeviceScheduler, with its timing statistics."""
+
+    def __init__(self, name, poll, update):
+        self.name = name
+        # poll() -> bool. Must be cheap: it is called at every tick.
+        self.poll = poll
+        # update(context) -> bool. Applies the new data. Returns True if the scene must be updated.
+        self.update = update
+
+        # Set when the scheduler drops the device because poll() or update() raised.
+        # The owner is not updated anymore: its modal() must check this flag and cancel itself.
+        self.failed = False
+
+        # Statistics
+        self.updates = 0
+        self.last_update_time = 0.0     # Time (s) spent in update() in the last tick it was called
+        self.total_update_time = 0.0
+        self.max_update_time = 0.0
+
+    def resetStats(self):
+        self.updates = 0
+        self.total_update_time = 0.0
+        self.max_update_time = 0.0
+
+    def statsString(self):
+        avg = 0.0
+        if(self.updates > 0):
+            avg = self.total_update_time / self.updates
+        return "%s: updates=%d avg=%.2fms max=%.2fms" % (self.name, self.updates, avg * 1000, self.max_update_time * 1000)
+
+
+class DeviceScheduler:
+    """Class-level singleton holding the registered devices and the shared timer.
+
+    Usage, from the execute() of a modal operator:
+        self.device = DeviceScheduler.addDevice(context, "MyDevice", self.hasNewData, self.updateDevice)
+        ...
+        DeviceScheduler.removeDevice(self.device)
+
+    The modal() of the operators must return {'PASS_THROUGH'} for the TIMER events, otherwise the scheduler loop might not receive them.
+    A device raising an exception is removed and marked as failed (see DeviceHandler.failed): its operator must then cancel itself.
+    """
+
+    s_devices = []
+
+    s_timer = None
+    s_window = None
+    s_loop_running = False
+
+    s_rate = MIN_RATE
+    s_last_tick = 0.0
+
+    # Adaptation window counters
+    s_ticks = 0
+    s_hit_ticks = 0
+    s_busy_time = 0.0
+
+    s_last_report = 0.0
+
+
+    @classmethod
+    def addDevice(cls, context, name, poll, update):
+        """Registers a device and starts the loop if needed. Returns the DeviceHandler to use for removal."""
+        device = DeviceHandler(name, poll, update)
+        cls.s_devices.append(device)
+        if(not cls.s_loop_running):
+            bpy.ops.wm.device_scheduler_loop()
+        return device
+
+    @classmethod
+    def removeDevice(cls, device):
+        """The loop stops by itself at the next tick, when no more devices are registered."""
+        if(device in cls.s_devices):
+            cls.s_devices.remove(device)
+            print("DeviceScheduler " + device.statsString())
+
+    @classmethod
+    def failAllDevices(cls):
+        """Marks all the devices as failed and removes them. Used when the loop itself cannot go on."""
+        for device in list(cls.s_devices):
+            device.failed = True
+            cls.removeDevice(device)
+
+    @classmethod
+    def getRate(cls):
+        return cls.s_rate
+
+    @classmethod
+    def _startTimer(cls, context):
+        cls.s_window = context.window
+        cls.s_timer = context.window_manager.event_timer_add(1.0 / cls.s_rate, cls.s_window)
+
+    @classmethod
+    def _stopTimer(cls, context):
+        if(cls.s_timer != None):
+            context.window_manager.event_timer_remove(cls.s_timer)
+            cls.s_timer = None
+        cls.s_window = None
+
+    @classmethod
+    def _setRate(cls, context, rate):
+        rate = max(MIN_RATE, min(MAX_RATE, rate))
+        if(rate == cls.s_rate):
+            return
+        #print("DeviceScheduler rate " + str(cls.s_rate) + " -> " + str(rate))
+        cls.s_rate = rate
+        # The timer period cannot be changed: replace the timer
+        window = cls.s_window
+        context.window_manager.event_timer_remove(cls.s_timer)
+        cls.s_timer = context.window_manager.event_timer_add(1.0 / rate, window)
+
+    @classmethod
+    def tick(cls, context):
+        now = time.time()
+        period = 1.0 / cls.s_rate
+        # The loop receives also the TIMER events of the other operators. Ignore them if they come too early.
+        if(now - cls.s_last_tick < period * 0.8):
+            return
+        cls.s_last_tick = now
+
+        #
+        # Update only the devices with new data
+        any_data = False
+        scene_changed = False
+        for device in list(cls.s_devices):
+            try:
+                if(not device.poll()):
+                    continue
+                any_data = True
+
+                start = time.time()
+                changed = device.update(context)
+            except Exception:
+                # A failing device must not stop the others: drop it, and keep ticking
+                print("DeviceScheduler: error in device " + device.name + ". Removing it.")
+                traceback.print_exc()
+                device.failed = True
+                cls.removeDevice(device)
+                continue
+            elapsed = time.time() - start
+
+            device.updates += 1
+            device.last_update_time = elapsed
+            device.total_update_time += elapsed
+            device.max_update_time = max(device.max_update_time, elapsed)
+            cls.s_busy_time += elapsed
+            if(changed):
+                scene_changed = True
+
+        #
+        # A single scene update and redraw for all the devices
+        if(scene_changed):
+            start = time.time()
+            context.scene.update()
+            for area in context.screen.areas:
+                if(area.type == 'VIEW_3D'):
+                    area.tag_redraw()
+            cls.s_busy_time += time.time() - start
+
+        cls.s_ticks += 1
+        if(any_data):
+            cls.s_hit_ticks += 1
+
+        if(cls.s_ticks >= ADAPTATION_TICKS):
+            cls._adaptRate(context, now)
+
+        if(REPORT_PERIOD > 0 and now - cls.s_last_report > REPORT_PERIOD):
+            cls.s_last_report = now
+            print("DeviceScheduler at " + str(cls.s_rate) + "Hz")
+            for device in cls.s_devices:
+                print("  " + device.statsString())
+                device.resetStats()
+
+    @classmethod
+    def _adaptRate(cls, context, now):
+        load = cls.s_busy_time * cls.s_rate / cls.s_ticks
+        hits = cls.s_hit_ticks / cls.s_ticks
+
+        if(load > LOAD_HIGH or hits < HIT_LOW):
+            cls._setRate(context, cls.s_rate / RATE_FACTOR)
+        elif(hits > HIT_HIGH and load < LOAD_LOW):
+            cls._setRate(context, cls.s_rate * RATE_FACTOR)
+
+        cls.s_ticks = 0
+        cls.s_hit_ticks = 0
+        cls.s_busy_time = 0.0
+
+
+#
+# OPERATOR: the loop receiving the TIMER events
+#
+
+class DeviceSchedulerLoop(bpy.types.Operator):
+    """Runs the DeviceScheduler ticks as long as some device is registered. Started automatically by DeviceScheduler.addDevice()."""
+
+    bl_idname = "wm.device_scheduler_loop"
+    bl_label = "Device Scheduler Loop"
+    bl_description = "Shared timer updating the registered input devices"
+
+    def execute(self, context):
+        if(DeviceScheduler.s_loop_running):
+            return {'CANCELLED'}
+
+        DeviceScheduler.s_loop_running = True
+        DeviceScheduler._startTimer(context)
+        context.window_manager.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if(event.type != 'TIMER'):
+            return {'PASS_THROUGH'}
+
+        if(len(DeviceScheduler.s_devices) == 0):
+            print("DeviceScheduler loop finished")
+            DeviceScheduler._stopTimer(context)
+            DeviceScheduler.s_loop_running = False
+            return {'FINISHED'}
+
+        try:
+            DeviceScheduler.tick(context)
+        except Exception:
+            # Blender would drop this handler without calling cancel(): release the loop, so that addDevice() can restart it
+            print("DeviceScheduler loop aborted")
+            traceback.print_exc()
+            DeviceScheduler.failAllDevices()
+            self.cancel(context)
+            return {'CANCELLED'}
+        return {'PASS_THROUGH'}
+
+    def cancel(self, context):
+        DeviceScheduler._stopTimer(context)
+        DeviceScheduler.s_loop_running = False
+        return {'CANCELLED'}
+
+
+def register():
+    bpy.utils.register_class(DeviceSchedulerLoop)
+
+def unregister():
+    bpy.utils.unregister_class(DeviceSchedulerLoop)
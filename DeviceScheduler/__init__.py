@@ -0,0 +1,34 @@
+bl_info = {
+    "name": "Device Scheduler",
+    "description": "A single adaptive timer driving all the real-time input devices.",
+    "author": "Fabrizio Nunnari",
+    "version": (1, 0),
+    "blender": (2, 69, 0),
+    "location": "",
+    "warning": "",
+    "wiki_url": "",
+    "tracker_url": "",
+    "category": "System"}
+
+
+from . import DeviceScheduler
+
+import bpy
+
+
+def register():
+    print("Registering DeviceScheduler...", end="")
+    DeviceScheduler.register()
+
+    print("ok")
+
+
+def unregister():
+    print("Unregistering DeviceScheduler...", end="")
+    DeviceScheduler.unregister()
+
+    print("ok")
+
+
+if __name__ == "__main__":
+    register()
@@ -39,23 +39,38 @@ from bpy.props import * # for properties
 import time
 import socket
 import math
-import struct
 
 # This is Blender specific
 import mathutils
 
+# NumPy is optional: without it, the channel mappings are applied as sparse dot products.
+try:
+    import numpy
+    USE_NUMPY = True
+except ImportError:
+    USE_NUMPY = False
+
 
 from MakeHumanTools import BoneSet
 
+from DeviceScheduler.DeviceScheduler import DeviceScheduler
+from DeviceScheduler.DeviceScheduler import socketHasData
+
+# The decoder does not import bpy, so that it can be tested standalone
+from FaceShift2Blender.FaceShiftDecoder import FaceShiftDecoder
+from FaceShift2Blender.FaceShiftDecoder import is_tracking_state
+from FaceShift2Blender.FaceShiftDecoder import MAX_PACKET_SIZE
+
 
 LISTENING_PORT = 33433
 #BINDING_ADDR = "127.0.0.1"     # Good for local work
 BINDING_ADDR = ''   # Empty string means: bind to all network interfaces
 
-BLOCK_ID_TRACKING_STATE = 33433     # According to faceshift docs
+# Decodes the packets into the same preallocated frame
+FACESHIFT_DECODER = FaceShiftDecoder()
 
-# Delay between modal timed updates when entered the modal command mode. In seconds.
-UPDATE_DELAY = 0.04
+# Max number of datagrams read at each update. Bounds the update time if FaceShift sends faster than we can read.
+MAX_DRAINED_PACKETS = 1000
 
 
     
@@ -271,64 +286,79 @@ FS_TO_MH_FACECONTROLLERS_TRANSLATION_FS2014_1 = {
 FS_TO_MH_FACECONTROLLERS_TRANSLATION = FS_TO_MH_FACECONTROLLERS_TRANSLATION_FS2014_1
 
 
+# The jaw side channels rotate the jaw bone around Z (degrees at full channel value), instead of moving the face controllers.
+FS_TO_MH_JAW_ROTATION_Z = {
+    "JawLeft"       : 8     # 5 degrees is the max side jaw extension
+    ,"JawRight"     : -8
+}
 
-# This applies the FaceShift channel values to the Fce control rig using the manually calibrated mapping matrix
-def Face2Rig(target_object, bs_names, bs_vals):
 
-    # Prepare the accumulation vector: a list of 20 3D vectors
-    n_of_displacements = len(BoneSet.MH_FACIAL_CONTROLLERS)
-    #print("this should be 25: " + str(n_of_displacements) )
-    
-    # The starting value is a 0-vector that will be summed with values from the mapping
-    displacements = [ mathutils.Vector((0,0,0)) for i in range(n_of_displacements) ]
-    #print("also this should be 20: " + str(len(displacements)) )
-    
-    jaw_rot_z = 0   # degrees
-    
-    # For each channel (bs_name), look-up the mapping vector in the dictionary and add to the accumulator.
-    for bs_name, bs_val in zip(bs_names, bs_vals):
-        
-        # Quick skip if the faceshift blendshape is not having influence
-        # No. If it is at 0, it means that we want to put the value of the blandshapes back to 0.
-        #if(bs_val == 0):
-        #    continue
-
-        #        
-        # Special case for Jaw bone rotation
-        if(bs_name == "JawLeft"):
-            jaw_rot_z += bs_val * 8    # 5 degrees is the max side jaw extension
-            continue
-        elif(bs_name == "JawRight"):
-            jaw_rot_z += bs_val * (-8)    # 5 degrees is the max side jaw extension
-            continue
-        
-        if(not bs_name in FS_TO_MH_FACECONTROLLERS_TRANSLATION):
-            #print("No mapping for " + bs_name)
-            continue
-        
+class ChannelMapping:
+    """A mapping from the FaceShift channel values to the values of a set of rig controllers, compiled once into a dense matrix.
+    Row i holds the rig values at full value of the channel bs_names[i]: the flattened triplets of the controllers,
+    followed by the extra values (e.g., the jaw rotation). A packet is then mapped with a single matrix-vector product.
+    """
 
-        # Take the list of displacement triplets for this blend shape. Remember that the list is composed of 3-sized sequences, not vectors.
-        bs_disps = FS_TO_MH_FACECONTROLLERS_TRANSLATION[bs_name]
-        #print("++This should be 20: " + str(len(bs_disps)))
+    def __init__(self, bs_names, triplets_mapping, n_controllers, extra_mapping=None):
+        """triplets_mapping: dictionary from channel name to the list of n_controllers triplets, as FS_TO_MH_FACECONTROLLERS_TRANSLATION.
+        extra_mapping: dictionary from channel name to an extra value. A channel in it is not looked up in triplets_mapping.
+        """
+        if(extra_mapping == None):
+            extra_mapping = {}
 
-        #print(" =========== For "+bs_name+" at "+str(bs_val))
-        
-        # Accumulate
-        #displacements_avg_counters = [ 0 for i in range(len(displacements)) ] # will keep the counter for the average calculator
-        for tot_bs_disp, bs_disp in zip(displacements, bs_disps):
-            #print("Adding " + str(bs_disp) + " to " + str(tot_bs_disp))
+        self.bs_names = list(bs_names)
+        self.n_controllers = n_controllers
+        self.n_values = n_controllers * 3 + (1 if len(extra_mapping) > 0 else 0)
+
+        rows = []
+        for bs_name in self.bs_names:
+            row = [0.0] * self.n_values
+            if(bs_name in extra_mapping):
+                row[n_controllers * 3] = float(extra_mapping[bs_name])
+            elif(bs_name in triplets_mapping):
+                triplets = triplets_mapping[bs_name]
+                assert len(triplets) == n_controllers
+                for i, triplet in enumerate(triplets):
+                    row[i*3:i*3+3] = triplet
+            rows.append(row)
+
+        if(USE_NUMPY):
+            self.matrix = numpy.array(rows, dtype=numpy.float64).reshape(len(rows), self.n_values)
+        else:
+            # Only the non-zero weights of each rig value, as (channel index, weight) pairs
+            self.columns = [[(i, row[j]) for i, row in enumerate(rows) if row[j] != 0.0] for j in range(self.n_values)]
+
+    def apply(self, bs_vals):
+        """Returns the flat list of rig values for the given channel values, in the order of bs_names.
+        Missing values, at the end of bs_vals, are considered 0."""
+        n_channels = len(self.bs_names)
+        if(len(bs_vals) != n_channels):
+            bs_vals = (list(bs_vals) + [0.0] * n_channels)[:n_channels]
 
-            # Modulate according to blend shape value 
-            rig_displacement_vect = mathutils.Vector(bs_disp) * bs_val
+        if(USE_NUMPY):
+            return numpy.dot(bs_vals, self.matrix).tolist()
 
-            # Add to the total
-            tot_bs_disp += rig_displacement_vect
+        return [sum([bs_vals[i] * weight for i, weight in column]) for column in self.columns]
 
-            #print("For "+bs_name+" at "+str(bs_val))
-            #print("   " + str(rig_displacement_vect) + " --> "  +str (tot_bs_disp) )
 
-    #print("  ==> Total on disp[1] " + str(displacements[1]) )
+# Compiled mappings, for the names of the channels currently received
+FACE_MAPPING = ChannelMapping(BLEND_SHAPE_NAMES, FS_TO_MH_FACECONTROLLERS_TRANSLATION, len(BoneSet.MH_FACIAL_CONTROLLERS), FS_TO_MH_JAW_ROTATION_Z)
+EYELIDS_MAPPING = ChannelMapping(BLEND_SHAPE_NAMES, FS_TO_MH_EYELIDS_ROTATION_FS2014_1, len(BoneSet.MH_EYELID_CONTROLLERS))
+
+
+
+# This applies the FaceShift channel values to the Fce control rig using the manually calibrated mapping matrix
+def Face2Rig(target_object, bs_names, bs_vals):
+    global FACE_MAPPING
+
+    # The mapping is compiled for the channel names. Recompile only if they change.
+    if(FACE_MAPPING.bs_names != bs_names):
+        FACE_MAPPING = ChannelMapping(bs_names, FS_TO_MH_FACECONTROLLERS_TRANSLATION, len(BoneSet.MH_FACIAL_CONTROLLERS), FS_TO_MH_JAW_ROTATION_Z)
 
+    # All the displacements (3 values per controller), followed by the jaw rotation (degrees), in one product.
+    # Also the channels at 0 count: they put the value of the blendshapes back to 0.
+    rig_values = FACE_MAPPING.apply(bs_vals)
+    jaw_rot_z = rig_values[-1]
 
     # Take reference to the rig bones...
     bones = bpy.data.objects[target_object].pose.bones
@@ -337,61 +367,32 @@ def Face2Rig(target_object, bs_names, bs_vals):
     bones[BoneSet.MH_CONTROLLER_JAW].rotation_mode = 'XYZ'
     bones[BoneSet.MH_CONTROLLER_JAW].rotation_euler.z = math.radians(jaw_rot_z)
 
-
-    LOG_BASE = 3.5
-
     # ... and copy the displacement vectors in them.
     for i, rig_name in enumerate(BoneSet.MH_FACIAL_CONTROLLERS):
-        #if(displacements[i].length > 0.25):
-        #    print("Saturation for " + rig_name +": "+ str(displacements[i].length))
-        
-        # Set the value        
-        #print("Setting " + rig_name + "("+str(i)+") to "+str(displacements[i]))
-        bones[rig_name].location.xyz = displacements[i]
-        
+        #print("Setting " + rig_name + "("+str(i)+") to "+str(rig_values[i*3:i*3+3]))
+        bones[rig_name].location.xyz = rig_values[i*3:i*3+3]
+
 
 #
 #
 #
 def Eyelids2Rig(target_object, bs_names, bs_vals):
-    # Prepare the accumulation vector: a list of 4 3D vectors (each is a XYZ rotation)
-    n_of_controllers = len(BoneSet.MH_EYELID_CONTROLLERS)
-    
-    # The starting value is a 0-vector that will be summed with values from the mapping
-    displacements = [ mathutils.Vector((0,0,0)) for i in range(n_of_controllers) ]
-
-    # For each channel (bs_name), look-up the mapping vector in the dictionary and add to the accumulator.
-    for bs_name, bs_val in zip(bs_names, bs_vals):
-
-        if(not bs_name in FS_TO_MH_EYELIDS_ROTATION_FS2014_1):
-            continue
-
-        #print("Eyelids2Rig: computing rotation for blendshape "+bs_name+ "\t"+str(bs_val))
-
-        # Take the list of displacement triplets for this blend shape. Remember that the list is composed of 3-sized sequences, not vectors.
-        bs_disps = FS_TO_MH_EYELIDS_ROTATION_FS2014_1[bs_name]
-        #print("++This should be 20: " + str(len(bs_disps)))
+    global EYELIDS_MAPPING
 
-        #print(" =========== For "+bs_name+" at "+str(bs_val))
-        
-        # Accumulate
-        for tot_bs_disp, bs_disp in zip(displacements, bs_disps):
-            #print("Adding " + str(bs_disp) + " to " + str(tot_bs_disp))
-
-            # Modulate according to blend shape value 
-            rig_displacement_vect = mathutils.Vector(bs_disp) * bs_val
+    if(EYELIDS_MAPPING.bs_names != bs_names):
+        EYELIDS_MAPPING = ChannelMapping(bs_names, FS_TO_MH_EYELIDS_ROTATION_FS2014_1, len(BoneSet.MH_EYELID_CONTROLLERS))
 
-            # Add to the total
-            tot_bs_disp += rig_displacement_vect
+    # The XYZ rotation of each controller
+    rotations = EYELIDS_MAPPING.apply(bs_vals)
 
     # Take reference to the rig bones...
     bones = bpy.data.objects[target_object].pose.bones
 
-    # ... and copy the displacement vectors in them.
+    # ... and copy the rotations in them.
     for i, rig_name in enumerate(BoneSet.MH_EYELID_CONTROLLERS):
-        #print(rig_name+"\t"+str(displacements[i]))
+        #print(rig_name+"\t"+str(rotations[i*3:i*3+3]))
         bones[rig_name].rotation_mode = 'XYZ'
-        bones[rig_name].rotation_euler = displacements[i]
+        bones[rig_name].rotation_euler = rotations[i*3:i*3+3]
 
 
 #
@@ -499,99 +500,34 @@ def decode_faceshift_datastream(target_object, data):
     """Takes as input the bytes of a binary DataStream received via network.
     If it is a Tracking State block (ID 33433) then extract some data (info, blendshapes, markers, ...) and applies it to the MakeHuman skeleton.
     """
+    frame = FACESHIFT_DECODER.decode(data)
+    if(frame != None):
+        apply_faceshift_frame(target_object, frame)
 
-    # block_id = struct.unpack_from('H', data)
-    # print("Received block id " + str(block_id)) ;
 
-    offset = 0
-    block_id, version, block_size = struct.unpack_from('HHI', data, offset)
- 
-    #print("ID, v, size = " + str(block_id) + "," + str(version) + "," + str(block_size) )
+def apply_faceshift_frame(target_object, frame):
+    """Applies a FaceShiftDecoder.FaceShiftFrame to the MakeHuman skeleton. Nothing is applied if the tracking is not ok."""
+    if(frame.track_ok != 1):
+        return
 
-    offset += 8
+    #
+    # Handle EYELIDS
+    Eyelids2Rig(target_object, BLEND_SHAPE_NAMES, frame.blend_shape_values)
 
-    if(block_id == BLOCK_ID_TRACKING_STATE):
-        n_blocks, = struct.unpack_from('H', data, offset)
-        #print("n_blocks = " + str(n_blocks))
-        offset += 2
+    #
+    # Handle HEAD ROTATION
+    if(frame.head_rotation != None):
+        HeadRot2Rig(target_object, mathutils.Quaternion(frame.head_rotation))
 
-        track_ok = 0                # Will be a byte: 1 if tracking ok, 0 otherwise.
-        head_rotation_quat = None   # Will be filled with the rotation using mathutils.Quaternion
-        blend_shape_values = []     # Will be a list of float in the range 0-1
-        #eyes_values = None          # Will be a sequence of 4 angle values
-        markers_position = []       # Will be a list of mathutils.Vector
-    
-        curr_block = 0
-        while(curr_block < n_blocks):
-            block_id, version, block_size = struct.unpack_from('HHI', data, offset)
-            #print("ID, v, size = " + str(block_id) + "," + str(version) + "," + str(block_size) )
-        
-            # put the offset at the beginning of the block
-            offset += 8
-        
-            if(block_id == 101):        # Frame Information blobk (timestamp and tracking status)
-                ts, track_ok = struct.unpack_from('dB', data, offset)
-                #print("timestamp, track_ok " + str(ts) + ", " + str(track_ok) )
-                #offset += 9
-            elif(block_id == 102):      # Pose block (head rotation and position)
-                x,y,z,w = struct.unpack_from('ffff', data, offset)
-                head_rotation_quat = mathutils.Quaternion((w,x,y,z))
-            elif(block_id == 103):      # Blendshapes block (blendshape values)
-                n_coefficients, = struct.unpack_from('I', data, offset)
-                #print("Blend shapes count="+ str(n_coefficients) )
-                i = 0
-                #coeff_list = ""
-                while(i < n_coefficients):
-                    # Offset of the block, plus the 4 bytes for int n_coefficients, plus 4 bytes per float
-                    val, = struct.unpack_from('f', data, offset + 4 + (i*4))
-                    blend_shape_values.append(val)
-                    #coeff_list += repr(val) + " "
-                    i += 1
-                #print("Values: " + coeff_list)
-            elif(block_id == 104):     # Eyes block (eyes gaze)
-                leye_theta, leye_phi, reye_theta, reye_phi = struct.unpack_from('ffff', data, offset)
-            elif(block_id == 105):     # Markers block (absolute position of mark points)
-                n_markers, = struct.unpack_from('H', data, offset)
-                #print("n markers="+str(n_markers))
-                i = 0
-                while(i < n_markers):
-                    # Offset of the block, plus the 2 bytes for int n_markers, plus 4 bytes for each x,y,z floats
-                    x, y, z = struct.unpack_from('fff', data, offset + 2 + (i*4*3))
-                    #print("m" + str(i) + " " + str(x) + "\t" + str(y) + "\t" + str(z))
-                    markers_position.append(mathutils.Vector((x,y,z)))
-                    i += 1
-        
-            curr_block += 1
-            offset += block_size
+    #
+    # Handle BLEND SHAPES
+    Face2Rig(target_object, BLEND_SHAPE_NAMES, frame.blend_shape_values)
 
-        # end -- while on blocks. Track State scan complete
-
-        #
-        # Handle EYELIDS
-        if(track_ok==1):
-            Eyelids2Rig(target_object, BLEND_SHAPE_NAMES, blend_shape_values)
-
-
-        #
-        # Handle HEAD ROTATION
-        if(track_ok==1):
-            if(head_rotation_quat!=None):
-                HeadRot2Rig(target_object, head_rotation_quat)
-                pass
-
-        #
-        # Handle BLEND SHAPES
-        #print(str(track_ok) + " - " + str(len(blend_shape_values)))
-        if(track_ok==1):
-            Face2Rig(target_object, BLEND_SHAPE_NAMES, blend_shape_values)
-            pass
-
-        #
-        # Handle BLEND SHAPES
-        #print(str(track_ok) + " - " + str(len(blend_shape_values)))
-        if(track_ok==1):
-            EyesRot2Skeleton(target_object, leye_theta, leye_phi, reye_theta, reye_phi)
-            pass
+    #
+    # Handle EYES
+    if(frame.eyes != None):
+        leye_theta, leye_phi, reye_theta, reye_phi = frame.eyes
+        EyesRot2Skeleton(target_object, leye_theta, leye_phi, reye_theta, reye_phi)
 
 
 
@@ -796,58 +732,98 @@ class FaceShiftModal(bpy.types.Operator):
     bl_idname = "object.faceshift_modal"
     bl_label = "FaceShift Start Net Listener"
     
-    _updating = False
-    
-    
     # The object whose armature is going to be piloted piloting    
     target_object = None
 
-    instantiateTimer = BoolProperty(name="instantiate_timer", default=True, description="Whether this operator must create a timer for continuous updates.")
-
 
     def modal(self, context, event):
         if event.type == 'ESC':
             return self.cancel(context)
 
         if(self.sock == None):
+            self.removeDevice()
             return {'CANCELLED'}
-        
-        if event.type == 'TIMER' and not self._updating:
-            self._updating = True
-            
+
+        # The DeviceScheduler dropped the device after an error in updateFace()
+        if(self._device != None and self._device.failed):
+            self.report({'ERROR'}, "FaceShift stopped by an error")
+            return self.cancel(context)
+
+        # TIMER events are passed through to the DeviceScheduler, which calls updateFace()
+        return {'PASS_THROUGH'}
+        #return {'RUNNING_MODAL'}
+
+
+    def hasNewData(self):
+        return socketHasData(self.sock)
+
+
+    def receiveLatest(self):
+        """Reads all the pending datagrams without blocking, each with recv_into() in a preallocated buffer.
+        Returns the size of the newest Tracking State packet, left in self.latest_buffer, or 0 if none was received.
+        The older packets are coalesced: counted, but never decoded."""
+        latest_size = 0
+        for _ in range(MAX_DRAINED_PACKETS):
             try:
-                msg = self.sock.recv(4096)
-                #print("Received : " + str(msg))
-                decode_faceshift_datastream(self.target_object, msg)
+                n_bytes = self.sock.recv_into(self.recv_buffer)
+            except BlockingIOError:
+                break   # Drained
 
-                #
-                # Handle RECORDING
-                #
-                
-                # Recording logic:
-                # if the section is None, the space is pausing and resuming the recording from the current frame
-                # If a section is selected, resuming the recording restart from the beginning of the section, up to a maximum time.
-                if(context.scene.tool_settings.use_keyframe_insert_auto):
-                    
-                    #print(str(self.update_count) + ":\t" + str(self.frame_record_start) + "\t--> " + str(frame))
-                    insert_mh_keyframe(self.target_object, bpy.context.scene.frame_current)
-
-            except socket.timeout as to_msg:
-                #print("We know it: " + str(to_msg))
-                pass    # We know. Can happen very often
-            except OSError as msg:
-                # Note that we can enter this section also because we explicitly closed
-                # the socket to interrupt receiving messages (see the terminate method)
-                print("FaceShift thread, recv Exception: "+ str(msg))
+            self.received_packets += 1
+            if(is_tracking_state(self.recv_buffer, n_bytes)):
+                # Swap the buffers: the newest packet is kept, the next one is received in the other buffer
+                self.latest_buffer, self.recv_buffer = self.recv_buffer, self.latest_buffer
+                latest_size = n_bytes
+
+        return latest_size
+
+
+    def updateFace(self, context):
+        """Called by the DeviceScheduler when a FaceShift packet is available. Returns True if the rig changed."""
+        try:
+            n_bytes = self.receiveLatest()
+            if(n_bytes == 0):
+                return False
+
+            frame = FACESHIFT_DECODER.decode(self.latest_buffer, n_bytes)
+            if(frame == None):
+                # Only the first malformed packet is printed. The others are counted, and reported by cancel().
+                if(FACESHIFT_DECODER.malformed_packets == 1 and not self.malformed_reported):
+                    print(FACESHIFT_DECODER.last_error + ". Further malformed packets will be counted only.")
+                    self.malformed_reported = True
+                return False
+            self.applied_packets += 1
+            apply_faceshift_frame(self.target_object, frame)
+
+            #
+            # Handle RECORDING
+            #
+            
+            # Recording logic:
+            # if the section is None, the space is pausing and resuming the recording from the current frame
+            # If a section is selected, resuming the recording restart from the beginning of the section, up to a maximum time.
+            if(context.scene.tool_settings.use_keyframe_insert_auto):
                 
-                if(self.sock != None):
-                    self.sock.close()
-                    self.sock = None
+                #print(str(self.update_count) + ":\t" + str(self.frame_record_start) + "\t--> " + str(frame))
+                insert_mh_keyframe(self.target_object, bpy.context.scene.frame_current)
+
+        except OSError as msg:
+            # Note that we can enter this section also because we explicitly closed
+            # the socket to interrupt receiving messages (see the terminate method)
+            print("FaceShift thread, recv Exception: "+ str(msg))
             
-            self._updating = False
-        
-        return {'PASS_THROUGH'}
-        #return {'RUNNING_MODAL'}
+            if(self.sock != None):
+                self.sock.close()
+                self.sock = None
+            return False
+
+        return True
+
+
+    def removeDevice(self):
+        if(self._device != None):
+            DeviceScheduler.removeDevice(self._device)
+            self._device = None
 
 
     def execute(self, context):
@@ -861,13 +837,14 @@ class FaceShiftModal(bpy.types.Operator):
             
         self.target_object = armature.name
         print("Running FaceShift receiver on object '" + str(self.target_object) + "'")
+
+        # The decoder is shared: count the malformed packets of this session only
+        FACESHIFT_DECODER.malformed_packets = 0
+        FACESHIFT_DECODER.last_error = None
         
         self.report({'INFO'}, "FaceShift starting")
         
         context.window_manager.modal_handler_add(self)
-        
-        if(self.instantiateTimer):
-            self._timer = context.window_manager.event_timer_add(UPDATE_DELAY, context.window)
 
         # If recording is enabled, it will start from this frame
         #print("SECT="+context.scene.faceshift_record_section)
@@ -883,10 +860,8 @@ class FaceShiftModal(bpy.types.Operator):
             print("Creating socket...")
             # The socket listening to incoming data. Its status will be always synchronized with the singleton attribute:
             self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            #self.sock.setblocking(False)
-            self.sock.settimeout(0.1)
-            #self.sock.setsockopt(level, optname, value)
-            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1500)    # No buffer. We take the latest, if present, or nothing.
+            # Never wait for data: at each update all the pending packets are read, and only the latest is applied (see receiveLatest()).
+            self.sock.setblocking(False)
             print("Binding...")
             self.sock.bind((BINDING_ADDR, LISTENING_PORT))
             print("Bound.")
@@ -898,15 +873,22 @@ class FaceShiftModal(bpy.types.Operator):
             if(self.sock != None):
                 self.sock.close()
                 self.sock = None
+
+        if(self.sock != None):
+            # The socket is polled by the shared DeviceScheduler timer
+            self._device = DeviceScheduler.addDevice(context, "FaceShift", self.hasNewData, self.updateFace)
             
         return {'RUNNING_MODAL'}
 
 
     def cancel(self, context):
-        if(self._timer != None):
-            context.window_manager.event_timer_remove(self._timer)
-        self.timer = None
-        
+        self.removeDevice()
+
+        print("FaceShift received " + str(self.received_packets) + " packets, applied " + str(self.applied_packets)
+              + " (" + str(self.received_packets - self.applied_packets) + " coalesced or malformed)")
+        if(FACESHIFT_DECODER.malformed_packets > 0):
+            print("FaceShift malformed packets: " + str(FACESHIFT_DECODER.malformed_packets) + " (last: " + FACESHIFT_DECODER.last_error + ")")
+
         print("FaceShift modal command, closing socket...")
         if(self.sock != None):
             self.sock.close()
@@ -919,7 +901,15 @@ class FaceShiftModal(bpy.types.Operator):
     
     
     def __init__(self):
-        self._timer = None
+        self._device = None
+        self.sock = None
+        # Two preallocated receive buffers, swapped to keep the latest Tracking State packet
+        self.recv_buffer = bytearray(MAX_PACKET_SIZE)
+        self.latest_buffer = bytearray(MAX_PACKET_SIZE)
+        # Statistics
+        self.received_packets = 0
+        self.applied_packets = 0
+        self.malformed_reported = False
 
     
     def __del__(self):
@@ -929,11 +919,10 @@ class FaceShiftModal(bpy.types.Operator):
                 self.sock.close()
                 self.sock = None
 
-        if(hasattr(self, '_timer')):
-            if(self._timer != None):
-                print("Removing surviving timer")
-                bpy.context.window_manager.event_timer_remove(self._timer)
-                self._timer = None
+        if(hasattr(self, '_device')):
+            if(self._device != None):
+                print("Removing surviving device")
+                self.removeDevice()
 
 
 
@@ -0,0 +1,230 @@
+#     "FaceShift 2 Blender" is a Blender addon to apply FaceShift stream data to a MakeHuman character face.
+#     Copyright (C) <2014>  <Fabrizio Nunnari>
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Decoder of the binary DataStream sent by FaceShift Studio via network.
+It does not depend on Blender, so that it can be tested and benchmarked standalone:
+    python FaceShiftDecoder.py
+
+Block layout (native byte order, as unpacked so far by FaceShiftControl):
+    block header: id (H), version (H), size in bytes of the block data (I)
+    Tracking State block (id 33433): number of sub-blocks (H), followed by the sub-blocks, each with its block header:
+        101 Frame Information: timestamp (d), tracking ok (B)
+        102 Pose: head rotation quaternion x, y, z, w (4f)
+        103 Blendshapes: n (I), n coefficients (nf)
+        104 Eyes: left eye theta, left eye phi, right eye theta, right eye phi (4f, degrees)
+        105 Markers: n (H), n positions x, y, z (3nf)
+"""
+
+import struct
+import array
+import time
+
+
+BLOCK_ID_TRACKING_STATE = 33433     # According to faceshift docs
+
+BLOCK_ID_FRAME_INFO = 101
+BLOCK_ID_POSE = 102
+BLOCK_ID_BLENDSHAPES = 103
+BLOCK_ID_EYES = 104
+BLOCK_ID_MARKERS = 105
+
+BLOCK_HEADER_STRUCT = struct.Struct('HHI')
+N_BLOCKS_STRUCT = struct.Struct('H')
+FRAME_INFO_STRUCT = struct.Struct('dB')
+POSE_STRUCT = struct.Struct('ffff')
+N_COEFFICIENTS_STRUCT = struct.Struct('I')
+EYES_STRUCT = struct.Struct('ffff')
+N_MARKERS_STRUCT = struct.Struct('H')
+
+FLOAT_SIZE = array.array('f').itemsize
+
+# Minimum size of the data of each known block, for the checks against malformed packets
+FIXED_BLOCK_SIZES = {
+    BLOCK_ID_FRAME_INFO: FRAME_INFO_STRUCT.size,
+    BLOCK_ID_POSE: POSE_STRUCT.size,
+    BLOCK_ID_BLENDSHAPES: N_COEFFICIENTS_STRUCT.size,
+    BLOCK_ID_EYES: EYES_STRUCT.size,
+    BLOCK_ID_MARKERS: N_MARKERS_STRUCT.size,
+}
+
+# Large enough for any datagram
+MAX_PACKET_SIZE = 65536
+
+
+def is_tracking_state(data, n_bytes):
+    """True if the packet in the first n_bytes of data is a Tracking State block. Only its header is read."""
+    if(n_bytes < BLOCK_HEADER_STRUCT.size):
+        return False
+    block_id, version, block_size = BLOCK_HEADER_STRUCT.unpack_from(data, 0)
+    return block_id == BLOCK_ID_TRACKING_STATE
+
+
+class FaceShiftFrame:
+    """The data of a Tracking State block. The same object is filled by each decode() of a FaceShiftDecoder.
+    The blendshape values and the marker positions are stored in arrays of floats, reused among frames."""
+
+    __slots__ = ("timestamp", "track_ok", "head_rotation", "blend_shape_values", "eyes", "markers")
+
+    def __init__(self):
+        self.timestamp = 0.0
+        self.track_ok = 0               # 1 if tracking ok, 0 otherwise.
+        self.head_rotation = None       # The (w, x, y, z) rotation quaternion, if received
+        self.eyes = None                # (left theta, left phi, right theta, right phi), if received
+        self.blend_shape_values = array.array('f')
+        # Flat x, y, z coordinates of all the markers
+        self.markers = array.array('f')
+
+    def n_markers(self):
+        return len(self.markers) // 3
+
+    def marker(self, i):
+        """The (x, y, z) position of the i-th marker."""
+        return tuple(self.markers[i*3:i*3+3])
+
+
+def copy_floats(dst, data, offset, n):
+    """Copies n floats from data at offset into the array dst. If dst has already n values, they are overwritten without reallocation."""
+    src = data[offset:offset + n * FLOAT_SIZE]
+    if(len(dst) == n):
+        memoryview(dst).cast('B')[:] = src
+    else:
+        del dst[:]
+        dst.frombytes(src)
+
+
+class FaceShiftDecoder:
+    """Decodes the packets into a preallocated FaceShiftFrame.
+
+    Usage:
+        decoder = FaceShiftDecoder()
+        frame = decoder.decode(packet_bytes)
+        if(frame != None):
+            ... use frame, until the next decode()
+
+    Truncated or malformed packets are not reported at each decode(), since they would arrive at the network rate.
+    They are counted in malformed_packets, and the reason of the last one is kept in last_error.
+    """
+
+    def __init__(self):
+        self.frame = FaceShiftFrame()
+        self.malformed_packets = 0
+        self.last_error = None
+
+    def malformed(self, reason):
+        """Counts a rejected packet. Returns None, for decode() to return it."""
+        self.malformed_packets += 1
+        self.last_error = reason
+        return None
+
+    def decode(self, data, n_bytes=None):
+        """Decodes the packet in the first n_bytes of data (all of it, if None), e.g., a buffer filled by socket.recv_into().
+        Returns the frame if it is a valid Tracking State block, otherwise None (also for truncated or malformed packets). The returned frame is overwritten by the next call."""
+        data = memoryview(data)
+        if(n_bytes != None):
+            data = data[:n_bytes]
+        n_bytes = len(data)
+
+        if(n_bytes < BLOCK_HEADER_STRUCT.size):
+            return None
+        block_id, version, block_size = BLOCK_HEADER_STRUCT.unpack_from(data, 0)
+        if(block_id != BLOCK_ID_TRACKING_STATE):
+            return None
+
+        offset = BLOCK_HEADER_STRUCT.size
+        if(n_bytes < offset + N_BLOCKS_STRUCT.size):
+            return self.malformed("Truncated FaceShift packet (" + str(n_bytes) + " bytes)")
+        n_blocks, = N_BLOCKS_STRUCT.unpack_from(data, offset)
+        offset += N_BLOCKS_STRUCT.size
+
+        frame = self.frame
+        frame.timestamp = 0.0
+        frame.track_ok = 0
+        frame.head_rotation = None
+        frame.eyes = None
+        # The arrays are emptied only if their block is missing, so that they can be overwritten in place
+        has_blend_shapes = False
+        has_markers = False
+
+        for _ in range(n_blocks):
+            if(offset + BLOCK_HEADER_STRUCT.size > n_bytes):
+                return self.malformed("Truncated FaceShift packet (" + str(n_bytes) + " bytes)")
+            block_id, version, block_size = BLOCK_HEADER_STRUCT.unpack_from(data, offset)
+            # put the offset at the beginning of the block
+            offset += BLOCK_HEADER_STRUCT.size
+            if(offset + block_size > n_bytes):
+                return self.malformed("Truncated FaceShift packet (" + str(n_bytes) + " bytes)")
+
+            if(block_size < FIXED_BLOCK_SIZES.get(block_id, 0)):
+                return self.malformed("Malformed FaceShift block " + str(block_id) + " (" + str(block_size) + " bytes)")
+
+            if(block_id == BLOCK_ID_FRAME_INFO):
+                frame.timestamp, frame.track_ok = FRAME_INFO_STRUCT.unpack_from(data, offset)
+            elif(block_id == BLOCK_ID_POSE):
+                x, y, z, w = POSE_STRUCT.unpack_from(data, offset)
+                frame.head_rotation = (w, x, y, z)
+            elif(block_id == BLOCK_ID_BLENDSHAPES):
+                n_coefficients, = N_COEFFICIENTS_STRUCT.unpack_from(data, offset)
+                if(N_COEFFICIENTS_STRUCT.size + n_coefficients * FLOAT_SIZE > block_size):
+                    return self.malformed("Malformed FaceShift blendshapes block (" + str(n_coefficients) + " coefficients in " + str(block_size) + " bytes)")
+                copy_floats(frame.blend_shape_values, data, offset + N_COEFFICIENTS_STRUCT.size, n_coefficients)
+                has_blend_shapes = True
+            elif(block_id == BLOCK_ID_EYES):
+                frame.eyes = EYES_STRUCT.unpack_from(data, offset)
+            elif(block_id == BLOCK_ID_MARKERS):
+                n_markers, = N_MARKERS_STRUCT.unpack_from(data, offset)
+                if(N_MARKERS_STRUCT.size + n_markers * 3 * FLOAT_SIZE > block_size):
+                    return self.malformed("Malformed FaceShift markers block (" + str(n_markers) + " markers in " + str(block_size) + " bytes)")
+                copy_floats(frame.markers, data, offset + N_MARKERS_STRUCT.size, n_markers * 3)
+                has_markers = True
+
+            offset += block_size
+
+        if(not has_blend_shapes):
+            del frame.blend_shape_values[:]
+        if(not has_markers):
+            del frame.markers[:]
+
+        return frame
+
+
+def pack_tracking_state(timestamp, track_ok, head_rotation, blend_shape_values, eyes, markers):
+    """Builds a Tracking State packet, as sent by FaceShift Studio. For tests and benchmarks.
+    head_rotation is (w, x, y, z). markers is a sequence of (x, y, z) triplets."""
+    blocks = [
+        (BLOCK_ID_FRAME_INFO, FRAME_INFO_STRUCT.pack(timestamp, track_ok)),
+        (BLOCK_ID_POSE, POSE_STRUCT.pack(head_rotation[1], head_rotation[2], head_rotation[3], head_rotation[0])),
+        (BLOCK_ID_BLENDSHAPES, N_COEFFICIENTS_STRUCT.pack(len(blend_shape_values)) + array.array('f', blend_shape_values).tobytes()),
+        (BLOCK_ID_EYES, EYES_STRUCT.pack(*eyes)),
+        (BLOCK_ID_MARKERS, N_MARKERS_STRUCT.pack(len(markers)) + array.array('f', [c for m in markers for c in m]).tobytes()),
+    ]
+    body = N_BLOCKS_STRUCT.pack(len(blocks))
+    for block_id, block_data in blocks:
+        body += BLOCK_HEADER_STRUCT.pack(block_id, 1, len(block_data)) + block_data
+    return BLOCK_HEADER_STRUCT.pack(BLOCK_ID_TRACKING_STATE, 1, len(body)) + body
+
+
+if __name__ == "__main__":
+    # Decoding time of a packet with 46 blendshapes and 50 markers
+    packet = pack_tracking_state(1.0, 1, (1.0, 0.0, 0.0, 0.0), [i / 46.0 for i in range(46)], (1.0, 2.0, 3.0, 4.0),
+                                 [(i, i + 0.5, i + 0.25) for i in range(50)])
+    decoder = FaceShiftDecoder()
+    n_packets = 100000
+    start = time.time()
+    for _ in range(n_packets):
+        decoder.decode(packet)
+    elapsed = time.time() - start
+    print("Decoded " + str(n_packets) + " packets of " + str(len(packet)) + " bytes: %.2f us/packet" % (elapsed / n_packets * 1e6))
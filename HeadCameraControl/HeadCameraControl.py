@@ -35,6 +35,9 @@ import time
 import struct
 import socket
 
+from DeviceScheduler.DeviceScheduler import DeviceScheduler
+from DeviceScheduler.DeviceScheduler import socketHasData
+
 
 
 # properties used by the script
@@ -139,7 +142,7 @@ class SwitchHeadCameraStatus(bpy.types.Operator):
     text_buffer = None
 
     _handle = None
-    _timer = None
+    _device = None
     
     
     
@@ -252,7 +255,8 @@ class SwitchHeadCameraStatus(bpy.types.Operator):
     @staticmethod
     def handle_add(self, context):
         SwitchHeadCameraStatus._handle = bpy.types.SpaceView3D.draw_handler_add(draw_callback_px, (self, context), 'WINDOW', 'POST_PIXEL')
-        SwitchHeadCameraStatus._timer = context.window_manager.event_timer_add(0.04, context.window)
+        # The socket is polled by the shared DeviceScheduler timer
+        SwitchHeadCameraStatus._device = DeviceScheduler.addDevice(context, "HeadCamera", self.hasNewData, self.updateHeadPosition)
 
     @staticmethod
     def handle_remove(context):
@@ -260,9 +264,9 @@ class SwitchHeadCameraStatus(bpy.types.Operator):
             bpy.types.SpaceView3D.draw_handler_remove(SwitchHeadCameraStatus._handle, 'WINDOW')
             SwitchHeadCameraStatus._handle = None
 
-        if SwitchHeadCameraStatus._timer is not None:
-            context.window_manager.event_timer_remove(SwitchHeadCameraStatus._timer)
-            SwitchHeadCameraStatus._timer = None
+        if SwitchHeadCameraStatus._device is not None:
+            DeviceScheduler.removeDevice(SwitchHeadCameraStatus._device)
+            SwitchHeadCameraStatus._device = None
 
         
 
@@ -350,6 +354,12 @@ class SwitchHeadCameraStatus(bpy.types.Operator):
         #if context.area:
         #    context.area.tag_redraw()
 
+        # The DeviceScheduler dropped the device after an error in updateHeadPosition(): stop as if switched off
+        device = SwitchHeadCameraStatus._device
+        if device is not None and device.failed:
+            print("HeadCamera stopped by an error")
+            context.window_manager.head_camera = False
+
         if not context.window_manager.head_camera:
             # stop script
             SwitchHeadCameraStatus.handle_remove(context)
@@ -385,22 +395,7 @@ class SwitchHeadCameraStatus(bpy.types.Operator):
             return {'PASS_THROUGH'}
             
 
-        if event.type == 'TIMER':
-            try:
-                raw_msg = self.socket.recv(1024)
-                x,y,area = struct.unpack_from('fff', raw_msg, 0)
-                #print("Received from UDP "+str(x)+"\t"+str(y)+"\t"+str(area))
-                
-                if(self.useCamera):
-                    self.adjustCameraPosition2(x, y, area)
-                else:
-                    self.adjustViewportPosition2(x, y, area)
-                
-            except socket.timeout as to_msg:
-                #print("We know it: " + str(to_msg))
-                pass    # We know. Can happen very often            
-
-            return {'PASS_THROUGH'}
+        # TIMER events are passed through to the DeviceScheduler, which calls updateHeadPosition()
 
         if event.type == 'TIMER_REPORT':
             return {'PASS_THROUGH'}
@@ -408,6 +403,28 @@ class SwitchHeadCameraStatus(bpy.types.Operator):
         return {'PASS_THROUGH'}
 
 
+    def hasNewData(self):
+        return socketHasData(self.socket)
+
+    def updateHeadPosition(self, context):
+        """Called by the DeviceScheduler when a packet is available. Returns True if the camera or viewport changed."""
+        try:
+            raw_msg = self.socket.recv(1024)
+            x,y,area = struct.unpack_from('fff', raw_msg, 0)
+            #print("Received from UDP "+str(x)+"\t"+str(y)+"\t"+str(area))
+            
+            if(self.useCamera):
+                self.adjustCameraPosition2(x, y, area)
+            else:
+                self.adjustViewportPosition2(x, y, area)
+            
+        except socket.timeout as to_msg:
+            #print("We know it: " + str(to_msg))
+            return False    # We know. Can happen very often
+
+        return True
+
+
     def cancel(self, context):
         if context.window_manager.head_camera:
             SwitchHeadCameraStatus.handle_remove(context)
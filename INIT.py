@@ -55,6 +55,10 @@ import MakeHumanTools
 MakeHumanTools.register()
 
 
+import DeviceScheduler
+DeviceScheduler.register()
+
+
 import LeapNUI
 LeapNUI.register()
 
@@ -36,6 +36,76 @@ TARGET_ADDR = '127.0.0.1'   # Empty string means: bind to all network interfaces
 SERVER_PORT = 6437
 
 
+#
+# Binary packets.
+# Layout (little endian), decoded in Blender by LeapNUI/LeapBinaryFrame.py. Keep the two in sync.
+#   header: magic, version, n_hands, n_pointables, n_gestures, frame id, timestamp
+#   hand: id, type, palmPosition, palmVelocity, palmNormal, direction, elbow, wrist, grabStrength, pinchStrength, confidence, timeVisible
+#   pointable: id, handId, type, flags (bit0=tool, bit1=extended), length, tipPosition, tipVelocity, direction, btip/mcp/carp/dip/pipPosition
+#   gesture: id, type, state, duration, first pointable id, first hand id, normal
+BINARY_MAGIC = b'LEAP'
+BINARY_VERSION = 1
+
+HEADER_STRUCT = struct.Struct('<4sHHHHqq')
+HAND_STRUCT = struct.Struct('<iB3x22f')
+POINTABLE_STRUCT = struct.Struct('<iibB2x25f')
+GESTURE_STRUCT = struct.Struct('<iBB2xqii3f')
+
+HAND_TYPES = {"right": 1, "left": 2}
+GESTURE_TYPES = {"circle": 1, "swipe": 2, "keyTap": 3, "screenTap": 4}
+GESTURE_STATES = {"start": 1, "update": 2, "stop": 3}
+
+ZERO_VECTOR = (0.0, 0.0, 0.0)
+
+
+def _vec(d, key):
+    v = d.get(key)
+    if(v == None or len(v) != 3):
+        return ZERO_VECTOR
+    return v
+
+
+def packFrame(leap_dict):
+    """Packs a decoded v6.json frame into a binary packet. Returns None for the messages not containing a frame."""
+    if(not "id" in leap_dict):
+        return None
+
+    hands = leap_dict.get("hands") or []
+    pointables = leap_dict.get("pointables") or []
+    gestures = leap_dict.get("gestures") or []
+
+    chunks = [HEADER_STRUCT.pack(BINARY_MAGIC, BINARY_VERSION, len(hands), len(pointables), len(gestures),
+                                 leap_dict["id"], leap_dict.get("timestamp", 0))]
+
+    for h in hands:
+        values = (h["id"], HAND_TYPES.get(h.get("type"), 0)) \
+                 + tuple(_vec(h, "palmPosition")) + tuple(_vec(h, "palmVelocity")) + tuple(_vec(h, "palmNormal")) \
+                 + tuple(_vec(h, "direction")) + tuple(_vec(h, "elbow")) + tuple(_vec(h, "wrist")) \
+                 + (h.get("grabStrength", 0.0), h.get("pinchStrength", 0.0), h.get("confidence", 0.0), h.get("timeVisible", 0.0))
+        chunks.append(HAND_STRUCT.pack(*values))
+
+    for p in pointables:
+        flags = 0
+        if(p.get("tool")):
+            flags |= 1
+        if(p.get("extended")):
+            flags |= 2
+        values = (p["id"], p.get("handId", -1), p.get("type", -1), flags, p.get("length", 0.0)) \
+                 + tuple(_vec(p, "tipPosition")) + tuple(_vec(p, "tipVelocity")) + tuple(_vec(p, "direction")) \
+                 + tuple(_vec(p, "btipPosition")) + tuple(_vec(p, "mcpPosition")) + tuple(_vec(p, "carpPosition")) \
+                 + tuple(_vec(p, "dipPosition")) + tuple(_vec(p, "pipPosition"))
+        chunks.append(POINTABLE_STRUCT.pack(*values))
+
+    for g in gestures:
+        pointable_ids = g.get("pointableIds") or [-1]
+        hand_ids = g.get("handIds") or [-1]
+        values = (g["id"], GESTURE_TYPES.get(g.get("type"), 0), GESTURE_STATES.get(g.get("state"), 0),
+                  g.get("duration", 0), pointable_ids[0], hand_ids[0]) + tuple(_vec(g, "normal"))
+        chunks.append(GESTURE_STRUCT.pack(*values))
+
+    return b''.join(chunks)
+
+
 class LeapReceiver: #(threading.Thread):
     """This thread will be listening to the incoming updated Leap data.
     Remember that Blender is not thread safe: we cannot invoke bpy methods in a separate thread.
@@ -57,9 +127,13 @@ class LeapReceiver: #(threading.Thread):
 
     def __init__(self):
         self.use_version_2 = False
+        self.use_binary = False
 
     def useVersion2(self, v):
         self.use_version_2 = v
+
+    def useBinary(self, b):
+        self.use_binary = b
     
     
     def getLeapDict(self):
@@ -135,7 +209,13 @@ class LeapReceiver: #(threading.Thread):
                 #leapDict = json.loads(msg)
                 #print(leapDict)
 
-                raw_msg = msg.encode("utf-8")
+                if(self.use_binary):
+                    raw_msg = packFrame(json.loads(msg))
+                    if(raw_msg == None):
+                        # Not a frame (e.g., the version message)
+                        continue
+                else:
+                    raw_msg = msg.encode("utf-8")
 
                 size = len(raw_msg)
                 if(size > max_length):
@@ -169,14 +249,18 @@ class LeapReceiver: #(threading.Thread):
 # Instructions
 print("You can use the following options:")
 print("  v2 - enables protocol for Leap version 2 (v6.json)")
+print("  bin - sends compact binary packets instead of JSON (requires v2. Set USE_BINARY_UDP in LeapReceiver.py)")
 
 #
 # Parse Arguments
 use_v2 = False
+use_bin = False
 
 for arg in sys.argv[1:]:
     if arg == "v2":
         use_v2 = True
+    elif arg == "bin":
+        use_bin = True
 
 
 forwarder = LeapReceiver()
@@ -184,6 +268,7 @@ forwarder = LeapReceiver()
 #
 # Apply arguments
 forwarder.useVersion2(use_v2)
+forwarder.useBinary(use_bin)
 
 #forwarder.start()
 forwarder.run()
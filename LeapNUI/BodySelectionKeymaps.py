@@ -19,10 +19,8 @@ import bpy
 import bgl
 import blf
 
-import os
-from bpy_extras import image_utils
-
 from .LeapModalController import LeapModal
+from . import Icons
 
 from MakeHumanTools.BoneSet import *
 
@@ -56,16 +54,9 @@ class MyDrawer:
             RFOOT_CHAR, PELVIS_CHAR, LFOOT_CHAR
         ]
         
-
-        # cache the names of already loaded images
-        self.loaded_images_files = [img.name for img in bpy.data.images]
-
-        
-        # Used for loading relative to the .blend file
-        self.scene_dir = os.path.dirname(bpy.data.filepath)
         
         # Images for a 3x3 grid
-        image_filenames = [
+        self.image_filenames = [
                            [ "empty-icon.png", "head-icon.png", "eye-icon.png" ],
                            [ "rhand-icon.png", "torso-icon.png", "lhand-icon.png" ],
                            [ "rfoot-icon.png", "belly-icon.png", "lfoot-icon.png" ]
@@ -80,71 +71,28 @@ class MyDrawer:
         #bpy_extras.image_utils.load_image(imagepath, dirname='', place_holder=False, recursive=False, ncase_cmp=True, convert_callback=None, verbose=False, relpath=None)
         #image = image_utils.load_image(imagepath="images/lfoot-icon.png", dirname=scene_dir)
 
-        images = []
-        for names_line in image_filenames:
-            images_line = []
+        # The images are read once, and drawn as textures of the icon atlas
+        for names_line in self.image_filenames:
             for image_file in names_line:
-                image = self.loadImageEventually(image_file=image_file)
-                #if(not image_file in loaded_images_files):
-                    #print("Loading icon from '" + image_file + "'")
-                    #image = image_utils.load_image(imagepath=image_file, dirname=scene_dir+"/images/")
-                #else:
-                    #print("Icon '" + image_file + "' already loaded. Skipping...")
-                    #image = bpy.data.images[image_file]
-            
-                images_line.append(image)
-                    
-            images.append(images_line)
-        
-
-        # Convert them into GL Buffers
-        self.buffers = []
-        for images_line in images:
-            buffers_line = []
-            for image in images_line:
-                print("Converting image '" + image.name + "'")
-                floats = image.pixels
-                buf = bgl.Buffer(bgl.GL_FLOAT, len(floats), floats)
-                buffers_line.append(buf)
-            self.buffers.append(buffers_line)
+                Icons.loadIcon(image_file)
 
-                
         #
         # Load mask icon
-        image = self.loadImageEventually(image_file="highlight-icon.png")
-        self.highlight_buf = bgl.Buffer(bgl.GL_FLOAT, len(image.pixels), image.pixels)
+        self.highlight_icon = "highlight-icon.png"
     
         #
         # Load finger indication images
-        image = self.loadImageEventually(image_file="1-finger-icon-red.png")
-        self.one_finger_buf = bgl.Buffer(bgl.GL_FLOAT, len(image.pixels), image.pixels)
-                
-        image = self.loadImageEventually(image_file="5-spreadfingers-icon-red.png")
-        self.five_fingers_buf = bgl.Buffer(bgl.GL_FLOAT, len(image.pixels), image.pixels)
-    
-        image = self.loadImageEventually(image_file="translate-arrows-icon.png")
-        self.translate_arrows_buf = bgl.Buffer(bgl.GL_FLOAT, len(image.pixels), image.pixels)
-    
-        image = self.loadImageEventually(image_file="turnaround-arrows-icon.png")
-        self.rotate_arrows_buf = bgl.Buffer(bgl.GL_FLOAT, len(image.pixels), image.pixels)
+        self.one_finger_icon = "1-finger-icon-red.png"
+        self.five_fingers_icon = "5-spreadfingers-icon-red.png"
+        self.translate_arrows_icon = "translate-arrows-icon.png"
+        self.rotate_arrows_icon = "turnaround-arrows-icon.png"
+
+        for image_file in (self.highlight_icon, self.one_finger_icon, self.five_fingers_icon, self.translate_arrows_icon, self.rotate_arrows_icon):
+            Icons.loadIcon(image_file)
 
         pass
     
 
-    def loadImageEventually(self, image_file):
-        """Load the image from the 'images' directory relative to the scene.
-            If the image is already loaded just return it.
-        """
-        
-        if(not image_file in self.loaded_images_files):
-            print("Loading image from '" + image_file + "'")
-            image = image_utils.load_image(imagepath=image_file, dirname=self.scene_dir+"/images/")
-        else:
-            print("Image '" + image_file + "' already loaded. Skipping...")
-            image = bpy.data.images[image_file]
-        return image
-
-
     def drawIcons(self):
         global s_registration_active_space
 
@@ -188,14 +136,13 @@ class MyDrawer:
         # Cycle to draw all the cells
         cell_num = 0
         pos_y = context.region.height - ICON_SIZE - BORDER_SIZE
-        for buffers_line in self.buffers:
+        for names_line in self.image_filenames:
             #pos_x = (context.region.width - (ICON_SIZE * GRID_SIZE) - (BORDER_SIZE * (GRID_SIZE-1)) ) / 2
             pos_x = context.region.width - ((ICON_SIZE + BORDER_SIZE) * GRID_SIZE)
             
-            for buf in buffers_line:
+            for image_file in names_line:
                 #print("Drawing icon for pos "+ str(cell_num))
-                bgl.glRasterPos2f(pos_x, pos_y)
-                bgl.glDrawPixels(ICON_SIZE, ICON_SIZE, bgl.GL_RGBA, bgl.GL_FLOAT, buf)
+                Icons.atlas.drawIcon(image_file, pos_x, pos_y, ICON_SIZE)
 
                 # Print the char
                 blf.position(0, pos_x, pos_y, 0)
@@ -262,18 +209,16 @@ class MyDrawer:
         # Cycle to draw all the cells
         cell_num = 0
         pos_y = context.region.height - ICON_SIZE - BORDER_SIZE
-        for buffers_line in self.buffers:
+        for names_line in self.image_filenames:
             #pos_x = (context.region.width - (ICON_SIZE * GRID_SIZE) - (BORDER_SIZE * (GRID_SIZE-1)) ) / 2
             pos_x = context.region.width - ((ICON_SIZE + BORDER_SIZE) * GRID_SIZE)
             
-            for buf in buffers_line:
+            for image_file in names_line:
                 #print("Drawing icon for pos "+ str(cell_num))
-                bgl.glRasterPos2f(pos_x, pos_y)
-                #bgl.glDrawPixels(ICON_SIZE, ICON_SIZE, bgl.GL_RGBA, bgl.GL_FLOAT, buf)
                 
                 # eventually, draw the highlight contour for the selected operation
                 if(cell_num == highlight_cell_num):
-                    bgl.glDrawPixels(ICON_SIZE, ICON_SIZE, bgl.GL_RGBA, bgl.GL_FLOAT, self.highlight_buf)
+                    Icons.atlas.drawIcon(self.highlight_icon, pos_x, pos_y, ICON_SIZE)
                 
                 cell_num += 1
                 pos_x += ICON_SIZE + BORDER_SIZE
@@ -285,18 +230,17 @@ class MyDrawer:
         #pos_x = (context.region.width - ICON_SIZE ) / 2
         pos_x = context.region.width - ((ICON_SIZE + BORDER_SIZE) * (GRID_SIZE-1)) #- (ICON_SIZE/2)
         pos_y = context.region.height - (ICON_SIZE + BORDER_SIZE) * (GRID_SIZE+2) #- (BORDER_SIZE*2)
-        bgl.glRasterPos2f(pos_x, pos_y)
         
         if(leap_modal.translationUseFinger or leap_modal.rotationUseFinger or leap_modal.isElbowSwivelRotating):
-            bgl.glDrawPixels(ICON_SIZE, ICON_SIZE, bgl.GL_RGBA, bgl.GL_FLOAT, self.one_finger_buf)
+            Icons.atlas.drawIcon(self.one_finger_icon, pos_x, pos_y, ICON_SIZE)
         else:
-            bgl.glDrawPixels(ICON_SIZE, ICON_SIZE, bgl.GL_RGBA, bgl.GL_FLOAT, self.five_fingers_buf)
+            Icons.atlas.drawIcon(self.five_fingers_icon, pos_x, pos_y, ICON_SIZE)
     
         if(leap_modal.isTranslating):
-            bgl.glDrawPixels(ICON_SIZE, ICON_SIZE, bgl.GL_RGBA, bgl.GL_FLOAT, self.translate_arrows_buf)
+            Icons.atlas.drawIcon(self.translate_arrows_icon, pos_x, pos_y, ICON_SIZE)
 
         if(leap_modal.isRotating or leap_modal.isElbowSwivelRotating):
-            bgl.glDrawPixels(ICON_SIZE, ICON_SIZE, bgl.GL_RGBA, bgl.GL_FLOAT, self.rotate_arrows_buf)
+            Icons.atlas.drawIcon(self.rotate_arrows_icon, pos_x, pos_y, ICON_SIZE)
 
         pass
 
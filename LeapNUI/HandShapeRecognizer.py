@@ -0,0 +1,171 @@
+#The Sign Language Synthesis and Interaction Research Tools
+#    Copyright (C) 2014  Fabrizio Nunnari, Alexis Heloir, DFKI
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#
+# Nearest neighbour recognition of the hand shape from the finger joints of the Leap frames.
+# The hand and the poses of a pose library are described by the same features: the bending angle of each phalanx
+# with respect to the previous bone, for the 3 phalanges of the 5 fingers, normalized in [0,1] (0=straight, 1=folded back).
+# For a pose, the angle is the one of the rotation quaternion of the phalanx bone.
+# For a Leap hand, it is the angle between the directions of two consecutive segments of the finger.
+#
+# The features of the poses are computed once, in a matrix. Each query is a brute-force distance to all of its rows.
+# This module doesn't depend on Blender: the poses are read from a HandShapeSelector.PoseLibrary.
+#
+
+import math
+
+try:
+    import numpy
+    USE_NUMPY = True
+except ImportError:
+    USE_NUMPY = False
+
+
+# The joints of each Leap finger, from the wrist to the tip.
+# The segments between them are the metacarpal, proximal, intermediate, and distal bones.
+LEAP_JOINT_FIELDS = ("carpPosition", "mcpPosition", "pipPosition", "dipPosition", "btipPosition")
+
+# The Leap frame fields needed by handFeatures(). The hand direction replaces the zero-length metacarpal of the thumb.
+LEAP_FIELDS = LEAP_JOINT_FIELDS + ("direction",)
+
+N_FINGERS = 5
+N_PHALANGES = 3
+N_FEATURES = N_FINGERS * N_PHALANGES
+
+# (mm) Segments shorter than this have no direction
+MIN_SEGMENT_LENGTH = 1e-3
+
+
+def quaternionAngle(w, x, y, z):
+    """The rotation angle, in [0,pi], of the (not necessarily normalized) quaternion."""
+    norm = math.sqrt(w*w + x*x + y*y + z*z)
+    if(norm == 0):
+        return 0.0
+    return 2.0 * math.acos(min(1.0, abs(w) / norm))
+
+
+def directionsAngle(d1, d2):
+    """The angle, in [0,pi], between the directions d1 and d2. 0 if one of them is None."""
+    if(d1 == None or d2 == None):
+        return 0.0
+    x1, y1, z1 = d1
+    x2, y2, z2 = d2
+    norms = math.sqrt((x1*x1 + y1*y1 + z1*z1) * (x2*x2 + y2*y2 + z2*z2))
+    if(norms == 0):
+        return 0.0
+    return math.acos(max(-1.0, min(1.0, (x1*x2 + y1*y2 + z1*z2) / norms)))
+
+
+def segmentDirection(p1, p2):
+    """The (not normalized) direction from p1 to p2. None if they are too close."""
+    dx = p2[0] - p1[0]
+    dy = p2[1] - p1[1]
+    dz = p2[2] - p1[2]
+    if(dx*dx + dy*dy + dz*dz < MIN_SEGMENT_LENGTH * MIN_SEGMENT_LENGTH):
+        return None
+    return (dx, dy, dz)
+
+
+def poseFeatures(library, pose_name, finger_bone_names):
+    """The N_FEATURES features of a pose of the PoseLibrary.
+    finger_bone_names lists, for each finger, the names of its 3 phalanx bones (see MakeHumanTools.BoneSet.MH_FINGER_PHALANGES_R).
+    Bones missing in the library are considered straight."""
+    rotations = library.poseRotations(pose_name)
+    out = []
+    for phalanges in finger_bone_names:
+        for bone_name in phalanges:
+            b = library.bone_index.get(bone_name)
+            if(b == None):
+                out.append(0.0)
+            else:
+                out.append(quaternionAngle(*rotations[b*4:b*4+4]) / math.pi)
+    return out
+
+
+def handFeatures(hand):
+    """The N_FEATURES features of a LeapHand, computed from the joint positions of its fingers.
+    Returns None if a finger is missing, or if the joint positions were not received (see LEAP_FIELDS)."""
+    fingers = [None] * N_FINGERS
+    for p in hand.pointables:
+        if(p.tool or p.type == None or p.type < 0 or p.type >= N_FINGERS):
+            continue
+        fingers[p.type] = p
+
+    out = []
+    for finger in fingers:
+        if(finger == None):
+            return None
+        joints = [getattr(finger, field) for field in LEAP_JOINT_FIELDS]
+        if(None in joints):
+            return None
+
+        # The bending of each phalanx is measured with respect to the previous bone.
+        # The thumb has a zero-length metacarpal: the hand direction is used instead.
+        previous = segmentDirection(joints[0], joints[1])
+        if(previous == None):
+            previous = hand.direction
+        for j in range(1, N_PHALANGES + 1):
+            direction = segmentDirection(joints[j], joints[j+1])
+            out.append(directionsAngle(previous, direction) / math.pi)
+            if(direction != None):
+                previous = direction
+
+    return out
+
+
+class HandShapeRecognizer:
+    """Ranks the poses of a pose library by their distance from the shape of a Leap hand.
+
+    Usage:
+        recognizer = HandShapeRecognizer(library, MH_FINGER_PHALANGES_R)
+        features = handFeatures(leap_hand)
+        if(features != None):
+            pose_names = recognizer.rank(features, k=5)
+    """
+
+    def __init__(self, library, finger_bone_names):
+        """library is a HandShapeSelector.PoseLibrary."""
+        # Pose names, in library order
+        self.pose_names = sorted(library.pose_index, key=library.pose_index.get)
+        rows = [ poseFeatures(library, pose_name, finger_bone_names) for pose_name in self.pose_names ]
+
+        if(USE_NUMPY):
+            self.features = numpy.array(rows, dtype=numpy.float64).reshape(len(rows), N_FEATURES)
+        else:
+            self.features = rows
+
+    def distances(self, features):
+        """The squared distances of the features from each pose, in the order of pose_names."""
+        if(USE_NUMPY):
+            diff = self.features - numpy.asarray(features, dtype=numpy.float64)
+            return numpy.einsum('ij,ij->i', diff, diff).tolist()
+
+        return [sum([(a - b) * (a - b) for a, b in zip(row, features)]) for row in self.features]
+
+    def rank(self, features, candidates=None, k=None):
+        """The names of the poses, nearest first.
+        If candidates is given, only the poses in it are ranked. If k is given, only the k nearest are returned."""
+        distances = self.distances(features)
+        order = sorted(range(len(distances)), key=distances.__getitem__)
+        if(candidates != None):
+            candidates = set(candidates)
+            out = [ self.pose_names[i] for i in order if self.pose_names[i] in candidates ]
+        else:
+            out = [ self.pose_names[i] for i in order ]
+
+        if(k != None):
+            del out[k:]
+        return out
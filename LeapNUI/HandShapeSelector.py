@@ -20,13 +20,13 @@ import blf
 import mathutils
 
 from bpy.props import * # for properties
+from bpy.app.handlers import persistent
 
-import os
-from bpy_extras import image_utils
 
 import time # for real-time animation
 
 import re
+import array
 
 from LeapNUI.LeapReceiver import LeapReceiver
 from LeapNUI.LeapReceiver import PointableSelector
@@ -36,6 +36,18 @@ from MakeHumanTools.BoneSet import MH_HAND_BONES_L
 from MakeHumanTools.BoneSet import MH_HAND_BONES_R
 from MakeHumanTools.BoneSet import MH_HAND_CONTROLLERS_L
 from MakeHumanTools.BoneSet import MH_HAND_CONTROLLERS_R
+from MakeHumanTools.BoneSet import MH_FINGER_PHALANGES_L
+from MakeHumanTools.BoneSet import MH_FINGER_PHALANGES_R
+
+from DeviceScheduler.DeviceScheduler import DeviceScheduler
+
+from LeapNUI.OnlineSimplifier import OnlineSimplifier
+
+from LeapNUI import Icons
+
+from LeapNUI.HandShapeRecognizer import HandShapeRecognizer
+from LeapNUI.HandShapeRecognizer import handFeatures
+from LeapNUI.HandShapeRecognizer import LEAP_FIELDS as RECOGNITION_LEAP_FIELDS
 
 LHAND_ACTIVATION_CHAR = 'D'
 RHAND_ACTIVATION_CHAR = 'A'
@@ -43,7 +55,8 @@ RHAND_ACTIVATION_CHAR = 'A'
 LHAND_POSE_LIBRARY_NAME = "handshape_lib_L"
 RHAND_POSE_LIBRARY_NAME = "handshape_lib_R"
 
-# Delay between TIMER events when entering the modal command mode. In seconds.
+# Nominal delay between updates, in seconds. Used as time step for the first frame.
+# The actual update rate is decided by the DeviceScheduler.
 UPDATE_DELAY = 0.04
 
 #SELECTION_MAX_Y = 250
@@ -59,6 +72,10 @@ SELECTION_DISPLAY_HEIGHT = 0.8
 
 MAX_DISPLAY_ELEMENTS = 2
 
+# The hand shape ranking is applied to the menu only after its best pose stayed the same for this number of Leap frames.
+# Otherwise, near-tie poses would swap their place at each frame, while the hand moves to select.
+RECOGNITION_STABLE_FRAMES = 10
+
 
 def getSelectedArmature(context):
     """Returns the selected armature. Or None"""
@@ -91,6 +108,15 @@ class HandShapeSelector(bpy.types.Operator):
     # Reference to the LeapReceiver singleton, to get updated leap dictionaries
     leap_receiver = None
 
+    # To read each new frame of the receiver only once
+    frame_consumer = None
+
+    # The Leap frame fields read by modal()
+    LEAP_FIELDS = ("tipPosition", "palmPosition", "tipVelocity", "gestures")
+
+    # The fields required to the receiver: LEAP_FIELDS, plus the finger joints if the recognition is active.
+    leap_fields = LEAP_FIELDS
+
     # Utility object to get the most stable last used pointable.
     pointable_selector = None
 
@@ -100,6 +126,21 @@ class HandShapeSelector(bpy.types.Operator):
 
     # The list of items to select
     selectable_items = []
+
+    # For each of the HAND_FLAGS_COMBINATIONS bit flags, the tuple of pose names compatible with it. See buildCandidatesIndex().
+    candidates_index = None
+
+    # Ranks the items according to the shape of the hand. None if the recognition was not active when the operator started.
+    recognizer = None
+
+    # The last applied ranking of all the poses, or None. The selectable items follow its order. See updateRanking().
+    ranked_items = None
+    # The best pose of the latest rankings, and for how many consecutive frames it was the best
+    ranking_top_item = None
+    ranking_top_frames = 0
+
+    # The MenuTextLayout of the items, cached among redraws
+    text_layout = None
     
 
     # Set to True in modal() if a finger (or hand) is visible and within the vertical range
@@ -144,8 +185,8 @@ class HandShapeSelector(bpy.types.Operator):
     
     def addHandlers(self, context):
         #
-        # TIMER
-        self._timer = context.window_manager.event_timer_add(UPDATE_DELAY, context.window)
+        # DEVICE (updated by the shared DeviceScheduler timer)
+        self._device = DeviceScheduler.addDevice(context, "HandShapeSelector", self.hasNewFrame, self.updateSelection)
 
         #
         # DRAW
@@ -155,7 +196,7 @@ class HandShapeSelector(bpy.types.Operator):
 
 
 
-    _timer = None
+    _device = None
     _draw_handle = None
 
 
@@ -163,10 +204,10 @@ class HandShapeSelector(bpy.types.Operator):
         print("Removing handlers...")
         
         #
-        # TIMER
-        if(self._timer != None):
-            self._timer = bpy.context.window_manager.event_timer_remove(self._timer)
-            self._timer = None
+        # DEVICE
+        if(self._device != None):
+            DeviceScheduler.removeDevice(self._device)
+            self._device = None
 
         #
         # DRAW
@@ -193,10 +234,12 @@ class HandShapeSelector(bpy.types.Operator):
             self.POSE_LIBRARY_NAME = RHAND_POSE_LIBRARY_NAME
             self.HAND_BONE_NAMES = MH_HAND_BONES_R
             self.controller_names = MH_HAND_CONTROLLERS_R
+            self.FINGER_PHALANGES = MH_FINGER_PHALANGES_R
         else:
             self.POSE_LIBRARY_NAME = LHAND_POSE_LIBRARY_NAME
             self.HAND_BONE_NAMES = MH_HAND_BONES_L
             self.controller_names = MH_HAND_CONTROLLERS_L
+            self.FINGER_PHALANGES = MH_FINGER_PHALANGES_L
 
         if(not self.POSE_LIBRARY_NAME in bpy.data.actions):
             self.report({'ERROR'}, "No action library named '" + self.POSE_LIBRARY_NAME + "' found")
@@ -222,10 +265,28 @@ class HandShapeSelector(bpy.types.Operator):
         for marker in action.pose_markers:
             print("Found marker " + str(marker.name) + " at frame " + str(marker.frame))
             self.selectable_items.append(marker.name)
+
+        self.text_layout = MenuTextLayout()
+
+        # The poses selectable with each finger extension state, for the finger extension filter
+        self.candidates_index = buildCandidatesIndex(self.selectable_items)
+
+        # The recognizer needs the finger joints, which are not received otherwise
+        self.leap_fields = self.LEAP_FIELDS
+        self.recognizer = None
+        self.ranked_items = None
+        self.ranking_top_item = None
+        self.ranking_top_frames = 0
+        if(context.window_manager.leap_hand_shape_selector_recognition):
+            library = PoseLibraryCache.get(self.POSE_LIBRARY_NAME, self.HAND_BONE_NAMES)
+            self.recognizer = HandShapeRecognizer(library, self.FINGER_PHALANGES)
+            self.leap_fields = self.LEAP_FIELDS + RECOGNITION_LEAP_FIELDS
             
 
         self.pointable_selector = PointableSelector()
         self.hand_selector = HandSelector()
+        self.frame_consumer = self.leap_receiver.createFrameConsumer("HandShapeSelector")
+        self.leap_receiver.requireFields(self.leap_fields)
 
         context.window_manager.modal_handler_add(self)
         self.addHandlers(context)
@@ -242,12 +303,6 @@ class HandShapeSelector(bpy.types.Operator):
         #FINISHED, CANCELLED, RUNNING_MODAL
         #print("HandShapeSelector running modal")
         
-        now = time.time()
-        if(self.last_modal_time == None):
-            self.last_modal_time = now - UPDATE_DELAY
-        dt = now - self.last_modal_time
-        self.last_modal_time = now
-        
         if event.type == 'ESC':
             # Restore hand rotations
             applyBoneRotations(self.selected_armature, self.hand_initial_rotations, try_record=False)
@@ -266,11 +321,56 @@ class HandShapeSelector(bpy.types.Operator):
                 applyPose(armature=self.selected_armature, pose_library_name=self.POSE_LIBRARY_NAME, hand_bone_names=self.HAND_BONE_NAMES, pose_name=selection_name, try_record=True)
                 resetFingerControllers(armature=self.selected_armature, controller_names=self.controller_names, try_record=True) 
                 return {"FINISHED"}
-        
-        leap_dict = self.leap_receiver.getLeapDict()
-        if(leap_dict == None):
-            print("No dictionary yet...")
-            return {"RUNNING_MODAL"}
+
+        if event.type == 'TIMER':
+            # The DeviceScheduler dropped the device after an error in updateSelection()
+            if(self._device != None and self._device.failed):
+                applyBoneRotations(self.selected_armature, self.hand_initial_rotations, try_record=False)
+                applyBoneRotations(self.selected_armature, self.finger_controllers_initial_rots, try_record=False)
+                self.report({'ERROR'}, "Hand shape selection stopped by an error")
+                return self.cancel(context)
+
+            # The selection is updated by the DeviceScheduler (see updateSelection()). Let it receive the TIMER events.
+            return {'PASS_THROUGH'}
+
+        return {"RUNNING_MODAL"}
+
+
+    def updateRanking(self, features, candidates, pointed_item, pointed_num):
+        """Ranks all the poses for the hand features. The ranking replaces self.ranked_items only when its best pose
+        has been the same for RECOGNITION_STABLE_FRAMES frames. The pointed item keeps its place among the candidates."""
+        ranking = self.recognizer.rank(features)
+
+        if(ranking[0] == self.ranking_top_item):
+            self.ranking_top_frames += 1
+        else:
+            self.ranking_top_item = ranking[0]
+            self.ranking_top_frames = 1
+
+        if(self.ranking_top_frames != RECOGNITION_STABLE_FRAMES):
+            return
+
+        if(pointed_item in ranking):
+            pinItem(ranking, pointed_item, pointed_num, candidates)
+        self.ranked_items = ranking
+
+
+    def hasNewFrame(self):
+        return self.frame_consumer != None and self.frame_consumer.hasNewFrame()
+
+
+    def updateSelection(self, context):
+        """Called by the DeviceScheduler when a new Leap frame is available. Returns True if the scene changed."""
+        leap_frame = self.frame_consumer.fetch()
+        if(leap_frame == None):
+            return False
+
+        now = time.time()
+        if(self.last_modal_time == None):
+            self.last_modal_time = now - UPDATE_DELAY
+        # Time since the last processed frame
+        dt = now - self.last_modal_time
+        self.last_modal_time = now
 
 
         if(bpy.context.window_manager.leap_hand_shape_selector_finger_extension_filter):
@@ -281,9 +381,8 @@ class HandShapeSelector(bpy.types.Operator):
             FINGER_TIP_SELECTION = True
 
             
-        #print(str(leap_dict))
-        p = self.pointable_selector.select(leap_dict)
-        h = self.hand_selector.select(leap_dict)
+        p = self.pointable_selector.select(leap_frame)
+        h = self.hand_selector.select(leap_frame)
         #print("Current pointable = " + str(p))
         #print("Current hand = " + str(h))
 
@@ -301,40 +400,35 @@ class HandShapeSelector(bpy.types.Operator):
             # ITEMS FILTERING (USING FINGERS EXTENSION)
             #
 
+            # The item under the pointer, before the list is updated
+            pointed_num = int(self.selection_num)
+            pointed_item = None
+            if(0 <= pointed_num < len(self.selectable_items)):
+                pointed_item = self.selectable_items[pointed_num]
+
             # Update the list of available items
             if(FINGER_EXTENSION_FILTER and h!=None):
-                self.selectable_items = []
-                # Retrieve entries from the pose library
-                action = bpy.data.actions[self.POSE_LIBRARY_NAME]
-                for marker in action.pose_markers:
-                    #print(marker)
-                    flags = getHandBitFlag(h['id'], leap_dict)
-                    #print("{0:b}".format(flags))
-                    #print("Found marker " + str(marker.name) + " at frame " + str(marker.frame))
-
-
-                    skip = False
-                    
-                    # if the pose is in the finger OPEN db, the finger MUST be open. if it is not, we skip the pose.
-                    if(marker.name in finger_open_db):
-                        need_open_flags = finger_open_db[marker.name]
-                        #print(marker.name+" ->\t{0:b}".format(need_open_flags))
-                        # if some flag is missing, skip it!
-                        if( (need_open_flags & flags) != need_open_flags):
-                            skip = True
-
-                    # if the pose is in the finger CLOSE db, the finger MUST be close. if it is not, we skip the pose.
-                    if(marker.name in finger_closed_db):
-                        need_close_flags = finger_closed_db[marker.name]
-                        if( (need_close_flags & (~flags)) != need_close_flags):
-                            skip = True
-
-                    # if(marker.name in pinch_needed_set):
-                    #     if((flags & 0b100000) != 0b100000):
-                    #         skip = True
-
-                    if(not skip):
-                        self.selectable_items.append(marker.name)
+                flags = getHandBitFlag(h.id, leap_frame)
+                #print("{0:b}".format(flags))
+                self.selectable_items = self.candidates_index[flags & HAND_FLAGS_MASK]
+
+            #
+            # ITEMS RANKING (USING THE HAND SHAPE)
+            #
+
+            # The poses most similar to the hand come first, so that they are reachable with less hand travel
+            if(self.recognizer != None and h!=None and bpy.context.window_manager.leap_hand_shape_selector_recognition):
+                candidates = None
+                if(FINGER_EXTENSION_FILTER):
+                    # Rank only the filtered items
+                    candidates = set(self.selectable_items)
+
+                features = handFeatures(h)
+                if(features != None):
+                    self.updateRanking(features, candidates, pointed_item, pointed_num)
+
+                if(self.ranked_items != None):
+                    self.selectable_items = [ item for item in self.ranked_items if candidates == None or item in candidates ]
 
 
             #
@@ -346,10 +440,10 @@ class HandShapeSelector(bpy.types.Operator):
             selection_stable_range = SELECTION_STABLE_RANGE
             if(FINGER_TIP_SELECTION):
                 # use finger coordinates
-                y = p['tipPosition'][1]
+                y = p.tipPosition[1]
             else:
                 # Use palm coordinates
-                y = h['palmPosition'][1]
+                y = h.palmPosition[1]
                 # When using the palm, the precision is much lower. Increase the stability zone.
                 selection_stable_range *= 3.0
 
@@ -370,25 +464,25 @@ class HandShapeSelector(bpy.types.Operator):
             #
             if(p!=None):
 
-                p_id = p['id']
-                gestures = leap_dict["gestures"]
+                p_id = p.id
+                gestures = leap_frame.gestures
                 found_gesture = None
                 for gesture in gestures:
-                    if(gesture["type"] != "circle"):
+                    if(gesture.type != "circle"):
                         continue
-                    if(p_id in gesture["pointableIds"]):
+                    if(p_id in gesture.pointableIds):
                         found_gesture = gesture
                         break
 
                 if(found_gesture != None):
                     #use tangent speed
-                    vx,vy,vz = p['tipVelocity']
+                    vx,vy,vz = p.tipVelocity
                     velocity = mathutils.Vector((vx,vy,vz))
                     linear_velocity = velocity.length
                     delta_scroll = 0.02 * linear_velocity * dt
 
                         
-                    normal = gesture["normal"]
+                    normal = gesture.normal
                     if(normal[2] < 0):
                         clockwise = True
                         self.selection_window_first_item += delta_scroll
@@ -500,12 +594,8 @@ class HandShapeSelector(bpy.types.Operator):
             applyPose(armature=self.selected_armature, pose_library_name=self.POSE_LIBRARY_NAME, hand_bone_names=self.HAND_BONE_NAMES, pose_name=selection_name, try_record=False)
 
 
-
-        # Force interactive redraw
-        if(bpy.context.area):
-            bpy.context.area.tag_redraw()
-        
-        return {"RUNNING_MODAL"}
+        # The DeviceScheduler will redraw the 3D views
+        return True
     
 
     def cancel(self, context):
@@ -517,6 +607,10 @@ class HandShapeSelector(bpy.types.Operator):
     def stop_leap_receiver(self):
         if(self.leap_receiver != None):
             print("Releasing LeapReceiver singleton...")
+            if(self.frame_consumer != None):
+                self.leap_receiver.releaseFrameConsumer(self.frame_consumer)
+                self.frame_consumer = None
+                self.leap_receiver.releaseFields(self.leap_fields)
             LeapReceiver.releaseSingleton()
             #self.leap_receiver.terminate()
             #self.leap_receiver.join()
@@ -555,57 +649,28 @@ class HandShapeSelector(bpy.types.Operator):
 
         n_items = len(self.selectable_items)
 
-        # Phylosophy
-        # We try to use the fraction of the current heght of the area, but up to a maximum font size
-
-        # Number of items to really display
-        n_items_to_display = min(MAX_DISPLAY_ELEMENTS, len(self.selectable_items))
-
-        # Calculate the top point
-        text_top_y = context.region.height * ( (1 + SELECTION_DISPLAY_HEIGHT) / 2)
-
-        # calc the desired text area height
-        desired_bottom_y = context.region.height * ( (1-SELECTION_DISPLAY_HEIGHT) / 2)
-        desired_text_area_height = text_top_y - desired_bottom_y
-        # calc the desired the font size
-        font_size = int(desired_text_area_height / n_items_to_display)
-        # But limit the font size to their maximum
-        font_size = min(font_size, self.FONT_MAX_SIZE)
-        # The effective size of the text area, according to the chosen font size
-        text_area_height = font_size * n_items_to_display
-        # recompute the bottom point according to chosen font size
-        text_bottom_y = text_top_y - text_area_height
-
-        #print(str(self.FONT_MAX_SIZE)+" fs="+str(font_size))
-
-
-        central_y = text_bottom_y + int(text_area_height / 2)
-
-        
+        # The layout changes only with the region size and the items. Otherwise, the cached one is used.
+        layout = self.text_layout
+        layout.update(context.region.width, context.region.height, DPI, self.selectable_items, self.FONT_MAX_SIZE)
+        font_size = layout.font_size
+        central_y = layout.central_y
 
 
 
         bgl.glPushAttrib(bgl.GL_CLIENT_ALL_ATTRIB_BITS)
 
-        # Set the font size now, because it will be needed to estimate the background size.
         blf.size(0, font_size, DPI)
 
         
         #
         # Draw background
-        max_text_width = 0
-        for item in self.selectable_items:
-            item_w,item_h = blf.dimensions(0, item)
-            if(item_w > max_text_width):
-                max_text_width = item_w
-        self.draw_bg(context, top_y=text_top_y, bottom_y=text_bottom_y, width=max_text_width*1.5, cover_pointer=True)
+        self.draw_bg(context, top_y=layout.text_top_y, bottom_y=layout.text_bottom_y, width=layout.max_text_width*1.5, cover_pointer=True)
         
 
 
         #
         # Draw entries
         #
-        pos_x = 0
         
         # The first item will be drawn on the very top, according to the current selection and its position on screen
         # The offset uses (self.selection_num - 1) because the text is written with the y at the bottom line.
@@ -616,10 +681,7 @@ class HandShapeSelector(bpy.types.Operator):
         for item_id in range(0,n_items):
             item = self.selectable_items[item_id]
             
-            item_w,item_h = blf.dimensions(0, item)
-            pos_x = (context.region.width / 2) - item_w
-            
-            blf.position(0, pos_x, pos_y, 0)
+            blf.position(0, layout.items_x[item_id], pos_y, 0)
             
             if(item_id == int_selection_num):
                 bgl.glColor4f(*self.SELECTED_FONT_RGBA)
@@ -648,12 +710,10 @@ class HandShapeSelector(bpy.types.Operator):
         
         if(not self.selector_visible):
             pos_x = (context.region.width / 2) + self.ICON_SIZE
-            bgl.glRasterPos2f(pos_x, pos_y)
-            bgl.glDrawPixels(self.ICON_SIZE, self.ICON_SIZE, bgl.GL_RGBA, bgl.GL_FLOAT, icon_pointing_finger_missing)
+            Icons.atlas.drawIcon(ICON_POINTING_FINGER_MISSING, pos_x, pos_y, self.ICON_SIZE)
         else:
             pos_x = (context.region.width / 2)
-            bgl.glRasterPos2f(pos_x, pos_y)
-            bgl.glDrawPixels(self.ICON_SIZE, self.ICON_SIZE, bgl.GL_RGBA, bgl.GL_FLOAT, icon_pointing_finger)
+            Icons.atlas.drawIcon(ICON_POINTING_FINGER, pos_x, pos_y, self.ICON_SIZE)
 
         bgl.glPopClientAttrib()
 
@@ -754,13 +814,11 @@ class HandShapeSelector(bpy.types.Operator):
         if(not self.selector_visible):
             pos_x = (context.region.width / 2) + self.ICON_SIZE
             pos_y = text_top_y - self.ICON_SIZE
-            bgl.glRasterPos2f(pos_x, pos_y)
-            bgl.glDrawPixels(self.ICON_SIZE, self.ICON_SIZE, bgl.GL_RGBA, bgl.GL_FLOAT, icon_pointing_finger_missing)
+            Icons.atlas.drawIcon(ICON_POINTING_FINGER_MISSING, pos_x, pos_y, self.ICON_SIZE)
         else:
             pos_x = (context.region.width / 2)
             pos_y = text_bottom_y + self.normalized_finger_y * text_area_height - (self.ICON_SIZE * 0.625)
-            bgl.glRasterPos2f(pos_x, pos_y)
-            bgl.glDrawPixels(self.ICON_SIZE, self.ICON_SIZE, bgl.GL_RGBA, bgl.GL_FLOAT, icon_pointing_finger)
+            Icons.atlas.drawIcon(ICON_POINTING_FINGER, pos_x, pos_y, self.ICON_SIZE)
 
         bgl.glPopClientAttrib()
 
@@ -792,13 +850,78 @@ class HandShapeSelector(bpy.types.Operator):
         bgl.glEnd()
 
 
+class MenuTextLayout:
+    """The layout of the menu drawn by HandShapeSelector.draw_callback_px_moving_text: font size, text area, and the position of each item.
+    It depends only on the region size and on the items, so it is computed again only when they change.
+    The width of each text is measured once per font size."""
+
+    def __init__(self):
+        # The (region width, region height, dpi, items) of the current layout
+        self.key = None
+        # (font size, dpi) -> { text -> width }
+        self.text_widths = {}
+
+        self.font_size = 0
+        self.text_top_y = 0
+        self.text_bottom_y = 0
+        self.text_area_height = 0
+        self.central_y = 0
+        self.max_text_width = 0
+        # The x of each item, right aligned to the center of the region
+        self.items_x = []
+
+    def update(self, region_width, region_height, dpi, items, font_max_size):
+        key = (region_width, region_height, dpi, tuple(items), font_max_size)
+        if(key == self.key):
+            return
+        self.key = key
+
+        # Phylosophy
+        # We try to use the fraction of the current heght of the area, but up to a maximum font size
+
+        # Number of items to really display. At least one, to size the (empty) area when no item is selectable.
+        n_items_to_display = max(1, min(MAX_DISPLAY_ELEMENTS, len(items)))
+
+        # Calculate the top point
+        self.text_top_y = region_height * ( (1 + SELECTION_DISPLAY_HEIGHT) / 2)
+
+        # calc the desired text area height
+        desired_bottom_y = region_height * ( (1-SELECTION_DISPLAY_HEIGHT) / 2)
+        desired_text_area_height = self.text_top_y - desired_bottom_y
+        # calc the desired the font size
+        font_size = int(desired_text_area_height / n_items_to_display)
+        # But limit the font size to their maximum
+        self.font_size = min(font_size, font_max_size)
+        # The effective size of the text area, according to the chosen font size
+        self.text_area_height = self.font_size * n_items_to_display
+        # recompute the bottom point according to chosen font size
+        self.text_bottom_y = self.text_top_y - self.text_area_height
+
+        self.central_y = self.text_bottom_y + int(self.text_area_height / 2)
+
+        # Measure only the texts never measured at this size
+        widths = self.text_widths.setdefault((self.font_size, dpi), {})
+        new_items = [item for item in items if not item in widths]
+        if(len(new_items) > 0):
+            blf.size(0, self.font_size, dpi)
+            for item in new_items:
+                item_w,item_h = blf.dimensions(0, item)
+                widths[item] = item_w
+
+        self.max_text_width = max([0] + [widths[item] for item in items])
+        self.items_x = [(region_width / 2) - widths[item] for item in items]
+
+
 
 def applyPose(armature, pose_library_name, hand_bone_names, pose_name, try_record):
     #pose_name = bpy.data.actions[pose_library_name].pose_markers[pose_number].name
     #print("Applying pose " +pose_name)
-    poses_data = getPoseLibraryData(pose_library_name, hand_bone_names)
-    bones_data = poses_data[pose_name]
-    applyBoneRotations(armature, bones_data, try_record)
+    library = PoseLibraryCache.get(pose_library_name, hand_bone_names)
+    rotations = library.poseRotations(pose_name)
+
+    bones = armature.pose.bones
+    for i, bone_name in enumerate(library.bone_names):
+        applyBoneRotation(bones[bone_name], rotations[i*4:i*4+4], try_record)
 
 
 
@@ -809,14 +932,20 @@ def applyBoneRotations(armature, rotations, try_record):
     for bone_name in rotations:
         #print("Applying " + bone_name)
         # e.g. bpy.data.objects['Human1-mhxrig-expr-advspine'].pose.bones['Finger-2-1_L'].rotation_quaternion = 1,0,0,0
-        bones[bone_name].rotation_quaternion = rotations[bone_name]
+        applyBoneRotation(bones[bone_name], rotations[bone_name], try_record)
 
-        #print("Checking rec for "+bone_name)
-        # RECORD (eventually)
-        if(try_record and bpy.context.scene.tool_settings.use_keyframe_insert_auto):
-            print("Recording keyframe for "+bone_name)
-            frame = bpy.context.scene.frame_current
-            bones[bone_name].keyframe_insert(data_path="rotation_quaternion", frame=frame)
+
+def applyBoneRotation(bone, rotation, try_record):
+    """Sets the [w x y z] rotation of the pose bone, and records it if auto keying is on."""
+
+    bone.rotation_quaternion = rotation
+
+    #print("Checking rec for "+bone.name)
+    # RECORD (eventually)
+    if(try_record and bpy.context.scene.tool_settings.use_keyframe_insert_auto):
+        print("Recording keyframe for "+bone.name)
+        frame = bpy.context.scene.frame_current
+        OnlineSimplifier.record(bone, "rotation_quaternion", frame)
 
 
 # def retrieveFingerControllerRotations(armature, controller_names):
@@ -840,7 +969,7 @@ def resetFingerControllers(armature, controller_names, try_record):
 
         if(try_record and bpy.context.scene.tool_settings.use_keyframe_insert_auto):
             frame = bpy.context.scene.frame_current
-            controller.keyframe_insert(data_path="rotation_quaternion", frame=frame)
+            OnlineSimplifier.record(controller, "rotation_quaternion", frame)
 
 
 
@@ -863,6 +992,10 @@ def retrieveBoneRotations(armature, bone_names):
 
 
 
+# e.g. pose.bones["Head"].rotation_quaternion
+POSE_BONE_ROTATION_PATTERN = re.compile('pose\.bones\[\"(.+)\"\]\.rotation_quaternion') #  "pose\.bones\[\"(+*)\"\]\..+")
+
+
 def getPoseLibraryData(pose_library_name, bones):
     """Returns a dictionary. Keys are the pose names. Values are the pose data.
     Each value will be dictionary with bone names as keys, and the a list of the 4 rotation elements as value: "bone_name" -> [w x y z]
@@ -890,8 +1023,7 @@ def getPoseLibraryData(pose_library_name, bones):
         # Insert the bone->rotation dictionary into the main output dict
         out[pose_name] = dict_of_rotations
 
-    # e.g. pose.bones["Head"].rotation_quaternion
-    pattern = re.compile('pose\.bones\[\"(.+)\"\]\.rotation_quaternion') #  "pose\.bones\[\"(+*)\"\]\..+")
+    pattern = POSE_BONE_ROTATION_PATTERN
 
         
     # Now really parse the data
@@ -924,24 +1056,132 @@ def getPoseLibraryData(pose_library_name, bones):
 
 
 
+def actionChangeStamp(action):
+    """A cheap value that changes when the structure of the action changes: number of fcurves, number of keyframes of each fcurve, pose markers.
+    Edits of the keyframe values do not change it. See actionValuesHash()."""
 
-def loadImageEventually(image_file):
-    """Load the image from the 'images' directory relative to the scene.
-        If the image is already loaded just return it.
+    n_keyframes = tuple(len(fcurve.keyframe_points) for fcurve in action.fcurves)
+    markers = tuple((marker.name, marker.frame) for marker in action.pose_markers)
+    return (n_keyframes, markers)
+
+
+def actionValuesHash(action):
+    """A hash of the keyframe coordinates of all the fcurves of the action. Reads all the keyframes, so it is computed only when the action was updated."""
+
+    out = []
+    for fcurve in action.fcurves:
+        kfs = fcurve.keyframe_points
+        coords = array.array('f', bytes(len(kfs) * 2 * 4))
+        kfs.foreach_get("co", coords)
+        out.append(coords.tobytes())
+    return hash(tuple(out))
+
+
+class PoseLibrary:
+    """The rotations of a pose library action, for a given list of bones.
+    The [w x y z] rotations are stored in a dense flat array of n_poses * n_bones * 4 floats,
+    so that the rotations of a pose are one slice of it."""
+
+    def __init__(self, action, bone_names, stamp):
+        self.stamp = stamp
+        self.values_hash = actionValuesHash(action)
+        # Set by PoseLibraryCache.updateHandler() when Blender reports an update of the action
+        self.maybe_edited = False
+        self.bone_names = list(bone_names)
+        self.bone_index = { name: i for i, name in enumerate(self.bone_names) }
+
+        markers = action.pose_markers
+        n_poses = len(markers)
+        n_bones = len(self.bone_names)
+        self.pose_index = { }
+        for i, marker in enumerate(markers):
+            self.pose_index[marker.name] = i
+
+        # Everything at identity by default
+        self.rotations = array.array('d', [1.0, 0.0, 0.0, 0.0] * (n_poses * n_bones))
+
+        for fcurve in action.fcurves:
+            res = POSE_BONE_ROTATION_PATTERN.match(fcurve.data_path)
+            if(res == None):
+                continue
+            b = self.bone_index.get(res.group(1))
+            if(b == None):
+                continue
+
+            # All the keyframe coordinates at once, as flat [t0 v0 t1 v1 ...]
+            kfs = fcurve.keyframe_points
+            coords = array.array('f', bytes(len(kfs) * 2 * 4))
+            kfs.foreach_get("co", coords)
+
+            # the data_index will be between 0 and 3, indicating the quaternion component wxyz
+            component = fcurve.array_index
+            for k in range(0, len(coords), 2):
+                # In a library, poses are indexed form 0, but keyframes start form 1
+                pose_number = int(coords[k]) - 1
+                assert pose_number < n_poses
+                self.rotations[(pose_number * n_bones + b) * 4 + component] = coords[k+1]
+
+    def poseRotations(self, pose_name):
+        """The rotations of the pose, as a flat array of n_bones * 4 floats, in the order of bone_names."""
+        n_values = len(self.bone_names) * 4
+        start = self.pose_index[pose_name] * n_values
+        return self.rotations[start:start + n_values]
+
+
+class PoseLibraryCache:
+    """Class-level singleton holding the parsed pose libraries, keyed by action name and bone names.
+
+    Usage:
+        library = PoseLibraryCache.get(pose_library_name, bone_names)
+        rotations = library.poseRotations(pose_name)
+
+    Each get() compares the cheap change stamp of the action (see actionChangeStamp()) with the cached one,
+    so that adding or removing poses, fcurves, or keyframes rebuilds the entry.
+    Edits of the keyframe values are detected by the hash of the keyframes (see actionValuesHash()),
+    computed only when the scene_update_post handler has seen the is_updated flag of the action.
     """
 
-    # list the names of already loaded images
-    loaded_images_files = [img.name for img in bpy.data.images]
-    
-    scene_dir = os.path.dirname(bpy.data.filepath)
-    
-    if(not image_file in loaded_images_files):
-        print("Loading image from '" + image_file + "'")
-        image = image_utils.load_image(imagepath=image_file, dirname=scene_dir+"/images/")
-    else:
-        print("Image '" + image_file + "' already loaded. Skipping...")
-        image = bpy.data.images[image_file]
-    return image
+    s_libraries = {}
+
+    @classmethod
+    def get(cls, pose_library_name, bone_names):
+        action = bpy.data.actions[pose_library_name]
+        stamp = actionChangeStamp(action)
+
+        key = (pose_library_name, tuple(bone_names))
+        library = cls.s_libraries.get(key)
+        if(library != None and library.maybe_edited and library.stamp == stamp):
+            library.maybe_edited = False
+            if(library.values_hash != actionValuesHash(action)):
+                library = None
+        if(library == None or library.stamp != stamp):
+            library = PoseLibrary(action, bone_names, stamp)
+            cls.s_libraries[key] = library
+
+        return library
+
+    @staticmethod
+    @persistent
+    def updateHandler(scene):
+        """scene_update_post handler. Marks the libraries of the actions updated by Blender, e.g., by editing their keyframes."""
+        actions = bpy.data.actions
+        if(not actions.is_updated):
+            return
+        for (pose_library_name, bone_names), library in PoseLibraryCache.s_libraries.items():
+            action = actions.get(pose_library_name)
+            if(action != None and action.is_updated):
+                library.maybe_edited = True
+
+    @staticmethod
+    @persistent
+    def loadHandler(dummy):
+        """load_post handler. The actions of another file might have the same names and structure."""
+        PoseLibraryCache.reset()
+
+    @classmethod
+    def reset(cls):
+        """Forgets all the libraries. They will be parsed again at the next get()."""
+        cls.s_libraries = {}
 
 
 
@@ -1022,29 +1262,85 @@ finger_closed_db = {
 pinch_needed_set = ('d','f','o')
 
 
+# The number of bits of the flags returned by getHandBitFlag(), and all their combinations.
+HAND_FLAGS_BITS = 6
+HAND_FLAGS_COMBINATIONS = 1 << HAND_FLAGS_BITS
+HAND_FLAGS_MASK = HAND_FLAGS_COMBINATIONS - 1
+
+
+def isPoseCompatible(pose_name, flags):
+    """True if the pose can be selected with the given hand bit flags, according to the finger_open_db and finger_closed_db."""
+
+    # if the pose is in the finger OPEN db, the finger MUST be open. if it is not, we skip the pose.
+    if(pose_name in finger_open_db):
+        need_open_flags = finger_open_db[pose_name]
+        #print(pose_name+" ->\t{0:b}".format(need_open_flags))
+        # if some flag is missing, skip it!
+        if( (need_open_flags & flags) != need_open_flags):
+            return False
+
+    # if the pose is in the finger CLOSE db, the finger MUST be close. if it is not, we skip the pose.
+    if(pose_name in finger_closed_db):
+        need_close_flags = finger_closed_db[pose_name]
+        if( (need_close_flags & (~flags)) != need_close_flags):
+            return False
+
+    # if(pose_name in pinch_needed_set):
+    #     if((flags & 0b100000) != 0b100000):
+    #         return False
+
+    return True
+
+
+def pinItem(items, item, index, candidates=None):
+    """Moves the item within the list, so that it is at the given index among the items in candidates (all the items, if None)."""
+    items.remove(item)
+    count = 0
+    for i, other in enumerate(items):
+        if(count == index):
+            items.insert(i, item)
+            return
+        if(candidates == None or other in candidates):
+            count += 1
+    items.append(item)
+
+
+def buildCandidatesIndex(pose_names):
+    """Returns a list of HAND_FLAGS_COMBINATIONS entries. The entry of each bit flag is the tuple of the compatible poses, in the given order.
+    So, filtering the poses for a hand is a lookup: index[getHandBitFlag(hand_id, leap_frame)]."""
+    return [ tuple(name for name in pose_names if isPoseCompatible(name, flags)) for flags in range(HAND_FLAGS_COMBINATIONS) ]
+
+
 # returns the bitflag as needed by the finger extension dictionary.
-def getHandBitFlag(hand_id, leap_dict):
+# The flags are computed once per frame, and stored in the frame for the other consumers.
+def getHandBitFlag(hand_id, leap_frame):
+    key = ("HandBitFlag", hand_id)
+    out = leap_frame.derived.get(key)
+    if(out == None):
+        out = computeHandBitFlag(leap_frame.getHand(hand_id))
+        leap_frame.derived[key] = out
+    return out
+
+
+def computeHandBitFlag(hand):
     out = 0
 
-    pointables = leap_dict['pointables']
-    # Scan each pointable
-    for p in pointables:
-        # If it pertains to this hand
-        if(p['handId'] == hand_id):
-            # if it is extended
-            if( p['extended'] ):
-                # merge the flag
-                # the 'type' is the ordered finger number (0=thumb, 1=index, ...)
-                out |= 1 << p['type'] 
+    if(hand == None):
+        return out
+
+    # Scan each pointable of this hand
+    for p in hand.pointables:
+        # if it is extended
+        if( p.extended ):
+            # merge the flag
+            # the 'type' is the ordered finger number (0=thumb, 1=index, ...)
+            out |= 1 << p.type 
 
     # check for lasso
-    for h in leap_dict['hands']:
-        # if it is the correct hand
-        if(h['id'] == hand_id):
-            pinch_str = h['pinchStrength']
-            # we decide a threshold
-            if(pinch_str > 0.95):
-                out |= 0b100000
+    pinch_str = hand.pinchStrength
+    # we decide a threshold
+    if(pinch_str > 0.95):
+        out |= 0b100000
 
 
     return out
@@ -1062,26 +1358,26 @@ EDIT_MODES = ['Pose']
 # store keymaps here to access after registration
 hand_selection_keymap_items = []
 
-icon_pointing_finger = None
-icon_pointing_finger_missing = None
+# The file names of the icons, drawn from the Icons.atlas
+ICON_POINTING_FINGER = "1-finger-point-left-icon-red.png"
+ICON_POINTING_FINGER_MISSING = "1-finger-point-left-icon-red-missing.png"
 
 
 def register():
-    global icon_pointing_finger
-    global icon_pointing_finger_missing
-
     # Register properties
     bpy.types.WindowManager.leap_hand_shape_selector_finger_extension_filter = bpy.props.BoolProperty(name="Finger Extension Filter", description="Extending or retracting the fingers filter out the number of available letters to show in the hand dhape selector.", default=False, options={'SKIP_SAVE'})
+    bpy.types.WindowManager.leap_hand_shape_selector_recognition = bpy.props.BoolProperty(name="Hand Shape Recognition", description="The hand shape selector lists first the shapes most similar to the one of the tracked hand. Taken into account when the selector starts.", default=False, options={'SKIP_SAVE'})
 
     # Register classes
     bpy.utils.register_class(HandShapeSelector)
+
+    bpy.app.handlers.scene_update_post.append(PoseLibraryCache.updateHandler)
+    bpy.app.handlers.load_post.append(PoseLibraryCache.loadHandler)
     
     #
     # LOAD ICONS
-    image = loadImageEventually(image_file="1-finger-point-left-icon-red.png")
-    icon_pointing_finger = bgl.Buffer(bgl.GL_FLOAT, len(image.pixels), image.pixels)
-    image = loadImageEventually(image_file="1-finger-point-left-icon-red-missing.png")
-    icon_pointing_finger_missing = bgl.Buffer(bgl.GL_FLOAT, len(image.pixels), image.pixels)
+    Icons.loadIcon(ICON_POINTING_FINGER)
+    Icons.loadIcon(ICON_POINTING_FINGER_MISSING)
     
     
     # handle the keymap
@@ -1099,9 +1395,6 @@ def register():
     pass
 
 def unregister():
-    global icon_pointing_finger
-    global icon_pointing_finger_missing
-
     # handle the keymap
     for km, kmi in hand_selection_keymap_items:
         km.hand_selection_keymap_items.remove(kmi)
@@ -1109,14 +1402,16 @@ def unregister():
 
     print("ok")
 
-    icon_pointing_finger = None
-    icon_pointing_finger_missing = None
+    bpy.app.handlers.scene_update_post.remove(PoseLibraryCache.updateHandler)
+    bpy.app.handlers.load_post.remove(PoseLibraryCache.loadHandler)
+    PoseLibraryCache.reset()
 
     # Unregister the class
     bpy.utils.unregister_class(HandShapeSelector)
 
     # Unregister properties
     del bpy.context.window_manager.leap_hand_shape_selector_finger_extension_filter
+    del bpy.context.window_manager.leap_hand_shape_selector_recognition
 
     pass
 
@@ -2,16 +2,13 @@ import bpy
 import bgl
 
 import os
+import array
 from bpy_extras import image_utils
 
 
 ICON_SIZE = 64
 
 
-# cache the names of already loaded images
-loaded_images_files = [img.name for img in bpy.data.images]
-
-        
 # Used for loading relative to the .blend file
 scene_dir = os.path.dirname(bpy.data.filepath)
 
@@ -31,15 +28,126 @@ def loadImageEventually(image_file):
         If the image is already loaded just return it.
     """
     
-    if(not image_file in loaded_images_files):
+    image = bpy.data.images.get(image_file)
+    if(image == None):
         print("Loading image from '" + image_file + "'")
         image = image_utils.load_image(imagepath=image_file, dirname=scene_dir+"/images/")
     else:
         print("Image '" + image_file + "' already loaded. Skipping...")
-        image = bpy.data.images[image_file]
     return image
 
 
+class IconAtlas:
+    """All the icons in a single GL texture, in a grid of ICON_SIZE x ICON_SIZE cells.
+    The pixels of each image are read once, when it is added.
+    Icons are drawn as textured quads, looking up their cell by file name, instead of sending their pixels with glDrawPixels at each redraw.
+
+    GL calls are valid only in the draw callbacks, so the texture is (re)uploaded by the first drawIcon() after some images were added.
+    For the same reason, the texture is never deleted explicitly (unregister() might run without a current GL context):
+    release() only forgets it, and it is freed with the GL context.
+    """
+
+    # Number of cells in each row of the texture
+    COLUMNS = 8
+
+    def __init__(self):
+        # file name -> flat RGBA pixels, bottom row first, as image.pixels
+        self.pixels = {}
+        # file name -> (u0, v0, u1, v1) texture coordinates of its cell
+        self.cells = {}
+        # The GL texture name, or None if not created yet
+        self.texture = None
+        # True if some image was added after the last upload
+        self.dirty = False
+
+    def addImage(self, image_file, image):
+        """Adds the image (a bpy.types.Image) to the atlas, with the given file name as key. Images already added are skipped."""
+        if(image_file in self.pixels):
+            return
+        if(tuple(image.size) != (ICON_SIZE, ICON_SIZE)):
+            print("Icon '" + image_file + "' is not " + str(ICON_SIZE) + "x" + str(ICON_SIZE) + ". Skipping...")
+            return
+        self.pixels[image_file] = array.array('f', image.pixels[:])
+        self.dirty = True
+
+    def upload(self):
+        """Packs all the images into a buffer, and uploads it as the texture. Must be called within a draw callback."""
+        n_rows = (len(self.pixels) + self.COLUMNS - 1) // self.COLUMNS
+        width = self.COLUMNS * ICON_SIZE
+        # Power of two size
+        height = ICON_SIZE
+        while(height < n_rows * ICON_SIZE):
+            height *= 2
+
+        buf = bgl.Buffer(bgl.GL_FLOAT, width * height * 4)
+        row_length = ICON_SIZE * 4
+        self.cells = {}
+        for cell_num, image_file in enumerate(sorted(self.pixels)):
+            pixels = self.pixels[image_file]
+            x = (cell_num % self.COLUMNS) * ICON_SIZE
+            y = (cell_num // self.COLUMNS) * ICON_SIZE
+            for row in range(ICON_SIZE):
+                start = ((y + row) * width + x) * 4
+                buf[start:start + row_length] = pixels[row * row_length:(row + 1) * row_length]
+            self.cells[image_file] = (x / width, y / height, (x + ICON_SIZE) / width, (y + ICON_SIZE) / height)
+
+        if(self.texture == None):
+            names = bgl.Buffer(bgl.GL_INT, 1)
+            bgl.glGenTextures(1, names)
+            self.texture = names[0]
+
+        bgl.glBindTexture(bgl.GL_TEXTURE_2D, self.texture)
+        # Icons are drawn at their size: no filtering, as glDrawPixels
+        bgl.glTexParameteri(bgl.GL_TEXTURE_2D, bgl.GL_TEXTURE_MIN_FILTER, bgl.GL_NEAREST)
+        bgl.glTexParameteri(bgl.GL_TEXTURE_2D, bgl.GL_TEXTURE_MAG_FILTER, bgl.GL_NEAREST)
+        bgl.glTexImage2D(bgl.GL_TEXTURE_2D, 0, bgl.GL_RGBA, width, height, 0, bgl.GL_RGBA, bgl.GL_FLOAT, buf)
+        bgl.glBindTexture(bgl.GL_TEXTURE_2D, 0)
+        self.dirty = False
+
+    def drawIcon(self, image_file, pos_x, pos_y, size=ICON_SIZE):
+        """Draws the icon with its bottom-left corner at pos_x, pos_y. The blending is left to the caller, as for glDrawPixels."""
+        if(self.dirty):
+            self.upload()
+
+        cell = self.cells.get(image_file)
+        if(cell == None):
+            return
+        u0, v0, u1, v1 = cell
+
+        bgl.glPushAttrib(bgl.GL_ENABLE_BIT|bgl.GL_TEXTURE_BIT)
+        bgl.glEnable(bgl.GL_TEXTURE_2D)
+        bgl.glBindTexture(bgl.GL_TEXTURE_2D, self.texture)
+        # The texture colors are not modulated by the current color
+        bgl.glTexEnvi(bgl.GL_TEXTURE_ENV, bgl.GL_TEXTURE_ENV_MODE, bgl.GL_REPLACE)
+
+        bgl.glBegin(bgl.GL_QUADS)
+        bgl.glTexCoord2f(u0, v0)
+        bgl.glVertex2f(pos_x, pos_y)
+        bgl.glTexCoord2f(u1, v0)
+        bgl.glVertex2f(pos_x + size, pos_y)
+        bgl.glTexCoord2f(u1, v1)
+        bgl.glVertex2f(pos_x + size, pos_y + size)
+        bgl.glTexCoord2f(u0, v1)
+        bgl.glVertex2f(pos_x, pos_y + size)
+        bgl.glEnd()
+
+        bgl.glPopAttrib()
+
+    def release(self):
+        """Forgets the texture, without GL calls. A new one will be uploaded at the next drawIcon()."""
+        self.texture = None
+        self.dirty = len(self.pixels) > 0
+
+
+# The atlas of all the icons of LeapNUI
+atlas = IconAtlas()
+
+
+def loadIcon(image_file):
+    """Loads the image, if needed, and adds it to the atlas. Afterwards, it can be drawn with drawIcon(image_file, ...)."""
+    atlas.addImage(image_file, loadImageEventually(image_file=image_file))
+
+
 def drawIcon(image_file, pos_x, pos_y):
     bgl.glPushClientAttrib(bgl.GL_CURRENT_BIT|bgl.GL_ENABLE_BIT)
 
@@ -47,10 +155,7 @@ def drawIcon(image_file, pos_x, pos_y):
     bgl.glEnable(bgl.GL_BLEND)
     bgl.glBlendFunc(bgl.GL_SRC_ALPHA, bgl.GL_ONE_MINUS_SRC_ALPHA)
 
-    bgl.glRasterPos2f(pos_x, pos_y)
-
-    buf = buffers[image_file]
-    bgl.glDrawPixels(ICON_SIZE, ICON_SIZE, bgl.GL_RGBA, bgl.GL_FLOAT, buf)
+    atlas.drawIcon(image_file, pos_x, pos_y)
 
     bgl.glPopClientAttrib()
 
@@ -58,24 +163,8 @@ def drawIcon(image_file, pos_x, pos_y):
 
 print("Loading Icons...")
 
-# A dictionary file -> image
-images = {} 
 for image_file in image_filenames:
-    image = loadImageEventually(image_file=image_file)            
-    images[image_file] = image
-                    
-
-
-# Convert them into GL Buffers (needed to draw the image)
-print("Converting Icons...")
-
-# A dictionary file -> GL Buffer
-buffers = {}
-for f, image in images.items():
-    print("Converting image '" + image.name + "'")
-    floats = image.pixels
-    buf = bgl.Buffer(bgl.GL_FLOAT, len(floats), floats)
-    buffers[f] = buf
+    loadIcon(image_file)
 
 print("Icons loaded.")
 
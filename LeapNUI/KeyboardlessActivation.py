@@ -103,6 +103,9 @@ class LeapInteractionConstants:
 #
 class LeapDictListener:
     
+    # The Leap frame fields read by newFrameReceived() and the HandMotionAnalyzer
+    LEAP_FIELDS = ("palmPosition", "palmVelocity")
+    
     def __init__(self):
     
         self.hand_selector = HandSelector()
@@ -113,7 +116,7 @@ class LeapDictListener:
         
         self.last_hand_id = None
         
-        self.last_dict_received = None
+        self.last_frame_received = None
     
         # end __init__
         
@@ -126,14 +129,14 @@ class LeapDictListener:
     def resetHandId(self):
         self.last_hand_id = None
     
-    def getLeapDict(self):
-        return self.last_dict_received
+    def getLeapFrame(self):
+        return self.last_frame_received
     
      
     
-    def newDictReceived(self, leap_dict):
+    def newFrameReceived(self, leap_frame):
     
-        self.last_dict_received = leap_dict
+        self.last_frame_received = leap_frame
     
 
         li = bpy.context.window_manager.leap_info
@@ -144,29 +147,29 @@ class LeapDictListener:
         li.hand_changed = False
         pinchStrength = 0
     
-        hand = self.hand_selector.select(leap_dict)
+        hand = self.hand_selector.select(leap_frame)
         if(hand != None):
-            #print("HHH ID "+str(hand["id"]))
-            if(hand["id"] != self.last_hand_id):
+            #print("HHH ID "+str(hand.id))
+            if(hand.id != self.last_hand_id):
                 li.hand_changed = True
                 self.hand_motion_analyzer.reset()
     
             self.hand_motion_analyzer.update(hand)
 
-            grabStrength = hand["grabStrength"]
+            grabStrength = hand.grabStrength
             #print("EXPLICIT UNGRASP ="+ str(li.explicitely_ungrasped))
             if(li.explicitely_ungrasped == False):
                 if(grabStrength < LeapInteractionConstants.GRAB_STRENGTH_DEACTIVATION_THRESHOLD):
                     li.explicitely_ungrasped = True
 
-            pinchStrength = hand["pinchStrength"]
-            confidence = hand["confidence"]
+            pinchStrength = hand.pinchStrength
+            confidence = hand.confidence
 
     
         #
         # Memories for next cycle
         if(hand != None):
-            self.last_hand_id = hand["id"]
+            self.last_hand_id = hand.id
         else:
             self.last_hand_id = None
             
@@ -182,20 +185,20 @@ class LeapDictListener:
                    
         if(li.isTracking() == False):
             if(hand != None):
-                #active_time = hand["timeVisible"]
-                #print(str(hand["id"]) + ": " + str(active_time))
+                #active_time = hand.timeVisible
+                #print(str(hand.id) + ": " + str(active_time))
                 
                 distant_from_last_drop = True
                 if(li.last_drop_pos!=None):
-                    curr_pos = mathutils.Vector(hand["palmPosition"])
+                    curr_pos = mathutils.Vector(hand.palmPosition)
                     dist = (curr_pos - li.last_drop_pos).length
                 
                     distant_from_last_drop = dist > LeapInteractionConstants.DROP_OFF_RADIUS_THRESHOLD_MM
                     #print("DISTANT ENOUGH? " + str(dist) + "\t" + str(distant_from_last_drop))
         
-                #n_fingers = HandMotionAnalyzer.countFingers(hand_id=hand["id"], leap_dict=leap_dict)
+                #n_fingers = HandMotionAnalyzer.countFingers(hand_id=hand.id, leap_frame=leap_frame)
 
-                palm_vel_xyz = hand["palmVelocity"]
+                palm_vel_xyz = hand.palmVelocity
                 palm_vel_vect = mathutils.Vector(palm_vel_xyz)
                 palm_vel = palm_vel_vect.length
 
@@ -279,7 +282,7 @@ class LeapDictListener:
                 pass
         
         
-        pass # end newDictReceived
+        pass # end newFrameReceived
     
 #
 # This class defines the listener for the LeapReceiver.
@@ -322,9 +325,9 @@ class KeyboardLessLogicModalListener:
 
         tracking_time = now - self.tracking_start
 
-        leap_dict = li.leap_listener.getLeapDict()
+        leap_frame = li.leap_listener.getLeapFrame()
         hand_id = li.leap_listener.getHandId()
-        hand = li.leap_listener.hand_selector.getHandFromId(hand_id, leap_dict)
+        hand = li.leap_listener.hand_selector.getHandFromId(hand_id, leap_frame)
 
         
         #if(hand == None or hand_changed):
@@ -391,7 +394,7 @@ class KeyboardLessLogicModalListener:
                 li.setTracking(False)
                 self.tracking_start = None
                 li.leap_listener.resetHandId()
-                li.last_drop_pos = mathutils.Vector(hand["palmPosition"])
+                li.last_drop_pos = mathutils.Vector(hand.palmPosition)
                 li.leap_listener.hand_motion_analyzer.reset()
                 li.logMessage("OFF Hand Stable")
                 print("Tracking DEACTIVATED (Hand stable)")
@@ -399,12 +402,12 @@ class KeyboardLessLogicModalListener:
 
 
 
-            grabStrength = hand["grabStrength"]
+            grabStrength = hand.grabStrength
             #print("GS="+str(grabStrength))
 
             # Available only since protocol v6
-            pinchStrength = hand["pinchStrength"]
-            confidence = hand["confidence"]
+            pinchStrength = hand.pinchStrength
+            confidence = hand.confidence
 
             #thr = (LeapInteractionConstants.PINCH_STRENGTH_DEACTIVATION_THRESHOLD * confidence)
             #print("Confidence "+str(confidence)+"\tpinchStr "+ str(pinchStrength) +"\tDeactivation thr="+str(thr))
@@ -436,7 +439,7 @@ class KeyboardLessLogicModalListener:
                 li.setTracking(False)
                 self.tracking_start = None
                 li.leap_listener.resetHandId()
-                li.last_drop_pos = mathutils.Vector(hand["palmPosition"])
+                li.last_drop_pos = mathutils.Vector(hand.palmPosition)
                 #op.hand_motion_analyzer.reset()
                 if grab_mode == LeapInteractionConstants.GRAB_MODE_TIMED:
                     reason = "Stable"
@@ -470,6 +473,7 @@ class LeapInfo:
 
     def __init__(self):
         self.leap_receiver = None
+        self.frame_consumer = None
         self.leap_listener = None
         
         # Run-time info
@@ -498,6 +502,8 @@ class LeapInfo:
         
     def start(self):
         self.leap_receiver = LeapReceiver.getSingleton()
+        self.frame_consumer = self.leap_receiver.createFrameConsumer("KeyboardlessActivation")
+        self.leap_receiver.requireFields(LeapDictListener.LEAP_FIELDS)
         self.leap_listener = LeapDictListener()
 
         self.dict_last_id = -1
@@ -507,26 +513,18 @@ class LeapInfo:
 
     def update(self):
         
-        # Local copy (Should be protected, but is atomic enough)
-        leap_dict = self.leap_receiver.leapDict
+        # Messages without a frame (e.g., the version message) don't produce a LeapFrame.
+        # The consumer returns each new frame only once.
+        leap_frame = self.frame_consumer.fetch()
         
         #print("update called on "+str(self))
-        #print(leap_dict)
-        if(leap_dict == None):
-            print("No Leap data yet...")
-            return
-
-        if(not "id" in leap_dict):
-            print("No id in dict (must be version frame...)")
-            return
-
-        new_id = leap_dict["id"]
-        # Check if the dictionary has been updated
-        if(new_id > self.dict_last_id):
-            #print("Old dict, skipping...")
-            self.dict_last_id = new_id
-
-            self.leap_listener.newDictReceived(leap_dict)
+        if(leap_frame == None):
+            if(self.frame_consumer.latest() == None):
+                print("No Leap data yet...")
+        else:
+            self.dict_last_id = leap_frame.id
+
+            self.leap_listener.newFrameReceived(leap_frame)
             
         # update log list
         now = time.time()
@@ -542,6 +540,10 @@ class LeapInfo:
         
     def stop(self):
         if(self.leap_receiver != None):
+            if(self.frame_consumer != None):
+                self.leap_receiver.releaseFrameConsumer(self.frame_consumer)
+                self.frame_consumer = None
+                self.leap_receiver.releaseFields(LeapDictListener.LEAP_FIELDS)
             self.leap_receiver.releaseSingleton()
             self.leap_receiver = None
 
@@ -0,0 +1,128 @@
+#The Sign Language Synthesis and Interaction Research Tools
+#    Copyright (C) 2014  Fabrizio Nunnari, Alexis Heloir, DFKI
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Decoder of the binary UDP packets sent by LeapForwarder/LeapStandaloneForwarder-v02.py when run with the "bin" option.
+
+    Packet layout (little endian). Keep in sync with the packing code of the forwarder.
+        header:     magic b'LEAP', version (H), n_hands (H), n_pointables (H), n_gestures (H), frame id (q), timestamp (q)
+        n_hands times:
+            id (i), type (B: 0=unknown, 1=right, 2=left), 3 padding bytes,
+            22 floats: palmPosition[3], palmVelocity[3], palmNormal[3], direction[3], elbow[3], wrist[3],
+                       grabStrength, pinchStrength, confidence, timeVisible
+        n_pointables times:
+            id (i), handId (i), type (b), flags (B: bit0=tool, bit1=extended), 2 padding bytes,
+            25 floats: length, tipPosition[3], tipVelocity[3], direction[3],
+                       btipPosition[3], mcpPosition[3], carpPosition[3], dipPosition[3], pipPosition[3]
+        n_gestures times:
+            id (i), type (B: see GESTURE_TYPES), state (B: see GESTURE_STATES), 2 padding bytes,
+            duration (q), first pointable id (i, -1 if none), first hand id (i, -1 if none), normal[3] (3 floats)
+"""
+
+import struct
+
+from .LeapFrame import LeapFrame
+from .LeapFrame import LeapHand
+from .LeapFrame import LeapPointable
+from .LeapFrame import LeapGesture
+
+
+MAGIC = b'LEAP'
+FORMAT_VERSION = 1
+
+HEADER_STRUCT = struct.Struct('<4sHHHHqq')
+HAND_STRUCT = struct.Struct('<iB3x22f')
+POINTABLE_STRUCT = struct.Struct('<iibB2x25f')
+GESTURE_STRUCT = struct.Struct('<iBB2xqii3f')
+
+# Large enough for any packet: the Leap tracks at most a few hands.
+MAX_PACKET_SIZE = 65536
+
+HAND_TYPES = (None, "right", "left")
+GESTURE_TYPES = (None, "circle", "swipe", "keyTap", "screenTap")
+GESTURE_STATES = (None, "start", "update", "stop")
+
+
+def unpackFrame(buf, nbytes):
+    """Decodes the packet stored in the first nbytes of buf (a bytearray or memoryview) into a LeapFrame.
+    Returns None if the packet is not valid."""
+    if(nbytes < HEADER_STRUCT.size):
+        return None
+
+    magic, version, n_hands, n_pointables, n_gestures, frame_id, timestamp = HEADER_STRUCT.unpack_from(buf, 0)
+    if(magic != MAGIC or version != FORMAT_VERSION):
+        print("Unknown Leap binary packet (version " + str(version) + ")")
+        return None
+
+    expected_size = HEADER_STRUCT.size + n_hands * HAND_STRUCT.size + n_pointables * POINTABLE_STRUCT.size + n_gestures * GESTURE_STRUCT.size
+    if(nbytes < expected_size):
+        print("Truncated Leap binary packet (" + str(nbytes) + " < " + str(expected_size) + ")")
+        return None
+
+    frame = LeapFrame(frame_id, timestamp)
+    offset = HEADER_STRUCT.size
+
+    for _ in range(n_hands):
+        v = HAND_STRUCT.unpack_from(buf, offset)
+        offset += HAND_STRUCT.size
+        # Build the record without a dictionary
+        hand = LeapHand.__new__(LeapHand)
+        hand.id = v[0]
+        hand.type = HAND_TYPES[v[1]] if v[1] < len(HAND_TYPES) else None
+        hand.palmPosition = v[2:5]
+        hand.palmVelocity = v[5:8]
+        hand.palmNormal = v[8:11]
+        hand.direction = v[11:14]
+        hand.elbow = v[14:17]
+        hand.wrist = v[17:20]
+        hand.grabStrength, hand.pinchStrength, hand.confidence, hand.timeVisible = v[20:24]
+        hand.pointables = []
+        frame.addHand(hand)
+
+    for _ in range(n_pointables):
+        v = POINTABLE_STRUCT.unpack_from(buf, offset)
+        offset += POINTABLE_STRUCT.size
+        p = LeapPointable.__new__(LeapPointable)
+        p.id = v[0]
+        p.handId = v[1]
+        p.type = v[2]
+        p.tool = bool(v[3] & 1)
+        p.extended = bool(v[3] & 2)
+        p.length = v[4]
+        p.tipPosition = v[5:8]
+        p.tipVelocity = v[8:11]
+        p.direction = v[11:14]
+        p.btipPosition = v[14:17]
+        p.mcpPosition = v[17:20]
+        p.carpPosition = v[20:23]
+        p.dipPosition = v[23:26]
+        p.pipPosition = v[26:29]
+        frame.addPointable(p)
+
+    for _ in range(n_gestures):
+        v = GESTURE_STRUCT.unpack_from(buf, offset)
+        offset += GESTURE_STRUCT.size
+        g = LeapGesture.__new__(LeapGesture)
+        g.id = v[0]
+        g.type = GESTURE_TYPES[v[1]] if v[1] < len(GESTURE_TYPES) else None
+        g.state = GESTURE_STATES[v[2]] if v[2] < len(GESTURE_STATES) else None
+        g.duration = v[3]
+        g.pointableIds = [v[4]] if v[4] != -1 else []
+        g.handIds = [v[5]] if v[5] != -1 else []
+        g.normal = v[6:9]
+        frame.gestures.append(g)
+
+    return frame
@@ -0,0 +1,378 @@
+#The Sign Language Synthesis and Interaction Research Tools
+#    Copyright (C) 2014  Fabrizio Nunnari, Alexis Heloir, DFKI
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+    Compact representation of a Leap Motion frame.
+    The LeapReceiver thread converts each decoded JSON dictionary into a LeapFrame,
+    so that the Blender modal operators only have to perform attribute lookups.
+
+    Optionally, messages can be decoded by a LeapSelectiveParser, which skips the fields not declared in a LeapFieldRegistry.
+
+    This module doesn't depend on Blender. Run it as a script to benchmark the frame decoding:
+        python LeapFrame.py [Leap-LOG-xxx.log]
+    where the optional log file is recorded with LeapForwarder/LeapRecorder.py
+"""
+
+import json
+import time
+import sys
+
+
+class LeapHand:
+    """A hand, with the same field names used in the Leap JSON protocol.
+    Vectors are kept as the lists decoded from JSON."""
+
+    __slots__ = ("id", "type", "palmPosition", "palmVelocity", "palmNormal", "direction",
+                 "elbow", "wrist", "grabStrength", "pinchStrength", "confidence", "timeVisible",
+                 "pointables")
+
+    def __init__(self, d):
+        self.id = d["id"]
+        self.type = d.get("type")
+        self.palmPosition = d.get("palmPosition")
+        self.palmVelocity = d.get("palmVelocity")
+        self.palmNormal = d.get("palmNormal")
+        self.direction = d.get("direction")
+        self.elbow = d.get("elbow")
+        self.wrist = d.get("wrist")
+        self.grabStrength = d.get("grabStrength", 0.0)
+        self.pinchStrength = d.get("pinchStrength", 0.0)
+        self.confidence = d.get("confidence", 0.0)
+        self.timeVisible = d.get("timeVisible", 0.0)
+        # The pointables of this hand. Filled by the LeapFrame.
+        self.pointables = []
+
+
+class LeapPointable:
+    """A finger or a tool, with the same field names used in the Leap JSON protocol."""
+
+    __slots__ = ("id", "handId", "type", "tool", "extended", "length",
+                 "tipPosition", "tipVelocity", "direction",
+                 "btipPosition", "mcpPosition", "carpPosition", "dipPosition", "pipPosition")
+
+    def __init__(self, d):
+        self.id = d["id"]
+        self.handId = d.get("handId", -1)
+        self.type = d.get("type")
+        self.tool = d.get("tool", False)
+        self.extended = d.get("extended", False)
+        self.length = d.get("length", 0.0)
+        self.tipPosition = d.get("tipPosition")
+        self.tipVelocity = d.get("tipVelocity")
+        self.direction = d.get("direction")
+        self.btipPosition = d.get("btipPosition")
+        self.mcpPosition = d.get("mcpPosition")
+        self.carpPosition = d.get("carpPosition")
+        self.dipPosition = d.get("dipPosition")
+        self.pipPosition = d.get("pipPosition")
+
+
+class LeapGesture:
+    """A gesture, with the same field names used in the Leap JSON protocol."""
+
+    __slots__ = ("id", "type", "state", "duration", "pointableIds", "handIds", "normal")
+
+    def __init__(self, d):
+        self.id = d["id"]
+        self.type = d.get("type")
+        self.state = d.get("state")
+        self.duration = d.get("duration", 0)
+        self.pointableIds = d.get("pointableIds", [])
+        self.handIds = d.get("handIds", [])
+        self.normal = d.get("normal")
+
+
+class LeapFrame:
+    """A Leap frame. Hands and pointables are indexed by id, and hands also by type (right/left)."""
+
+    __slots__ = ("id", "timestamp", "hands", "pointables", "gestures",
+                 "handsById", "pointablesById", "rightHand", "leftHand", "derived")
+
+    def __init__(self, frame_id, timestamp=0):
+        self.id = frame_id
+        self.timestamp = timestamp
+        self.hands = []
+        self.pointables = []
+        self.gestures = []
+        self.handsById = {}
+        self.pointablesById = {}
+        self.rightHand = None
+        self.leftHand = None
+        # Values computed from this frame by its consumers, e.g., the hand bit flags of the HandShapeSelector.
+        # The same frame is fetched by all the consumers, so each value is computed once per frame.
+        self.derived = {}
+
+    @classmethod
+    def fromDict(cls, leap_dict):
+        """Builds a frame from a decoded Leap JSON dictionary.
+        Returns None for the messages not containing a frame (e.g., the initial version message)."""
+        if(not "id" in leap_dict):
+            return None
+
+        frame = cls(leap_dict["id"], leap_dict.get("timestamp", 0))
+
+        # Skipped fields are decoded as None by the LeapSelectiveParser
+        for h in leap_dict.get("hands") or ():
+            frame.addHand(LeapHand(h))
+
+        for p in leap_dict.get("pointables") or ():
+            frame.addPointable(LeapPointable(p))
+
+        for g in leap_dict.get("gestures") or ():
+            frame.gestures.append(LeapGesture(g))
+
+        return frame
+
+    def addHand(self, hand):
+        self.hands.append(hand)
+        self.handsById[hand.id] = hand
+        if(hand.type == "right"):
+            self.rightHand = hand
+        elif(hand.type == "left"):
+            self.leftHand = hand
+
+    def addPointable(self, pointable):
+        """Hands must be added before their pointables."""
+        self.pointables.append(pointable)
+        self.pointablesById[pointable.id] = pointable
+        hand = self.handsById.get(pointable.handId)
+        if(hand != None):
+            hand.pointables.append(pointable)
+
+    def getHand(self, hand_id):
+        """Returns the hand with the given id, or None."""
+        return self.handsById.get(hand_id)
+
+    def getPointable(self, pointable_id):
+        """Returns the pointable with the given id, or None."""
+        return self.pointablesById.get(pointable_id)
+
+
+#
+# SELECTIVE PARSING
+#
+
+# The fields of the v6 frames that the LeapSelectiveParser can skip, if no consumer needs them.
+# Only arrays and objects are worth skipping: they hold most of the numbers to decode.
+# Each field is mapped to the string closing its value in the compact JSON sent by the Leap service.
+# Fields are skipped by name, in any object: e.g., "direction" is skipped for hands, pointables and gestures.
+SKIPPABLE_FIELDS = {
+    # frame
+    "interactionBox": "]}",
+    "r": "]]",
+    "t": "]",
+    "gestures": "}]",
+    # hands
+    "armBasis": "]]",
+    "sphereCenter": "]",
+    "stabilizedPalmPosition": "]",
+    "palmPosition": "]",
+    "palmVelocity": "]",
+    "palmNormal": "]",
+    "direction": "]",
+    "elbow": "]",
+    "wrist": "]",
+    # pointables
+    "bases": "]]]",
+    "tipPosition": "]",
+    "tipVelocity": "]",
+    "stabilizedTipPosition": "]",
+    "btipPosition": "]",
+    "carpPosition": "]",
+    "dipPosition": "]",
+    "mcpPosition": "]",
+    "pipPosition": "]",
+}
+
+
+class LeapSelectiveParser:
+    """Decodes a Leap JSON message skipping the given fields, which are decoded as None.
+    The values of skipped fields are cut out of the message text with str methods (running in C),
+    so that json.loads has to convert much fewer numbers."""
+
+    def __init__(self, skipped_fields):
+        self.skipped_fields = frozenset(skipped_fields)
+        # (tag, replacement, value end, length of value end) for each skipped field
+        self.cuts = [ ('"%s":' % f, '"%s":null' % f, SKIPPABLE_FIELDS[f], len(SKIPPABLE_FIELDS[f])) for f in sorted(self.skipped_fields) ]
+
+    def strip(self, msg):
+        """Returns the message where the values of the skipped fields are replaced by null."""
+        for tag, null_tag, end, end_len in self.cuts:
+            pieces = msg.split(tag)
+            if(len(pieces) == 1):
+                continue
+            # Each piece after the first begins with the value to cut. Empty arrays have no closing string to look for.
+            msg = null_tag.join([pieces[0]] + [ p[2:] if p.startswith("[]") else p[p.find(end) + end_len:] for p in pieces[1:] ])
+        return msg
+
+    def parse(self, msg):
+        try:
+            return json.loads(self.strip(msg))
+        except ValueError:
+            # Unexpected layout (e.g., a non compact JSON). Decode everything.
+            return json.loads(msg)
+
+
+class LeapFieldRegistry:
+    """Collects the fields needed by the active frame consumers.
+    Each consumer requires its fields when it starts and releases them when it finishes.
+    Fields not listed in SKIPPABLE_FIELDS (ids, types, scalars, ...) are always decoded."""
+
+    def __init__(self):
+        # field name -> number of consumers requiring it
+        self.counts = {}
+
+    def require(self, fields):
+        for f in fields:
+            self.counts[f] = self.counts.get(f, 0) + 1
+
+    def release(self, fields):
+        for f in fields:
+            if(self.counts.get(f, 0) > 1):
+                self.counts[f] -= 1
+            elif(f in self.counts):
+                del self.counts[f]
+
+    def requiredFields(self):
+        return set(self.counts.keys())
+
+    def createParser(self):
+        """Returns a LeapSelectiveParser skipping all the skippable fields not required."""
+        return LeapSelectiveParser(set(SKIPPABLE_FIELDS.keys()) - self.requiredFields())
+
+
+#
+# BENCHMARK
+#
+
+def _syntheticFrameDict(frame_id):
+    """Returns a v6-like dictionary with two hands and ten fingers, including the bones arrays."""
+
+    def vec(k):
+        return [k * 1.1, 200.0 + k, -k * 0.7]
+
+    hands = []
+    pointables = []
+    for hand_n, hand_type in enumerate(("right", "left")):
+        hand_id = frame_id * 2 + hand_n
+        hands.append({"id": hand_id, "type": hand_type,
+                      "palmPosition": vec(1), "palmVelocity": vec(2), "palmNormal": vec(3), "direction": vec(4),
+                      "elbow": vec(5), "wrist": vec(6), "armBasis": [vec(7), vec(8), vec(9)], "armWidth": 60.0,
+                      "r": [vec(10), vec(11), vec(12)], "s": 1.0, "t": vec(13), "sphereCenter": vec(14), "sphereRadius": 80.0,
+                      "stabilizedPalmPosition": vec(15), "grabStrength": 0.2, "pinchStrength": 0.1, "confidence": 0.9, "timeVisible": 1.5})
+        for finger_type in range(5):
+            pointables.append({"id": hand_id * 10 + finger_type, "handId": hand_id, "type": finger_type,
+                               "tool": False, "extended": finger_type != 0, "length": 50.0, "width": 18.0,
+                               "tipPosition": vec(20), "tipVelocity": vec(21), "direction": vec(22),
+                               "stabilizedTipPosition": vec(23), "touchDistance": 0.3, "touchZone": "none", "timeVisible": 1.5,
+                               "btipPosition": vec(24), "carpPosition": vec(25), "dipPosition": vec(26),
+                               "mcpPosition": vec(27), "pipPosition": vec(28),
+                               "bases": [[vec(29), vec(30), vec(31)] for _ in range(4)]})
+
+    return {"id": frame_id, "timestamp": frame_id * 10000, "currentFrameRate": 110.0,
+            "hands": hands, "pointables": pointables, "gestures": [],
+            "interactionBox": {"center": vec(40), "size": vec(41)},
+            "r": [vec(42), vec(43), vec(44)], "s": 1.0, "t": vec(45)}
+
+
+def loadMessages(log_filename=None, n_frames=1000):
+    """Returns a list of JSON messages, either read from a LeapRecorder log (one message per line) or synthetic."""
+    if(log_filename != None):
+        with open(log_filename) as f:
+            return [line for line in f if line.strip() != ""]
+
+    return [json.dumps(_syntheticFrameDict(i), separators=(",", ":")) for i in range(1, n_frames + 1)]
+
+
+def _consumeDict(leap_dict):
+    """What the controllers did at each tick with the raw dictionaries."""
+    if(not 'hands' in leap_dict):
+        return 0.0
+    rhand = None
+    lhand = None
+    for h in leap_dict["hands"]:
+        if(h["type"] == "right"):
+            rhand = h
+        elif(h["type"] == "left"):
+            lhand = h
+    acc = 0.0
+    for hand in (rhand, lhand):
+        if(hand == None):
+            continue
+        acc += hand["palmPosition"][1] + hand["direction"][0] + hand["palmNormal"][2] + hand["grabStrength"]
+    for p in leap_dict["pointables"]:
+        if(rhand != None and p["handId"] == rhand["id"]):
+            acc += p["length"] + p["btipPosition"][0] + p["mcpPosition"][0] + p["type"]
+    return acc
+
+
+def _consumeFrame(leap_frame):
+    """The same work of _consumeDict(), on a LeapFrame."""
+    acc = 0.0
+    rhand = leap_frame.rightHand
+    for hand in (rhand, leap_frame.leftHand):
+        if(hand == None):
+            continue
+        acc += hand.palmPosition[1] + hand.direction[0] + hand.palmNormal[2] + hand.grabStrength
+    if(rhand != None):
+        for p in rhand.pointables:
+            acc += p.length + p.btipPosition[0] + p.mcpPosition[0] + p.type
+    return acc
+
+
+# The fields required by the MakeHuman hands and fingers direct controllers
+BENCHMARK_REQUIRED_FIELDS = ("palmPosition", "direction", "palmNormal", "btipPosition", "mcpPosition")
+
+
+def benchmark(messages, repeat=5):
+    """Prints the per-frame cost, in microseconds, of the dict and of the LeapFrame paths.
+    Decoding happens in the receiver thread, consumption in the Blender modal timer."""
+
+    def best_of(fn):
+        best = None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            t = time.perf_counter() - t0
+            if(best == None or t < best):
+                best = t
+        return best * 1e6 / len(messages)
+
+    dicts = [json.loads(m) for m in messages]
+    frames = [LeapFrame.fromDict(d) for d in dicts]
+    frames = [f for f in frames if f != None]
+
+    registry = LeapFieldRegistry()
+    registry.require(BENCHMARK_REQUIRED_FIELDS)
+    parser = registry.createParser()
+
+    t_json = best_of(lambda: [json.loads(m) for m in messages])
+    t_selective = best_of(lambda: [parser.parse(m) for m in messages])
+    t_build = best_of(lambda: [LeapFrame.fromDict(d) for d in dicts])
+    t_use_dict = best_of(lambda: [_consumeDict(d) for d in dicts])
+    t_use_frame = best_of(lambda: [_consumeFrame(f) for f in frames])
+
+    print("frames: %d" % len(messages))
+    print("receiver thread - json.loads:         %8.2f us/frame" % t_json)
+    print("receiver thread - selective parse:    %8.2f us/frame (%.2fx, keeping %s)" % (t_selective, t_json / t_selective, ", ".join(BENCHMARK_REQUIRED_FIELDS)))
+    print("receiver thread - LeapFrame.fromDict: %8.2f us/frame" % t_build)
+    print("modal timer     - dict consumers:     %8.2f us/frame" % t_use_dict)
+    print("modal timer     - frame consumers:    %8.2f us/frame" % t_use_frame)
+
+
+if __name__ == "__main__":
+    log_filename = sys.argv[1] if len(sys.argv) > 1 else None
+    benchmark(loadMessages(log_filename))
@@ -78,6 +78,10 @@ from LeapNUI.LeapReceiver import CircleGestureSelector
 
 from MakeHumanTools.BoneSet import *
 
+from DeviceScheduler.DeviceScheduler import DeviceScheduler
+
+from LeapNUI.OnlineSimplifier import OnlineSimplifier
+
 
 # Blender specific
 import bpy
@@ -94,11 +98,12 @@ import json
 from math import radians    # to convert degrees to radians
 from math import pi
 from math import sqrt
-#import time
+import time
 import re
 
 
-# Delay between TIMER events when entering the modal command mode. In seconds.
+# Nominal delay between updates, in seconds. Used as time step when the real one is not known yet.
+# The actual update rate is decided by the DeviceScheduler.
 UPDATE_DELAY = 0.04
 
 
@@ -131,6 +136,9 @@ rot_long_leap_to_blender_rotmat = long_leap_to_blender_rotmat.to_quaternion()
 
 class ObjectTranslator:
     
+    # The Leap frame fields read by update()
+    LEAP_FIELDS = ("tipPosition", "palmPosition")
+    
     # The object that will be translated by the Leap
     target_object = None
     
@@ -255,22 +263,22 @@ class ObjectTranslator:
         return new_loc
     
     
-    def update(self, leap_dict):
+    def update(self, leap_frame):
         """Takes as input the python dict with the leap infomation"""
         
         
         if(self.use_finger):
-            pointable = self.pointable_selector.select(leap_dict)
+            pointable = self.pointable_selector.select(leap_frame)
             if(pointable == None):
                 return
             
-            pos = mathutils.Vector(pointable["tipPosition"])
+            pos = mathutils.Vector(pointable.tipPosition)
         else:
-            hand = self.hand_selector.select(leap_dict)
+            hand = self.hand_selector.select(leap_frame)
             if(hand == None):
                 return
             
-            pos = mathutils.Vector(hand["palmPosition"])
+            pos = mathutils.Vector(hand.palmPosition)
 
         if(self.pointable_last_location == None):
             self.pointable_last_location = pos
@@ -287,7 +295,7 @@ class ObjectTranslator:
         # RECORD (eventually)
         if(bpy.context.scene.tool_settings.use_keyframe_insert_auto):
             frame = bpy.context.scene.frame_current
-            self.target_object.keyframe_insert(data_path="location", frame=frame)
+            OnlineSimplifier.record(self.target_object, "location", frame)
 
 
         pass # end update
@@ -298,6 +306,9 @@ class ObjectTranslator:
 
 class ObjectRotator:
     
+    # The Leap frame fields read by update()
+    LEAP_FIELDS = ("direction", "palmNormal")
+    
     # The object that will be translated by the Leap
     target_object = None
     
@@ -358,14 +369,14 @@ class ObjectRotator:
     def restore(self):
         self.target_object.rotation_quaternion = self.target_start_rotation
     
-    def update(self, leap_dict):
+    def update(self, leap_frame):
         
         if(self.use_finger):
-            pointable = self.pointable_selector.select(leap_dict)
+            pointable = self.pointable_selector.select(leap_frame)
             if(pointable == None):
                 return
             
-            dir = mathutils.Vector(pointable["direction"])
+            dir = mathutils.Vector(pointable.direction)
             
             if(self.pointable_start_direction == None):
                 self.pointable_start_direction = mathutils.Vector(dir)
@@ -375,12 +386,12 @@ class ObjectRotator:
         
         else:   # Use hand palm
             
-            hand = self.hand_selector.select(leap_dict)
+            hand = self.hand_selector.select(leap_frame)
             if(hand == None):
                 return
             
-            h_x = mathutils.Vector(hand["direction"])
-            h_y = mathutils.Vector(hand["palmNormal"])
+            h_x = mathutils.Vector(hand.direction)
+            h_y = mathutils.Vector(hand.palmNormal)
             h_z = h_x.cross(h_y)
             
             # Build the rotation matrix using the data of the 3 orthogonal vectors (hand direction, palm normal, and their outgoing cross product)
@@ -441,7 +452,7 @@ class ObjectRotator:
         # RECORD (eventually)
         if(bpy.context.scene.tool_settings.use_keyframe_insert_auto):
             frame = bpy.context.scene.frame_current
-            self.target_object.keyframe_insert(data_path="rotation_quaternion", frame=frame)
+            OnlineSimplifier.record(self.target_object, "rotation_quaternion", frame)
     
 
         pass # end update
@@ -459,6 +470,9 @@ class FingerCircleElbowSwivelRotator:
         of the bones to take from the armature are stored statically in this class.
         """
     
+    # The Leap frame fields read by update()
+    LEAP_FIELDS = ("gestures", "tipVelocity")
+    
     
     # The MakeHuman armature that will be analyses to adjust the elbow
     target_object = None
@@ -511,6 +525,7 @@ class FingerCircleElbowSwivelRotator:
         
         
         print("STORING ELBOW CONTROLLER")
+        self.last_update_time = None
         self.elbow_control_initial_location = mathutils.Matrix(self.target_object.pose.bones[self.ELBOW_CONTROL].matrix)
         
         
@@ -530,18 +545,21 @@ class FingerCircleElbowSwivelRotator:
     
     
     last_duration = None
+
+    # Time of the last applied rotation, to compute the time step
+    last_update_time = None
     
-    def update(self, leap_dict):
+    def update(self, leap_frame):
         if(self.target_object == None):
             return
         
         
-        gesture = self.gesture_selector.select(leap_dict)
+        gesture = self.gesture_selector.select(leap_frame)
         if(gesture == None):
             #print("NO GES")
             return
         
-        duration = int(gesture["duration"])
+        duration = int(gesture.duration)
         
         if(self.last_duration == None):
             self.last_duration = duration
@@ -551,19 +569,25 @@ class FingerCircleElbowSwivelRotator:
             return
     
         self.last_duration = duration
+
+        now = time.time()
+        dt = UPDATE_DELAY
+        if(self.last_update_time != None):
+            dt = min(now - self.last_update_time, UPDATE_DELAY * 2)
+        self.last_update_time = now
         
         
         # Calculate the vector between the shoulder and the wrist
         rotation_axis = self.wrist_location - self.shoulder_location
-        pointable_id = gesture["pointableIds"][0]   # we take only one ID for circle gestures.
-        pointables = [p for p in leap_dict["pointables"] if p["id"] == pointable_id]
-        assert(len(pointables) > 0)
-        tipVelocity = pointables[0]["tipVelocity"]
+        pointable_id = gesture.pointableIds[0]   # we take only one ID for circle gestures.
+        pointable = leap_frame.getPointable(pointable_id)
+        assert(pointable != None)
+        tipVelocity = pointable.tipVelocity
         tipVelocity = mathutils.Vector(tipVelocity).length
-        angle = tipVelocity * UPDATE_DELAY * 0.005
+        angle = tipVelocity * dt * 0.005
         #print(tipVelocity, angle)
         
-        normal = mathutils.Vector(gesture["normal"])
+        normal = mathutils.Vector(gesture.normal)
         #print("normal="+str(normal))
         if(normal.z < 0):   # cloclwise rotation
             angle = -angle
@@ -584,7 +608,7 @@ class FingerCircleElbowSwivelRotator:
         #
         # Eventually, insert the keyframes
         if(bpy.context.scene.tool_settings.use_keyframe_insert_auto):
-            self.target_object.pose.bones[self.ELBOW_CONTROL].keyframe_insert(data_path='location', frame=bpy.context.scene.frame_current)
+            OnlineSimplifier.record(self.target_object.pose.bones[self.ELBOW_CONTROL], 'location', bpy.context.scene.frame_current)
 
 
         pass # end update
@@ -698,6 +722,9 @@ WRIST_TO_HAND_OFFSET_R = mathutils.Vector((-WRIST_TO_HAND_OFFSET_L[0], WRIST_TO_
 
 class MakeHumanHandsDirectController:
     
+    # The Leap frame fields read by update()
+    LEAP_FIELDS = ("direction", "palmNormal", "palmPosition")
+
     LEAP_BASE_HEIGHT = 1.20
 
     # Quaternion to align the left hand of the character to a frontal position.
@@ -751,23 +778,10 @@ class MakeHumanHandsDirectController:
         self.target_armature.pose.bones[MH_HAND_CONTROLLER_L].location = self.l_wrist_initial_loc
         pass
     
-    def update(self, leap_dict):
+    def update(self, leap_frame):
         
-        if(not 'hands' in leap_dict):
-            return None
-
-
-        rhand = None
-        lhand = None
-
-        hands = leap_dict["hands"]
-
-        # Take the indices of right and left hands
-        for h in hands:
-            if(h["type"] == "right"):
-                rhand = h
-            elif(h["type"] == "left"):
-                lhand = h
+        rhand = leap_frame.rightHand
+        lhand = leap_frame.leftHand
 
 
         if(self.isMirrored):
@@ -798,8 +812,8 @@ class MakeHumanHandsDirectController:
             # When the hand is straight over the Leap, the resulting quaternion must be Identity.
             # This calc is made in Leap/OpenGL axes space.
             if(self.enableRotation):
-                h_z = - mathutils.Vector(hand["direction"])
-                h_y = - mathutils.Vector(hand["palmNormal"])
+                h_z = - mathutils.Vector(hand.direction)
+                h_y = - mathutils.Vector(hand.palmNormal)
                 h_x = h_y.cross(h_z)
                 
                 # Build the rotation matrix of the hand using the data of the 3 orthogonal vectors (hand direction, palm normal, and their outgoing cross product)
@@ -828,7 +842,7 @@ class MakeHumanHandsDirectController:
             # POSITION
             #
 
-            pos = mathutils.Vector(hand["palmPosition"])
+            pos = mathutils.Vector(hand.palmPosition)
 
             # Scale from millimeters to decimeters in MakeHuman space
             pos *= 0.01
@@ -859,8 +873,8 @@ class MakeHumanHandsDirectController:
             if(bpy.context.scene.tool_settings.use_keyframe_insert_auto):
                 frame = bpy.context.scene.frame_current
                 if(self.enableRotation):
-                    hand_controller.keyframe_insert(data_path="rotation_quaternion", frame=frame)
-                hand_controller.keyframe_insert(data_path="location", frame=frame)
+                    OnlineSimplifier.record(hand_controller, "rotation_quaternion", frame)
+                OnlineSimplifier.record(hand_controller, "location", frame)
             
 
         pass # end update
@@ -872,6 +886,9 @@ class MakeHumanHandsDirectController:
 # This class takes the information about finger extension in the Leap Dictionary and maps it to the Finger controllers fo the MakeHuman character
 class MakeHumanFingersDirectController:
 
+    # The Leap frame fields read by update()
+    LEAP_FIELDS = ("btipPosition", "mcpPosition")
+
     isMirrored = False
     
     target_armature = None
@@ -911,28 +928,15 @@ class MakeHumanFingersDirectController:
             self.target_armature.pose.bones[cname].rotation_quaternion = q
 
     
-    def update(self, leap_dict):
+    def update(self, leap_frame):
         
-        if(not 'hands' in leap_dict):
-            return None
-    
-
         # Infer which hand is left and which is right
-        hands = leap_dict["hands"]
-
-        rhand_id = None
-        lhand_id = None
-
-        # Take the indices of right and left hands
-        for h in hands:
-            if(h["type"] == "right"):
-                rhand_id = h["id"]
-            elif(h["type"] == "left"):
-                lhand_id = h["id"]
+        rhand = leap_frame.rightHand
+        lhand = leap_frame.leftHand
 
         # If we work in mirror mode, let's swap them
         if(self.isMirrored):
-            rhand_id, lhand_id = lhand_id, rhand_id
+            rhand, lhand = lhand, rhand
 
 
         # type()
@@ -943,24 +947,20 @@ class MakeHumanFingersDirectController:
         # 3 = TYPE_RING
         # 4 = TYPE_PINKY
 
-        # Gather reference to fingers
-        for p in leap_dict["pointables"]:
-            finger_type = p["type"]
-            #print("pointable "+str(finger_type)+" of hand "+str(p["handId"]))
-
-            handId = p["handId"]
-            if(handId==rhand_id):
-                target_hand_id = rhand_id
-                # names of the finger controllers, ordered as indexes by the leap SDK "type" attribute, from thumb to pink.
-                controller_names = MH_HAND_CONTROLLERS_R
-            elif(handId == lhand_id):
-                target_hand_id = lhand_id
-                controller_names = MH_HAND_CONTROLLERS_L
-            else:
-                # If the hand is neither the left nor the right one (maybe for slightly visible fingers or pointables), then skip everything.
-                continue
+        # Gather reference to fingers.
+        # Pointables of hands that are neither the left nor the right one (maybe for slightly visible fingers or pointables) are skipped.
+        # names of the finger controllers, ordered as indexes by the leap SDK "type" attribute, from thumb to pink.
+        hand_fingers = []
+        if(rhand != None):
+            hand_fingers += [(p, MH_HAND_CONTROLLERS_R) for p in rhand.pointables]
+        if(lhand != None):
+            hand_fingers += [(p, MH_HAND_CONTROLLERS_L) for p in lhand.pointables]
 
-            finger_length = p["length"]
+        for p, controller_names in hand_fingers:
+            finger_type = p.type
+            #print("pointable "+str(finger_type)+" of hand "+str(p.handId))
+
+            finger_length = p.length
             if(finger_length == 0):
                 continue
 
@@ -969,8 +969,8 @@ class MakeHumanFingersDirectController:
 
             # btipPosition – position of the extreme end of the distal phalanx as an array of 3 floating point numbers.
             # mcpPosition - The physical position of the metacarpophalangeal joint, or knuckle, of the finger. This position is the joint between the metacarpal and proximal phalanx bones.
-            finger_tip_pos = mathutils.Vector(p["btipPosition"])
-            finger_base_pos = mathutils.Vector(p["mcpPosition"])
+            finger_tip_pos = mathutils.Vector(p.btipPosition)
+            finger_base_pos = mathutils.Vector(p.mcpPosition)
             distance = (finger_tip_pos - finger_base_pos).length
             extension_ratio = distance / finger_length
 
@@ -986,7 +986,7 @@ class MakeHumanFingersDirectController:
                 controller_ratio = extension_ratio / FINGER_LENGTH_TO_DISTANCE_RATIO
 
 
-            #if(p["type"] == 1):
+            #if(p.type == 1):
             #print(finger_length, finger_base_pos, finger_tip_pos, distance,  extension_ratio, controller_ratio)
 
             # clamp
@@ -1010,7 +1010,7 @@ class MakeHumanFingersDirectController:
             # RECORD (eventually)
             if(bpy.context.scene.tool_settings.use_keyframe_insert_auto):
                 frame = bpy.context.scene.frame_current
-                controller.keyframe_insert(data_path="rotation_quaternion", frame=frame)
+                OnlineSimplifier.record(controller, "rotation_quaternion", frame)
 
 
 
@@ -1020,6 +1020,9 @@ class MakeHumanFingersDirectController:
 
 class MakeHumanElbowsDirectController:
 
+    # The Leap frame fields read by update()
+    LEAP_FIELDS = ("elbow", "wrist")
+
     isMirrored = False
     
     target_armature = None
@@ -1056,31 +1059,14 @@ class MakeHumanElbowsDirectController:
         self.elbow_l.location = self.l_elbow_initial_pos
 
     
-    def update(self, leap_dict):
+    def update(self, leap_frame):
         
-        if(not 'hands' in leap_dict):
-            return None
-    
         # Infer which hand is left and which is right
-        hands = leap_dict["hands"]
-
-        rhand_id = None
-        rhand = None
-        lhand_id = None
-        lhand = None
-
-        # Take the indices of right and left hands
-        for h in hands:
-            if(h["type"] == "right"):
-                rhand = h
-                rhand_id = h["id"]
-            elif(h["type"] == "left"):
-                lhand = h
-                lhand_id = h["id"]
+        rhand = leap_frame.rightHand
+        lhand = leap_frame.leftHand
 
         # If we work in mirror mode, let's swap them
         if(self.isMirrored):
-            rhand_id, lhand_id = lhand_id, rhand_id
             rhand, lhand = lhand, rhand
 
 
@@ -1093,8 +1079,8 @@ class MakeHumanElbowsDirectController:
                 continue
 
             # Get the vector from the wrist to the elbow, in Leap space.
-            elbow_pos = mathutils.Vector(hand["elbow"])
-            wrist_pos = mathutils.Vector(hand["wrist"])
+            elbow_pos = mathutils.Vector(hand.elbow)
+            wrist_pos = mathutils.Vector(hand.wrist)
             wrist_to_elbow_vect = elbow_pos - wrist_pos
             wrist_to_elbow_vect.normalize()   # get only the unitary direction
 
@@ -1115,7 +1101,7 @@ class MakeHumanElbowsDirectController:
             # RECORD (eventually)
             if(bpy.context.scene.tool_settings.use_keyframe_insert_auto):
                 frame = bpy.context.scene.frame_current                
-                elbow_controller.keyframe_insert(data_path="location", frame=frame)
+                OnlineSimplifier.record(elbow_controller, "location", frame)
 
 
 
@@ -1172,6 +1158,8 @@ class LeapModal(bpy.types.Operator):
     
     
     leap_receiver = None    # The network receiving thread
+    frame_consumer = None   # To read each new frame of the receiving thread only once
+    leap_fields = ()        # The frame fields required by the active controllers
     
     # Controllers / Updaters
     obj_translator = ObjectTranslator()
@@ -1181,11 +1169,12 @@ class LeapModal(bpy.types.Operator):
     fingers_direct_controller = MakeHumanFingersDirectController()
     elbows_direct_controller = MakeHumanElbowsDirectController()
     
-    timer = None
+    # Set by updateControllers() when a listener asks to finish. The modal will then finish at its next event.
+    listener_result = None
     
     
     def __init__(self):
-        self._timer = None
+        self._device = None
         self._draw_handle = None
         pass
 
@@ -1200,8 +1189,8 @@ class LeapModal(bpy.types.Operator):
 
     def addHandlers(self, context):
         #
-        # TIMER
-        self._timer = context.window_manager.event_timer_add(UPDATE_DELAY, context.window)
+        # DEVICE (updated by the shared DeviceScheduler timer)
+        self._device = DeviceScheduler.addDevice(context, "Leap", self.hasNewFrame, self.updateControllers)
 
         #
         # DRAW
@@ -1215,10 +1204,10 @@ class LeapModal(bpy.types.Operator):
         print("Removing handlers...")
         
         #
-        # TIMER
-        if(self._timer != None):
-            bpy.context.window_manager.event_timer_remove(self._timer)
-            self._timer = None
+        # DEVICE
+        if(self._device != None):
+            DeviceScheduler.removeDevice(self._device)
+            self._device = None
 
         #
         # DRAW
@@ -1237,6 +1226,9 @@ class LeapModal(bpy.types.Operator):
     #
     # Return enum set in {‘RUNNING_MODAL’, ‘CANCELLED’, ‘FINISHED’, ‘PASS_THROUGH’}
     def execute(self, context):
+
+        # A new recording session: do not simplify across the previous one
+        OnlineSimplifier.reset()
         
         area=bpy.context.area
         # print("Area " + str(area.type))
@@ -1405,6 +1397,9 @@ class LeapModal(bpy.types.Operator):
         
         print("Acquiring LeapReceiver...")
         self.leap_receiver = LeapReceiver.getSingleton()
+        self.frame_consumer = self.leap_receiver.createFrameConsumer("LeapModal")
+        self.leap_fields = self.getActiveControllersFields()
+        self.leap_receiver.requireFields(self.leap_fields)
         
         #self.report({'WARNING'}, "Leap started!") # anyway, won't be displayed before exiting the modal command.
         
@@ -1436,6 +1431,18 @@ class LeapModal(bpy.types.Operator):
 
             return self.cancel(context)
         
+        # A listener asked to finish during the last controllers update
+        if(self.listener_result != None):
+            res = self.listener_result
+            self.listener_result = None
+            self.report({'INFO'}, "Leap control finished by listener")
+            for l in LeapModal.modalCallbacks:
+                if( hasattr(l, 'finished')):
+                    l.finished(self, context)
+            self.stop_leap_receiver()
+            self.removeHandlers()
+            return res
+
         # If an invocation key is selected again, we stop the operator
 #        if(event.type == TRANSLATION_SHORTCUT_CHAR
 #           or event.type == ROTATION_SHORTCUT_CHAR
@@ -1466,49 +1473,64 @@ class LeapModal(bpy.types.Operator):
                     if( hasattr(l, 'finished')):
                         l.finished(self, context)
                 return self.cancel(context)
+
+            # The DeviceScheduler dropped the device after an error in updateControllers()
+            if(self._device != None and self._device.failed):
+                self.report({'ERROR'}, "Leap control stopped by an error")
+                for l in LeapModal.modalCallbacks:
+                    if( hasattr(l, 'finished')):
+                        l.finished(self, context)
+                return self.cancel(context)
             
             
-            #
-            # Update all active controllers
-            leap_info = self.leap_receiver.getLeapDict()
-            if(leap_info != None):
-                if(self.isTranslating):
-                    self.obj_translator.update(leap_info)
-                
-                if(self.isRotating):
-                    self.obj_rotator.update(leap_info)
-                
-                if(self.isElbowSwivelRotating):
-                    self.elbow_swivel_rotator.update(leap_info)
-                
-                if(self.isHandsDirectlyControlled):
-                    self.hands_direct_controller.update(leap_info)
+            # The controllers are updated by the DeviceScheduler (see updateControllers()). Let it receive the TIMER events.
+            return {'PASS_THROUGH'}
 
-                if(self.isFingersDirectlyControlled):
-                    self.fingers_direct_controller.update(leap_info)
+        return {'RUNNING_MODAL'}
+    
+    #
+    # DEVICE UPDATE
+    #
+    def hasNewFrame(self):
+        return self.frame_consumer != None and self.frame_consumer.hasNewFrame()
 
-                if(self.isElbowsDirectlyControlled):
-                    self.elbows_direct_controller.update(leap_info)
+    def updateControllers(self, context):
+        """Called by the DeviceScheduler when a new Leap frame is available. Returns True if the scene changed."""
+        leap_info = self.frame_consumer.fetch()
+        if(leap_info == None):
+            return False
 
-            #
-            # Update modal listeners
-            #print("Updating " + str(len(LeapModal.modalCallbacks)) + " callbacks")
-            for l in LeapModal.modalCallbacks:
-                res = l.controllersUpdated(self, context)
-                if(res != None):
-                    self.report({'INFO'}, "Leap control finished by listener")
-                    for l in LeapModal.modalCallbacks:
-                        if( hasattr(l, 'finished')):
-                            l.finished(self, context)
+        #
+        # Update all active controllers
+        if(self.isTranslating):
+            self.obj_translator.update(leap_info)
+        
+        if(self.isRotating):
+            self.obj_rotator.update(leap_info)
+        
+        if(self.isElbowSwivelRotating):
+            self.elbow_swivel_rotator.update(leap_info)
+        
+        if(self.isHandsDirectlyControlled):
+            self.hands_direct_controller.update(leap_info)
 
+        if(self.isFingersDirectlyControlled):
+            self.fingers_direct_controller.update(leap_info)
+
+        if(self.isElbowsDirectlyControlled):
+            self.elbows_direct_controller.update(leap_info)
+
+        #
+        # Update modal listeners
+        #print("Updating " + str(len(LeapModal.modalCallbacks)) + " callbacks")
+        for l in LeapModal.modalCallbacks:
+            res = l.controllersUpdated(self, context)
+            if(res != None):
+                self.listener_result = res
+                break
+
+        return True
 
-                    self.stop_leap_receiver()
-                    self.removeHandlers()
-                    return res
-    
-    
-        return {'RUNNING_MODAL'}
-    
     #
     #
     # Listeners management
@@ -1576,9 +1598,27 @@ class LeapModal(bpy.types.Operator):
     #
 
 
+    def getActiveControllersFields(self):
+        """Returns the list of Leap frame fields needed by the active controllers."""
+        fields = []
+        for active, controller in [ (self.isTranslating, self.obj_translator),
+                                    (self.isRotating, self.obj_rotator),
+                                    (self.isElbowSwivelRotating, self.elbow_swivel_rotator),
+                                    (self.isHandsDirectlyControlled, self.hands_direct_controller),
+                                    (self.isFingersDirectlyControlled, self.fingers_direct_controller),
+                                    (self.isElbowsDirectlyControlled, self.elbows_direct_controller) ]:
+            if(active):
+                fields.extend(controller.LEAP_FIELDS)
+        return fields
+
     def stop_leap_receiver(self):
         if(self.leap_receiver != None):
             print("Releasing LeapReceiver ...")
+            if(self.frame_consumer != None):
+                self.leap_receiver.releaseFrameConsumer(self.frame_consumer)
+                self.frame_consumer = None
+            self.leap_receiver.releaseFields(self.leap_fields)
+            self.leap_fields = ()
             self.leap_receiver.releaseSingleton()
             self.leap_receiver = None
     
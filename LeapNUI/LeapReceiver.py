@@ -22,6 +22,7 @@ import threading
 import json
 import math
 import time
+import array
 
 
 # Extras
@@ -29,6 +30,11 @@ import websocket
 import socket
 import struct   # to pack/unpack data from udp messages
 
+# From this module
+from LeapNUI.LeapFrame import LeapFrame
+from LeapNUI.LeapFrame import LeapFieldRegistry
+from LeapNUI import LeapBinaryFrame
+
 
 
 
@@ -44,6 +50,86 @@ LISTENING_PORT = 6437
 # Set it to true to use the new protocol introduced with Leap SDK v2 (full hand, named finger tips, all joints, ...)
 USE_PROTOCOL_V6 = True
 
+# If set to true (and USE_UDP_SOCKET is true), the forwarder is expected to send binary packets
+# (run it with the "bin" option). They are decoded directly into LeapFrames, without any JSON parsing.
+# In this mode, the listeners and getLeapDict() receive no dictionary.
+USE_BINARY_UDP = False
+
+# If set to true, only the fields required by the active consumers (see LeapReceiver.requireFields()) are decoded.
+# The other big fields (bones, interaction box, gestures, ...) are left to None.
+# Set it to false to decode all the fields of each frame.
+USE_SELECTIVE_PARSING = True
+
+#
+#
+#
+
+class LeapFrameMailbox:
+    """Single-producer/multi-consumer mailbox holding only the latest LeapFrame (latest frame wins).
+    The producer (the receiving thread) replaces the content with a new (sequence_number, frame) tuple.
+    Replacing and reading a single attribute is atomic in CPython, so no locks are needed.
+    Each reader gets its own LeapFrameConsumer, which remembers the last sequence number it has read.
+    """
+
+    def __init__(self):
+        self.slot = (0, None)
+        self.consumers = []
+
+    def post(self, frame):
+        """To be called only by the producer thread."""
+        seq = self.slot[0] + 1
+        self.slot = (seq, frame)
+
+    def createConsumer(self, name):
+        consumer = LeapFrameConsumer(self, name)
+        self.consumers.append(consumer)
+        return consumer
+
+    def removeConsumer(self, consumer):
+        if(consumer in self.consumers):
+            self.consumers.remove(consumer)
+
+
+class LeapFrameConsumer:
+    """Reads the frames of a LeapFrameMailbox, getting each frame at most once.
+    Frames replaced in the mailbox before the consumer could read them are dropped (and counted).
+    Reads finding no new frame are counted as duplicates.
+    """
+
+    def __init__(self, mailbox, name):
+        self.mailbox = mailbox
+        self.name = name
+        self.last_seq = None
+        self.received = 0
+        self.dropped = 0
+        self.duplicates = 0
+
+    def fetch(self):
+        """Returns the newest frame, or None if there is no frame newer than the last fetched one."""
+        seq, frame = self.mailbox.slot
+        if(frame == None or seq == self.last_seq):
+            self.duplicates += 1
+            return None
+
+        # Frames posted before the first fetch are not counted as dropped
+        if(self.last_seq != None):
+            self.dropped += seq - self.last_seq - 1
+        self.last_seq = seq
+        self.received += 1
+        return frame
+
+    def hasNewFrame(self):
+        """Returns True if fetch() would return a frame. Does not mark it as read."""
+        seq, frame = self.mailbox.slot
+        return frame != None and seq != self.last_seq
+
+    def latest(self):
+        """Returns the newest frame, without marking it as read. Can be None."""
+        return self.mailbox.slot[1]
+
+    def statsString(self):
+        return "%s: received=%d dropped=%d duplicates=%d" % (self.name, self.received, self.dropped, self.duplicates)
+
 #
 #
 #
@@ -53,12 +139,24 @@ class LeapReceiver(threading.Thread):
     Remember that Blender is not thread safe: we cannot invoke bpy methods in a separate thread.
     This thread will only collect the Leap Data and store the decoded python dictionary in a local variable.
     Usage:
+        leap_receiver = LeapReceiver.getSingleton()
+        frame_consumer = leap_receiver.createFrameConsumer("MyOperator")
+        ...
+        while(i_need):
+            leap_frame = frame_consumer.fetch()
+            if(leap_frame != None):
+                do_stuff_with(leap_frame)
+        ...
+        leap_receiver.releaseFrameConsumer(frame_consumer)
+        LeapReceiver.releaseSingleton()
+
+    or, with the old flag-based interface:
         leap_receiver = LeapReceiver()
         leap_receiver.start()
         ...
         while(i_need):
             if(leap_receiver.newDict):
-                do_stuff_with(leap_receiver.getLeapDict())
+                do_stuff_with(leap_receiver.getLeapFrame())
                 leap_receiver.markDictAsRead()
         ...
         leap_receiver.terminate()
@@ -71,7 +169,7 @@ class LeapReceiver(threading.Thread):
         ...
         while(i_need):
             leap_receiver.update()
-            do_stuff_with(leap_receiver.getLeapDict())
+            do_stuff_with(leap_receiver.getLeapFrame())
         ...
         leap_receiver.disconnect()
     """
@@ -152,6 +250,9 @@ class LeapReceiver(threading.Thread):
     # Will hold the decoded python dictionary. Updated at each leap message reception
     leapDict = None
 
+    # Will hold the LeapFrame built from the last dictionary containing a frame.
+    leapFrame = None
+
     # Will be set to true everytime a new dictionary is received
     # Readers can set it to False to avoid reading duplicates
     newDict = False
@@ -159,6 +260,44 @@ class LeapReceiver(threading.Thread):
     # list of listeners. Listeners must provide a function newDictReceived(dictionary) that will be called each time a new dictionary is received.
     listeners = []
 
+    def __init__(self):
+        threading.Thread.__init__(self)
+        # Every new LeapFrame is posted here for the consumers
+        self.mailbox = LeapFrameMailbox()
+        # Fields needed by the consumers, and the parser skipping all the others
+        self.field_registry = LeapFieldRegistry()
+        self.parser = None
+        if(USE_SELECTIVE_PARSING):
+            self.parser = self.field_registry.createParser()
+        # Preallocated buffer for the binary UDP packets, filled in place by recv_into()
+        self.recv_buffer = None
+        self.recv_view = None
+        if(USE_UDP_SOCKET and USE_BINARY_UDP):
+            self.recv_buffer = bytearray(LeapBinaryFrame.MAX_PACKET_SIZE)
+            self.recv_view = memoryview(self.recv_buffer)
+
+    def createFrameConsumer(self, name):
+        return self.mailbox.createConsumer(name)
+
+    def requireFields(self, fields):
+        """Declares the (JSON) fields of the frames needed by a consumer. They must be released with releaseFields()."""
+        self.field_registry.require(fields)
+        self._updateParser()
+
+    def releaseFields(self, fields):
+        self.field_registry.release(fields)
+        self._updateParser()
+
+    def _updateParser(self):
+        if(USE_SELECTIVE_PARSING):
+            # Replacing the reference is atomic for the receiving thread
+            self.parser = self.field_registry.createParser()
+
+    def releaseFrameConsumer(self, consumer):
+        """Removes the consumer from the mailbox and prints its statistics."""
+        print("LeapReceiver frames " + consumer.statsString())
+        self.mailbox.removeConsumer(consumer)
+
     def addListener(self, l):
         self.listeners.append(l)
     
@@ -169,6 +308,9 @@ class LeapReceiver(threading.Thread):
     def getLeapDict(self):
         return self.leapDict
 
+    def getLeapFrame(self):
+        return self.leapFrame
+
     def _closeSock(self):
         if(self.sock != None):
             self.sock.close()
@@ -223,17 +365,37 @@ class LeapReceiver(threading.Thread):
         self.terminated = True
         
 
+    def updateBinary(self):
+        nbytes = self.sock.recv_into(self.recv_buffer)
+        frame = LeapBinaryFrame.unpackFrame(self.recv_view, nbytes)
+        if(frame != None):
+            self.leapFrame = frame
+            self.mailbox.post(frame)
+
     def update(self):
         # gather Leap data
         #print("Receiving")
 
+        if(self.recv_buffer != None):
+            self.updateBinary()
+            return
+
         if(USE_UDP_SOCKET):
             raw_msg = self.sock.recv(15000)
             msg = raw_msg.decode("utf-8")
         else:
             msg = self.sock.recv()
         
-        self.leapDict = json.loads(msg)
+        parser = self.parser
+        if(parser != None):
+            self.leapDict = parser.parse(msg)
+        else:
+            self.leapDict = json.loads(msg)
+        # Build the frame here, in the receiving thread, rather than in the Blender modal timers
+        frame = LeapFrame.fromDict(self.leapDict)
+        if(frame != None):
+            self.leapFrame = frame
+            self.mailbox.post(frame)
         self.newDict = True
         for l in self.listeners:
             l.newDictReceived(self.leapDict)
@@ -273,31 +435,17 @@ class HandSelector:
         """
 
     @staticmethod
-    def getHandFromId(id, leap_dict):
-        if(not 'hands' in leap_dict):
-            return None
-        
-        hands = leap_dict["hands"]
-        
-        for hand in hands:
-            if( hand["id"] == id):
-                return hand
-        
-        return None
+    def getHandFromId(id, leap_frame):
+        return leap_frame.getHand(id)
 
 
     last_hand_id = None
     
-    def select(self, leap_dict):
+    def select(self, leap_frame):
         """Return the most appropriate hand according to previous selection.
             Returns None if no hands where found."""
         
-        
-        if(not 'hands' in leap_dict):
-            print("NO HANDS")
-            return None
-        
-        hands = leap_dict["hands"]
+        hands = leap_frame.hands
         
         if (len(hands) < 1):
             return None
@@ -307,21 +455,16 @@ class HandSelector:
         # if there were no hand since last reset, take the first available
         if(self.last_hand_id == None):
             hand = hands[0]
-            self.last_hand_id = int(hand["id"])
+            self.last_hand_id = int(hand.id)
             #print("FIRST HAND FOUND ID="+str(self.last_hand_id))
             #print(str(hands))
         else:   #there was a finger in previous message. Try to use the same.
-            for h in hands:
-                id = int(h["id"])
-                if(id == self.last_hand_id):
-                    hand = h
-                    #print("PREVIOUS POINTABLE RETRIEVED ID=" + str(id))
-                    break ;
+            hand = leap_frame.getHand(self.last_hand_id)
             # If the previous hand is not anymore recognized, take again the first one
             # TODO -- instead of taking the first available, store the coordinates of the previous hand and choose the closest one!
             if(hand == None):
                 hand = hands[0]
-                self.last_hand_id = int(hand["id"])
+                self.last_hand_id = int(hand.id)
                 #print("NEW HAND SELECTED ID="+str(self.last_hand_id))
                 #print(str(hands))
         
@@ -340,20 +483,15 @@ class PointableSelector:
     
     last_pointable_id = None
     
-    def select(self, leap_dict):
+    def select(self, leap_frame):
         """Return the most appropriate finger according to previous selection.
             Returns None if no pointables where found."""
         
-        
-        if(not 'pointables' in leap_dict):
-            print("NO POINTABLES")
-            return None
-        
-        all_pointables = leap_dict["pointables"]
+        all_pointables = leap_frame.pointables
         
         
         # Remove pointables with no hand associated. They ceate some false positive detections.
-        pointables = [p for p in all_pointables if p["handId"] != -1]
+        pointables = [p for p in all_pointables if p.handId != -1]
         
         if (len(pointables) < 1):
             return None
@@ -363,20 +501,18 @@ class PointableSelector:
         # if there were no pointables since last reset, take the first available
         if(self.last_pointable_id == None):
             pointable = pointables[0]
-            self.last_pointable_id = int(pointable["id"])
+            self.last_pointable_id = int(pointable.id)
             #print("FIRST POINTABLE FOUND ID="+str(self.last_pointable_id))
             #print(str(pointables))
         else:   #there was a finger in previous message. Try to use the same.
-            for p in pointables:
-                id = int(p["id"])
-                if(id == self.last_pointable_id):
-                    pointable = p
-                    #print("PREVIOUS POINTABLE RETRIEVED ID=" + str(id))
-                    break ;
+            p = leap_frame.getPointable(self.last_pointable_id)
+            if(p != None and p.handId != -1):
+                pointable = p
+                #print("PREVIOUS POINTABLE RETRIEVED ID=" + str(p.id))
             # If the previous pointable is not anymore recognized, take again the first one
             if(pointable == None):
                 pointable = pointables[0]
-                self.last_pointable_id = int(pointable["id"])
+                self.last_pointable_id = int(pointable.id)
                 #print("NEW POINTABLE SELECTED ID="+str(self.last_pointable_id))
                 #print(str(pointables))
         
@@ -402,18 +538,14 @@ class CircleGestureSelector:
     
     last_gesture_id = None
     
-    def select(self, leap_dict):
+    def select(self, leap_frame):
         """Returns the most recent circle gesture according to previous selection.
             Returns None, None if no hands where found."""
         
-        if(not 'gestures' in leap_dict):
-            #print("NO GESTURES")
-            return None
-        
-        all_gestures = leap_dict["gestures"]
+        all_gestures = leap_frame.gestures
         
         # Remove gestures not of type circle.
-        gestures = [g for g in all_gestures if g["type"] == "circle"]
+        gestures = [g for g in all_gestures if g.type == "circle"]
         #print(str(gestures))
         
         if (len(gestures) < 1):
@@ -424,12 +556,12 @@ class CircleGestureSelector:
         # if there were no hand since last reset, take the first available
         if(self.last_gesture_id == None):
             gesture = gestures[0]
-            self.last_gesture_id = int(gesture["id"])
+            self.last_gesture_id = int(gesture.id)
             print("FIRST GESTURE FOUND ID="+str(self.last_gesture_id))
             print(str(gestures))
         else:   #there was a finger in previous message. Try to use the same.
             for g in gestures:
-                id = int(g["id"])
+                id = int(g.id)
                 if(id == self.last_gesture_id):
                     gesture = g
                     #print("PREVIOUS POINTABLE RETRIEVED ID=" + str(id))
@@ -437,9 +569,9 @@ class CircleGestureSelector:
             # If the previous hand is not anymore recognized, take again the first one
             if(gesture == None):
                 gesture = gestures[0]
-                self.last_gesture_id = int(gesture["id"])
+                self.last_gesture_id = int(gesture.id)
                 print("NEW GESTURE SELECTED ID="+str(self.last_gesture_id))
-                print("state=" + gesture["state"])
+                print("state=" + gesture.state)
                 print(str(gestures))
         
         assert (gesture != None)
@@ -454,11 +586,11 @@ class CircleGestureSelector:
 class HandMotionAnalyzer:
 
     @staticmethod
-    def countFingers(hand_id, leap_dict):
+    def countFingers(hand_id, leap_frame):
         count = 0
-        for p in leap_dict["pointables"]:
-            if(p["tool"] == False
-                and p["handId"] == hand_id):
+        for p in leap_frame.pointables:
+            if(p.tool == False
+                and p.handId == hand_id):
                 count +=1
         
         return count
@@ -467,25 +599,97 @@ class HandMotionAnalyzer:
     #BUFFER_MAX_SIZE = 20
     BUFFER_MAX_AGE_SECS = 2
     
+    # Initial number of slots of the circular buffer.
+    # It is doubled if, at high frame rates, the samples within BUFFER_MAX_AGE_SECS don't fit anymore.
+    BUFFER_INITIAL_CAPACITY = 512
+    
     HAND_MAX_SPEED = 1000
     
     
     max_speed=0
     
     def __init__(self):
-        # Will contain a list of the last N valid positions of an hand
-        # Each element will be a tuple <time, position>
-        # Newer elements will be put in front.
-        self.positions_buffer = []
+        # The last N valid positions of an hand are stored in a circular buffer of parallel arrays.
+        # Slots are addressed from the newest (slot 0) to the oldest (slot size-1),
+        # just like the old list of <time, position> tuples where newer elements were put in front.
+        # For each slot, beside time and position, we store the running sums (of positions, squared positions and speeds)
+        # of all the samples received BEFORE it. The sums over any range of slots are then a simple difference.
+        self._allocBuffers(self.BUFFER_INITIAL_CAPACITY)
         
         # Initialize all variables
         self.reset()
 
+    def _allocBuffers(self, capacity):
+        self._capacity = capacity
+        self._times = array.array('d', bytes(8 * capacity))
+        # positions, relative to self._origin, to keep the running sums small
+        self._pos = [array.array('d', bytes(8 * capacity)) for _ in range(3)]
+        # per slot: sums of positions, squared positions and speeds of all the older samples
+        self._pos_sums = [array.array('d', bytes(8 * capacity)) for _ in range(3)]
+        self._sq_sums = [array.array('d', bytes(8 * capacity)) for _ in range(3)]
+        self._speed_sums = [array.array('d', bytes(8 * capacity)) for _ in range(3)]
+        # speed of each sample with respect to the previous one
+        self._speeds = [array.array('d', bytes(8 * capacity)) for _ in range(3)]
+
+    def _growBuffers(self):
+        """Doubles the capacity of the circular buffer, keeping the stored slots."""
+        old_arrays = [self._times] + self._pos + self._pos_sums + self._sq_sums + self._speed_sums + self._speeds
+        old_capacity = self._capacity
+        old_head = self._head
+        self._allocBuffers(old_capacity * 2)
+        new_arrays = [self._times] + self._pos + self._pos_sums + self._sq_sums + self._speed_sums + self._speeds
+        # Copy slots in oldest-to-newest order at the beginning of the new arrays
+        for old, new in zip(old_arrays, new_arrays):
+            for i in range(self._size):
+                new[i] = old[(old_head - self._size + 1 + i) % old_capacity]
+        self._head = self._size - 1
+
     def reset(self):
         self.buffer_lookback = 0
         self.hand_removed = False        
         self.is_hand_stable = False
-        del self.positions_buffer[:]
+        
+        # index, in the arrays, of the newest slot
+        self._head = -1
+        # number of valid slots
+        self._size = 0
+        self._origin = None
+        # running sums of all the samples received since the last reset
+        self._pos_total = [0.0, 0.0, 0.0]
+        self._sq_total = [0.0, 0.0, 0.0]
+        self._speed_total = [0.0, 0.0, 0.0]
+
+
+    @property
+    def positions_buffer(self):
+        """A list of <time, position> tuples, newest first. Built on request, for inspection only."""
+        return [ (self._times[self._index(i)], self._positionAt(i)) for i in range(self._size) ]
+
+    def _index(self, slot):
+        """Converts a slot number (0 = newest) into an index of the arrays."""
+        return (self._head - slot) % self._capacity
+
+    def _positionAt(self, slot):
+        i = self._index(slot)
+        ox,oy,oz = self._origin
+        return (self._pos[0][i] + ox, self._pos[1][i] + oy, self._pos[2][i] + oz)
+
+    def _sumsBefore(self, slot, sums, totals):
+        """Returns the running sums of the samples older than the given slot.
+        Slot -1 returns the sums of all samples."""
+        if(slot < 0):
+            return totals
+        i = self._index(slot)
+        return (sums[0][i], sums[1][i], sums[2][i])
+
+    def _rangeSums(self, i1, i2, sums, totals):
+        """Returns the sums over the slots in [i1,i2), with i1<i2."""
+        ax,ay,az = self._sumsBefore(i1-1, sums, totals)
+        bx,by,bz = self._sumsBefore(i2-1, sums, totals)
+        return ax-bx, ay-by, az-bz
+
+    def _clampRange(self, i1, i2):
+        return max(i1, 0), min(i2, self._size)
 
 
     def handRemoved(self):
@@ -507,23 +711,57 @@ class HandMotionAnalyzer:
             return False
      
 
+    def _push(self, t, p):
+        if(self._origin == None):
+            self._origin = (p[0], p[1], p[2])
+        
+        if(self._size == self._capacity):
+            self._growBuffers()
+
+        prev = self._head
+        self._head = (self._head + 1) % self._capacity
+        i = self._head
+        self._times[i] = t
+        
+        dt = t - self._times[prev] if self._size > 0 else 0.0
+        
+        for c in range(3):
+            v = p[c] - self._origin[c]
+            self._pos[c][i] = v
+            self._pos_sums[c][i] = self._pos_total[c]
+            self._sq_sums[c][i] = self._sq_total[c]
+            self._speed_sums[c][i] = self._speed_total[c]
+            
+            if(dt > 0):
+                s = (v - self._pos[c][prev]) / dt
+            else:
+                s = 0.0
+            self._speeds[c][i] = s
+            
+            self._pos_total[c] += v
+            self._sq_total[c] += v * v
+            self._speed_total[c] += s
+        
+        self._size += 1
+
+
     def update(self, hand):
         t = time.time()
         
         #
         # Store hand positions
-        p = hand["palmPosition"]
+        p = hand.palmPosition
         #print(str(p.__class__))
         
-        self.positions_buffer.insert( 0, (t,p) )
+        self._push(t, p)
         
         # Delete old data
-        while(len(self.positions_buffer) > 0):
+        while(self._size > 0):
             # time of the last element
-            insert_time = self.positions_buffer[len(self.positions_buffer)-1][0]
+            insert_time = self._times[self._index(self._size-1)]
             age = t - insert_time
             if(age > self.BUFFER_MAX_AGE_SECS):
-                self.positions_buffer.pop()
+                self._size -= 1
                 #print("rage "+str(age), end="")
             else:
                 break
@@ -531,7 +769,7 @@ class HandMotionAnalyzer:
         #
         # Calc average speed
         self.buffer_lookback += 1
-        self.buffer_lookback = min(self.buffer_lookback, len(self.positions_buffer))
+        self.buffer_lookback = min(self.buffer_lookback, self._size)
         
         sx,sy,sz = self.getAverageSpeedSlots(self.buffer_lookback-1)
         speed_vect = mathutils.Vector((sx,sy,sz))
@@ -561,22 +799,32 @@ class HandMotionAnalyzer:
         # choose the minimum among the counter and the required lookback
         self.buffer_lookback = min(lookback_slots, self.buffer_lookback)
 
-        #print("handspeed="+str(self.hand_speed)+"\tBufsize="+str(len(self.positions_buffer))+"\tLookbak Slots="+str(lookback_slots)+"\tbuffer_lookback="+str(self.buffer_lookback))
+        #print("handspeed="+str(self.hand_speed)+"\tBufsize="+str(self._size)+"\tLookbak Slots="+str(lookback_slots)+"\tbuffer_lookback="+str(self.buffer_lookback))
         
 
        
 
     def slotsWithinTime(self, time_range):
-        n = 0
-        latest_t = None
-        for t,p in self.positions_buffer: # array indices in reverse order
-            if(latest_t == None): latest_t = t
-            elapsed_t = latest_t - t
-            if(elapsed_t > time_range):
-                break
-            n += 1
+        """Returns the number of the most recent slots not older than time_range secs with respect to the newest one."""
+        return self._slotsWithinTime(time_range, False)
+
+    def _slotsWithinTime(self, time_range, strict):
+        # Times are monotonic, so it is a binary search.
+        if(self._size == 0):
+            return 0
+        
+        oldest_allowed_t = self._times[self._head] - time_range
+        lo = 0
+        hi = self._size
+        while(lo < hi):
+            mid = (lo + hi) // 2
+            t = self._times[self._index(mid)]
+            if(t < oldest_allowed_t or (strict and t == oldest_allowed_t)):
+                hi = mid
+            else:
+                lo = mid + 1
         
-        return n
+        return lo
 
     
     def handAge(self):
@@ -584,10 +832,8 @@ class HandMotionAnalyzer:
         Technically the difference between the first and the last time slots."""
         
         age = 0
-        if(len(self.positions_buffer)>=2):
-            oldest = self.positions_buffer[len(self.positions_buffer)-1]
-            latest = self.positions_buffer[0]
-            age = latest[0] - oldest[0]
+        if(self._size>=2):
+            age = self._times[self._head] - self._times[self._index(self._size-1)]
         
         return age
 
@@ -604,108 +850,54 @@ class HandMotionAnalyzer:
 
     def getPositionAverage(self):
         """Returns a tuple x,y,z with the average position over the whole buffer."""
-        n = 0
-        avg_x = 0
-        avg_y = 0
-        avg_z = 0
-        for t,p in self.positions_buffer:
-            n += 1
-            avg_x = avg_x + ( (p[0] - avg_x) / n )
-            avg_y = avg_y + ( (p[1] - avg_y) / n )
-            avg_z = avg_z + ( (p[2] - avg_z) / n )
-
-        #print("avg="+str(avg_x) + "\t" + str(avg_y) + "\t" + str(avg_z))
-        return avg_x, avg_y, avg_z
+        return self.getPositionAverageInSlotsRange(0, self._size)
 
 
     def getPositionAverageInRange(self, t1, t2):
         """Returns a tuple x,y,z with the average position over the specified time range, with t1<t2."""
-        n = 0
-        avg_x = 0
-        avg_y = 0
-        avg_z = 0
-        latest_t = None
-        for t,p in self.positions_buffer: # array indices in reverse order
-            n += 1
-            if(latest_t == None): latest_t = t
-            elapsed_t = latest_t - t
-            if(elapsed_t<t1):
-                continue
-            if(elapsed_t>t2):
-                break
-            #print("Addng " + str(t)+" : " + str(p))
-           
-            avg_x = avg_x + ( (p[0] - avg_x) / n )
-            avg_y = avg_y + ( (p[1] - avg_y) / n )
-            avg_z = avg_z + ( (p[2] - avg_z) / n )
-
-        #print("avg="+str(avg_x) + "\t" + str(avg_y) + "\t" + str(avg_z))
-        return avg_x, avg_y, avg_z
+        # slots with elapsed time < t1 are skipped, the ones up to t2 included
+        i1 = self._slotsWithinTime(t1, True)
+        i2 = self._slotsWithinTime(t2, False)
+        return self.getPositionAverageInSlotsRange(i1, i2)
 
 
     def getPositionAverageInSlotsRange(self, i1, i2):
         """Returns a tuple x,y,z with the average position over the specified time range, with i1<i2."""
-        n = 0
-        avg_x = 0
-        avg_y = 0
-        avg_z = 0
-        latest_t = None
-        for i in range(i1, i2): # array indices in reverse order
-            n += 1
-            t,p = self.positions_buffer[i]
-            if(latest_t == None): latest_t = t
-            elapsed_t = latest_t - t
-            #print("Addng " + str(t)+" : " + str(p))
-           
-            avg_x = avg_x + ( (p[0] - avg_x) / n )
-            avg_y = avg_y + ( (p[1] - avg_y) / n )
-            avg_z = avg_z + ( (p[2] - avg_z) / n )
+        i1, i2 = self._clampRange(i1, i2)
+        n = i2 - i1
+        if(n <= 0):
+            return 0, 0, 0
+        
+        sx,sy,sz = self._rangeSums(i1, i2, self._pos_sums, self._pos_total)
+        ox,oy,oz = self._origin
 
         #print("avg="+str(avg_x) + "\t" + str(avg_y) + "\t" + str(avg_z))
-        return avg_x, avg_y, avg_z
+        return sx/n + ox, sy/n + oy, sz/n + oz
 
     def getPosAvgAndDeviation(self, i1, i2):
         """Compute the average and eviation of the speed in the specified range.
         Returns the 6-tuple avg_x, avg_y, avg_z, dev_x, dev_y, dev_z."""
         #The standard deviation of a random variable, statistical population, data set, or probability distribution is the square root of its variance
         #http://www.stat.wisc.edu/~larget/math496/mean-var.html
-        # m_k = m_{k-1} + (x_k - m_{k-1}) / k
-        # s_k = s_{k-1} + (x_k - m_{k-1}) * (x_k - m_k)
-
-        n = 0
-        avg_x = 0
-        avg_y = 0
-        avg_z = 0
-        dev_x = 0
-        dev_y = 0
-        dev_z = 0
-        
-        latest_t = None
-        for i in range(i1, i2): # array indices in reverse order
-            n += 1
-            t,p = self.positions_buffer[i]
-            if(latest_t == None): latest_t = t
-            elapsed_t = latest_t - t
-            #print("Addng " + str(t)+" : " + str(p))
-           
-            navg_x = avg_x + ( (p[0] - avg_x) / n )
-            navg_y = avg_y + ( (p[1] - avg_y) / n )
-            navg_z = avg_z + ( (p[2] - avg_z) / n )
-
-            dev_x = dev_x + (p[0] - avg_x) * (p[0] - navg_x)
-            dev_y = dev_y + (p[1] - avg_y) * (p[1] - navg_y)
-            dev_z = dev_z + (p[2] - avg_z) * (p[2] - navg_z)
-
-            avg_x = navg_x
-            avg_y = navg_y
-            avg_z = navg_z
-    
-        dev_x = math.sqrt(dev_x)
-        dev_y = math.sqrt(dev_y)
-        dev_z = math.sqrt(dev_z)
+        # Here, the sum of squared differences from the mean is taken from the running sums:
+        # s_k = sum(x^2) - sum(x)^2 / k
+
+        i1, i2 = self._clampRange(i1, i2)
+        n = i2 - i1
+        if(n <= 0):
+            return 0, 0, 0, 0, 0, 0
+        
+        sx,sy,sz = self._rangeSums(i1, i2, self._pos_sums, self._pos_total)
+        qx,qy,qz = self._rangeSums(i1, i2, self._sq_sums, self._sq_total)
+        ox,oy,oz = self._origin
+    
+        # Clamp at 0 the little negative values coming from rounding errors
+        dev_x = math.sqrt(max(qx - sx*sx/n, 0.0))
+        dev_y = math.sqrt(max(qy - sy*sy/n, 0.0))
+        dev_z = math.sqrt(max(qz - sz*sz/n, 0.0))
     
         #print("avg="+str(avg_x) + "\t" + str(avg_y) + "\t" + str(avg_z))
-        return avg_x, avg_y, avg_z, dev_x, dev_y, dev_z
+        return sx/n + ox, sy/n + oy, sz/n + oz, dev_x, dev_y, dev_z
 
 
 
@@ -714,63 +906,33 @@ class HandMotionAnalyzer:
         Returns a 3-tuple with the three components sx,sy,sz."""
         
         #
-        # Calc the sped of the last limited time slot
-        n = 0
-        avg_sx = 0
-        avg_sy = 0
-        avg_sz = 0
-        latest_t = None
-        for i in range(0, len(self.positions_buffer)-1): # array indices in reverse order
-            t1,p1 = self.positions_buffer[i] # more recent
-            t2,p2 = self.positions_buffer[i+1] # previous one
-            if(latest_t == None): latest_t = t1
-            elapsed_t = latest_t - t2
-            if(elapsed_t>time_window_secs):
-                break;
-            dt = t1-t2
-            n += 1
-            sx = (p1[0] - p2[0]) / dt
-            sy = (p1[1] - p2[1]) / dt
-            sz = (p1[2] - p2[2]) / dt
-            
-            avg_sx = avg_sx + ( (sx - avg_sx) / n )
-            avg_sy = avg_sy + ( (sy - avg_sy) / n )
-            avg_sz = avg_sz + ( (sz - avg_sz) / n )
+        # Each slot stores the speed with respect to the previous one.
+        # The pairs whose older sample is within the time window are averaged.
+        n = self.slotsWithinTime(time_window_secs) - 1
+        if(n < 1):
+            return 0, 0, 0
+
+        sx,sy,sz = self._rangeSums(0, n, self._speed_sums, self._speed_total)
 
         #print("avg_speed="+str(avg_sx) + "\t" + str(avg_sy) + "\t" + str(avg_sz)+"\ton "+str(n)+" samples")
-        return avg_sx, avg_sy, avg_sz
+        return sx/n, sy/n, sz/n
 
 
     def getAverageSpeedSlots(self, slots):
         """Returns the average speed of the last samples, looking back for at maximum the provided amount if seconds.
         Returns a 3-tuple with the three components sx,sy,sz."""
 
-        slots = min(slots, len(self.positions_buffer) -1)
+        slots = min(slots, self._size -1)
 
         if(slots < 2):
             return 0.0,0.0,0.0
         
         #
-        # Calc the sped of the last limited time slot
-        n = 0
-        avg_sx = 0
-        avg_sy = 0
-        avg_sz = 0
-        for i in range(0, slots): # array indices in reverse order
-            t1,p1 = self.positions_buffer[i] # more recent
-            t2,p2 = self.positions_buffer[i+1] # previous one
-            dt = t1-t2
-            n += 1
-            sx = (p1[0] - p2[0]) / dt
-            sy = (p1[1] - p2[1]) / dt
-            sz = (p1[2] - p2[2]) / dt
-            
-            avg_sx = avg_sx + ( (sx - avg_sx) / n )
-            avg_sy = avg_sy + ( (sy - avg_sy) / n )
-            avg_sz = avg_sz + ( (sz - avg_sz) / n )
+        # Each slot stores the speed with respect to the previous one.
+        sx,sy,sz = self._rangeSums(0, slots, self._speed_sums, self._speed_total)
 
         #print("avg_speed="+str(avg_sx) + "\t" + str(avg_sy) + "\t" + str(avg_sz)+"\ton "+str(n)+" samples")
-        return avg_sx, avg_sy, avg_sz
+        return sx/slots, sy/slots, sz/slots
 
 
 
@@ -778,21 +940,11 @@ class HandMotionAnalyzer:
         """Returns the speed easuring the last two samples.
         Returns a 3-tuple with the three components sx,sy,sz."""
         
-        N = len(self.positions_buffer)
-        
-        if(N<2):
+        if(self._size<2):
             return (0.0,0.0,0.0)
-        #
-        # Calc the speed of the last limited time slot
-        t1,p1 = self.positions_buffer[0] # more recent
-        t2,p2 = self.positions_buffer[1] # previous one
-        dt = t1-t2
-        sx = (p1[0] - p2[0]) / dt
-        sy = (p1[1] - p2[1]) / dt
-        sz = (p1[2] - p2[2]) / dt
-            
-        #print("avg_speed="+str(avg_sx) + "\t" + str(avg_sy) + "\t" + str(avg_sz)+"\ton "+str(n)+" samples")
-        return sx, sy, sz
+
+        i = self._head
+        return self._speeds[0][i], self._speeds[1][i], self._speeds[2][i]
 
 
 
@@ -804,21 +956,21 @@ class HandMotionAnalyzer:
         return self.getPositionAverageInSlotsRange(0, self.buffer_lookback)
 
     def getStablePosition(self):
-        print("Computing stable position for buffer range "+ str(self.buffer_lookback) + " - " + str(len(self.positions_buffer)))
-        return self.getPositionAverageInSlotsRange(self.buffer_lookback, len(self.positions_buffer))
+        print("Computing stable position for buffer range "+ str(self.buffer_lookback) + " - " + str(self._size))
+        return self.getPositionAverageInSlotsRange(self.buffer_lookback, self._size)
 
 
     # Tmovement ----------> Tchange ----------> T0
     def suddenChange(self, change_lookback, movement_lookback):
-        if(len(self.positions_buffer) < 2):
+        if(self._size < 2):
             return False
         
         start_slot = self.slotsWithinTime(movement_lookback)
         change_slot = self.slotsWithinTime(change_lookback)
         
-        now_pos = mathutils.Vector(self.positions_buffer[0][1])
-        start_pos = mathutils.Vector(self.positions_buffer[start_slot-1][1])
-        change_pos = mathutils.Vector(self.positions_buffer[change_slot-1][1])
+        now_pos = mathutils.Vector(self._positionAt(0))
+        start_pos = mathutils.Vector(self._positionAt(start_slot-1))
+        change_pos = mathutils.Vector(self._positionAt(change_slot-1))
         
         movement_vect = change_pos - start_pos
         change_vect = now_pos - change_pos
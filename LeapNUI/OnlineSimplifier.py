@@ -0,0 +1,138 @@
+#The Sign Language Synthesis and Interaction Research Tools
+#    Copyright (C) 2014  Fabrizio Nunnari, Alexis Heloir, DFKI
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#
+# Simplification of the animation curves while they are recorded.
+# The controllers record through OnlineSimplifier.record() instead of keyframe_insert().
+# Each sample is still keyed immediately, so the animation is complete at any time,
+# but the keys that a sliding window error bound considers redundant are deleted as soon as they are known to be.
+#
+# For each channel (an owner and a data path, e.g., the location of a pose bone), the last kept key is the anchor.
+# When a frame is complete, its sample is tested as end of a segment starting at the anchor:
+# if all the samples in between are within the error from the segment, the key of the previous sample is deleted,
+# otherwise the previous sample becomes the new anchor. All the components of a channel are kept or deleted together.
+# The recorded keys are given LINEAR interpolation, so that the curve drawn between two kept keys is the segment used by the test.
+#
+
+import bpy
+
+
+# Max number of samples after the anchor. When reached, the previous sample becomes the anchor.
+# Bounds the time spent in each check.
+MAX_WINDOW = 48
+
+
+class KeyedChannel:
+    """The samples recorded for a channel since its last kept key."""
+
+    def __init__(self, frame, values, fcurves):
+        # The fcurves of the components of the channel
+        self.fcurves = fcurves
+        # The last kept (frame, values). None until the first frame is complete.
+        self.anchor = None
+        # The complete samples after the anchor. Only the key of the last one is still in the curve, together with the anchor.
+        self.samples = []
+        # The sample of the current frame. It can still be overwritten by other updates during the same frame.
+        self.pending = (frame, values)
+
+    def completeFrame(self, owner, data_path, error):
+        """The pending sample is final: decide whether to keep the key of the previous sample."""
+        sample = self.pending
+
+        if(self.anchor == None):
+            self.anchor = sample
+            return
+
+        self.samples.append(sample)
+        if(len(self.samples) < 2):
+            return
+
+        if(len(self.samples) <= MAX_WINDOW and self.fits(self.anchor, sample, self.samples[:-1], error)):
+            # The previous sample is redundant
+            owner.keyframe_delete(data_path=data_path, frame=self.samples[-2][0])
+        else:
+            self.anchor = self.samples[-2]
+            self.samples = [sample]
+
+    def setLinearInterpolation(self, frame):
+        """Sets the interpolation of the keys at frame to LINEAR. The keys are searched from the end, where they are usually appended."""
+        for fcurve in self.fcurves:
+            points = fcurve.keyframe_points
+            for i in range(len(points) - 1, -1, -1):
+                key_frame = points[i].co[0]
+                if(key_frame == frame):
+                    points[i].interpolation = 'LINEAR'
+                if(key_frame <= frame):
+                    break
+
+    @staticmethod
+    def fits(start, end, samples, error):
+        """True if all the samples are within error from the linear interpolation between start and end, for each component."""
+        start_frame, start_values = start
+        end_frame, end_values = end
+        duration = end_frame - start_frame
+        for frame, values in samples:
+            t = (frame - start_frame) / duration
+            for v0, v1, v in zip(start_values, end_values, values):
+                if(abs(v0 + (v1 - v0) * t - v) > error):
+                    return False
+        return True
+
+
+class OnlineSimplifier:
+    """Class-level singleton holding the channels being recorded.
+
+    Usage, in place of owner.keyframe_insert(data_path=..., frame=...):
+        OnlineSimplifier.record(owner, "location", frame)
+
+    The simplification is active if the window manager property leap_nui_online_simplification is set.
+    Otherwise, record() just inserts the keyframe, with the interpolation of the user preferences.
+    """
+
+    s_channels = {}
+
+    @classmethod
+    def record(cls, owner, data_path, frame):
+        owner.keyframe_insert(data_path=data_path, frame=frame)
+
+        wm = bpy.context.window_manager
+        if(not wm.leap_nui_online_simplification):
+            return
+
+        key = (owner.id_data.name, owner.path_from_id(data_path))
+        values = tuple(getattr(owner, data_path))
+
+        channel = cls.s_channels.get(key)
+        if(channel == None or frame < channel.pending[0]):
+            # New channel, or a new recording started (e.g., the play looped): start over.
+            # Keys are deleted only when redundant, so all the keys in the curve are still valid.
+            fcurves = [fcurve for fcurve in owner.id_data.animation_data.action.fcurves if fcurve.data_path == key[1]]
+            channel = KeyedChannel(frame, values, fcurves)
+            cls.s_channels[key] = channel
+        elif(frame == channel.pending[0]):
+            # Another update within the same frame: the key was just overwritten
+            channel.pending = (frame, values)
+        else:
+            channel.completeFrame(owner, data_path, wm.leap_nui_online_simplification_error)
+            channel.pending = (frame, values)
+
+        # The kept keys are joined by straight segments, as assumed by KeyedChannel.fits()
+        channel.setLinearInterpolation(frame)
+
+    @classmethod
+    def reset(cls):
+        """Forgets all the channels. The next record() of each channel starts a new simplification."""
+        cls.s_channels = {}
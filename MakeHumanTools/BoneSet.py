@@ -157,6 +157,18 @@ MH_HAND_BONES_R = [ b+".R" for b in MH_HAND_BONES_base]
 MH_HAND_BONES_L = [ b+".L" for b in MH_HAND_BONES_base]
 MH_HAND_BONES = MH_HAND_BONES_R + MH_HAND_BONES_L
 
+# The three phalanges of each finger, from the palm to the tip. Fingers are ordered as the Leap finger types (0=thumb, 1=index, ...)
+MH_FINGER_PHALANGES_base = [
+    ["thumb.01", "thumb.02", "thumb.03"],
+    ["f_index.01", "f_index.02", "f_index.03"],
+    ["f_middle.01", "f_middle.02", "f_middle.03"],
+    ["f_ring.01", "f_ring.02", "f_ring.03"],
+    ["f_pinky.01", "f_pinky.02", "f_pinky.03"],
+]
+
+MH_FINGER_PHALANGES_R = [ [b+".R" for b in finger] for finger in MH_FINGER_PHALANGES_base]
+MH_FINGER_PHALANGES_L = [ [b+".L" for b in finger] for finger in MH_FINGER_PHALANGES_base]
+
 MH_SHOULDER_BONE_base = "upper_arm"
 MH_ELBOW_BONE_base = "forearm"
 MH_WRIST_BONE_base = "hand"
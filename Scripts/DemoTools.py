@@ -113,8 +113,7 @@ class FreePlay(bpy.types.Operator):
         # Run operators
         bpy.ops.object.leap_modal(isHandsDirectlyControlled=True, handsEnableRotation=context.scene.signrecdemo_capture_hands_rotation, handsMirrorMode=True, isFingersDirectlyControlled=context.scene.signrecdemo_capture_fingers, isElbowsDirectlyControlled=context.scene.signrecdemo_capture_elbows)
         if(bpy.context.scene.signrecdemo_capture_face):
-            # do not instantiate another timer if another modal command already did.
-            bpy.ops.object.faceshift_modal(instantiateTimer=False)
+            bpy.ops.object.faceshift_modal()
         
         bpy.ops.scene.signrecdemo_demoviewcapture()
         
@@ -199,8 +198,7 @@ class StartRecording(bpy.types.Operator):
         # Run operators
         bpy.ops.object.leap_modal(isHandsDirectlyControlled=True, handsEnableRotation=context.scene.signrecdemo_capture_hands_rotation, handsMirrorMode=True, isFingersDirectlyControlled=context.scene.signrecdemo_capture_fingers, isElbowsDirectlyControlled=context.scene.signrecdemo_capture_elbows)
         if(bpy.context.scene.signrecdemo_capture_face):
-            # do not instantiate another timer if another modal command already did.
-            bpy.ops.object.faceshift_modal(instantiateTimer=False)
+            bpy.ops.object.faceshift_modal()
 
         # run the ESC catcher to stop the animation play
         bpy.ops.scene.signrecdemo_playpauser()
@@ -0,0 +1,314 @@
+#     "Simplify Multiple F-Curves" is a Blender addon to simplify the keyframes of multiple F-Curves at once
+#     retaining an alignment of the keyframes between curves.
+#     Copyright (C) <2018>  <Fabrizio Nunnari>
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Headless benchmark of the phases of the simplification:
+storing (scanCurvesInfo), normalization and max offset, simplification (by error and by max keyframes),
+fitting of the Bézier handles (with --fit-handles) and reconstruction.
+
+The phases run on stub F-Curves, implementing the part of the bpy.types.FCurve API used by the add-on.
+Curve sets are either synthetic, or replayed from LeapRecorder logs (one curve per hand/finger coordinate).
+
+Run it with Blender in background mode:
+    blender -b -P SimplifyBenchmark.py -- [--curves 10,100,1000] [--frames 100,1000,10000,100000]
+                                          [--leap-log Leap-LOG-xxx.log] [--repeat 3] [--fit-handles] [--output results.jsonl]
+
+Each benchmark case is printed (and optionally appended to the output file) as one JSON object per line,
+with the time in seconds of each phase. Phases of different runs can then be compared to track regressions.
+"""
+
+import sys
+import os
+import math
+import random
+import time
+import json
+import argparse
+import platform
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import SimplifyMultipleFCurves as smf
+
+
+# Cases with more keyframes than this are skipped, unless --max-keys is given
+DEFAULT_MAX_KEYS = 2000000
+
+# Simplification parameters used for all the cases
+ERROR_PCT = 5.0
+MAX_KEYFRAMES = 50
+
+
+#########################################################################
+# Stub F-Curves
+#########################################################################
+
+class StubKeyframe:
+    __slots__ = ("co", "handle_left", "handle_right", "interpolation", "handle_left_type", "handle_right_type")
+
+    def __init__(self, frame, value):
+        self.co = (frame, value)
+        self.handle_left = (frame - 1.0, value)
+        self.handle_right = (frame + 1.0, value)
+        self.interpolation = 'LINEAR'
+        self.handle_left_type = 'AUTO_CLAMPED'
+        self.handle_right_type = 'AUTO_CLAMPED'
+
+
+class StubKeyframePoints(list):
+    """The keyframe_points collection. Bulk access works on flat sequences of pairs, as in bpy."""
+
+    def foreach_get(self, attr, seq):
+        seq[:] = [x for kf in self for x in getattr(kf, attr)]
+
+    def foreach_set(self, attr, seq):
+        seq = list(seq)
+        for i, kf in enumerate(self):
+            setattr(kf, attr, (seq[i*2], seq[i*2+1]))
+
+    def add(self, count):
+        self.extend(StubKeyframe(0.0, 0.0) for _ in range(count))
+
+    def remove(self, keyframe, fast=False):
+        for idx in range(len(self) - 1, -1, -1):
+            if self[idx] is keyframe:
+                del self[idx]
+                return
+
+    def insert(self, frame, value, options=None):
+        kf = StubKeyframe(frame, value)
+        self.append(kf)
+        self.sort(key=lambda k: k.co[0])
+        return kf
+
+
+class StubFCurve:
+    """An F-Curve with linear interpolation and constant extrapolation."""
+
+    def __init__(self, data_path, array_index, frames, values):
+        self.data_path = data_path
+        self.array_index = array_index
+        self.keyframe_points = StubKeyframePoints(StubKeyframe(f, v) for f, v in zip(frames, values))
+        self.modifiers = []
+        self.extrapolation = 'CONSTANT'
+        self.select = True
+
+    def evaluate(self, frame):
+        kframes = self.keyframe_points
+        if frame <= kframes[0].co[0]:
+            return kframes[0].co[1]
+        if frame >= kframes[-1].co[0]:
+            return kframes[-1].co[1]
+        lo, hi = 0, len(kframes) - 1
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if kframes[mid].co[0] <= frame:
+                lo = mid
+            else:
+                hi = mid
+        (f1, v1), (f2, v2) = kframes[lo].co, kframes[hi].co
+        return v1 + (v2 - v1) * (frame - f1) / (f2 - f1)
+
+    def range(self):
+        return self.keyframe_points[0].co[0], self.keyframe_points[-1].co[0]
+
+    def update(self):
+        self.keyframe_points.sort(key=lambda k: k.co[0])
+
+
+#########################################################################
+# Curve sets
+#########################################################################
+
+def synthetic_curves(n_curves, n_frames, seed=0):
+    """Returns a factory of n_curves smooth noisy curves, keyed at (almost) every frame, as recorded by the real-time devices.
+    Some curves start later or miss some frames, so that the keyframes must be aligned."""
+    rnd = random.Random(seed)
+    specs = []
+    for c in range(n_curves):
+        start = rnd.randint(0, 4)
+        frames = [float(f) for f in range(start, n_frames) if f == start or rnd.random() > 0.02]
+        waves = [(rnd.uniform(0.1, 2.0), rnd.uniform(0.002, 0.05), rnd.uniform(0, math.pi)) for _ in range(3)]
+        values = [sum(a * math.sin(w * f + p) for a, w, p in waves) + rnd.gauss(0.0, 0.01) for f in frames]
+        specs.append(('pose.bones["bone%d"].location' % (c // 3), c % 3, frames, values))
+
+    return lambda: [StubFCurve(*spec) for spec in specs]
+
+
+def leap_log_curves(log_filename):
+    """Returns a factory of curves replayed from a LeapRecorder log: one curve per coordinate of the palm
+    and finger tip positions of each hand, one keyframe per Leap frame."""
+    channels = {}
+    frame = 0
+    with open(log_filename) as f:
+        for line in f:
+            if line.strip() == "":
+                continue
+            leap_dict = json.loads(line)
+            if 'hands' not in leap_dict:
+                continue
+            frame += 1
+            hand_types = {}
+            for hand in leap_dict["hands"]:
+                hand_type = hand.get("type", str(hand["id"]))
+                hand_types[hand["id"]] = hand_type
+                for i, x in enumerate(hand["palmPosition"]):
+                    channels.setdefault(("palm." + hand_type, i), []).append((frame, x))
+            for pointable in leap_dict.get("pointables", []):
+                hand_type = hand_types.get(pointable["handId"])
+                if hand_type is None:
+                    continue
+                for i, x in enumerate(pointable["tipPosition"]):
+                    channels.setdefault(("finger%d.%s" % (pointable.get("type", 0), hand_type), i), []).append((frame, x))
+
+    specs = []
+    for (name, index), samples in sorted(channels.items()):
+        if len(samples) < 2:
+            continue
+        # Keep one sample per frame (the same finger type can appear twice in a frame)
+        samples = sorted(dict(samples).items())
+        specs.append(('pose.bones["%s"].location' % name, index, [float(f) for f, _ in samples], [v for _, v in samples]))
+
+    return lambda: [StubFCurve(*spec) for spec in specs]
+
+
+#########################################################################
+# Benchmark
+#########################################################################
+
+def run_phases(fcurves, fit_handles=False):
+    """Runs all the phases on the curves, as the simplify operators do. Returns (phase times dictionary, info dictionary)."""
+    times = {}
+
+    sframe = min(c.range()[0] for c in fcurves)
+    eframe = max(c.range()[1] for c in fcurves)
+
+    before = time.time()
+    fcurves_data, n_frames = smf.scanCurvesInfo(fcurves=fcurves, sframe=sframe, eframe=eframe)
+    times["storing"] = time.time() - before
+
+    # Normalization and max offset are computed in the same pass
+    before = time.time()
+    simplify_data, curves_array, max_offset = smf.prepare_simplification(fcurves_data, normalize=True)
+    times["normalization_max_offset"] = time.time() - before
+
+    before = time.time()
+    kept_indices = smf.simplify_curves(curves_data=simplify_data, n_frames=n_frames, error=max_offset * ERROR_PCT / 100.0,
+                                       curves_array=curves_array)
+    times["simplification"] = time.time() - before
+
+    before = time.time()
+    hierarchy = smf.SimplificationHierarchy(curves_data=simplify_data, n_frames=n_frames, curves_array=curves_array)
+    hierarchy.indices_for_max_keyframes(MAX_KEYFRAMES)
+    times["hierarchy"] = time.time() - before
+
+    handles = None
+    if fit_handles:
+        before = time.time()
+        handles = smf.fit_bezier_handles(curves_data=fcurves_data, indices_to_keep=kept_indices)
+        times["handle_fitting"] = time.time() - before
+
+    before = time.time()
+    smf.apply_simplification(selected_curves=fcurves, sframe=sframe, eframe=eframe, curves_data=fcurves_data, indices_to_keep=kept_indices,
+                             handles=handles)
+    times["reconstruction"] = time.time() - before
+
+    times["total"] = sum(times.values())
+    return times, {"aligned_frames": n_frames, "kept_frames": len(kept_indices)}
+
+
+def benchmark(name, curves_factory, repeat, params, fit_handles=False):
+    """Runs the phases repeat times on fresh curves, and returns the result record with the best time of each phase."""
+    best = None
+    info = None
+    n_keys = 0
+    for _ in range(repeat):
+        fcurves = curves_factory()
+        n_keys = sum(len(c.keyframe_points) for c in fcurves)
+        times, info = run_phases(fcurves, fit_handles)
+        if best is None:
+            best = times
+        else:
+            best = {phase: min(t, best[phase]) for phase, t in times.items()}
+
+    record = {"case": name, "numpy": smf.USE_NUMPY, "fit_handles": fit_handles, "keyframes": n_keys, "repeat": repeat, "phases": best}
+    record.update(params)
+    record.update(info)
+    return record
+
+
+def parse_int_list(s):
+    return [int(x) for x in s.split(",") if x.strip() != ""]
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmark of the Simplify Multiple F-Curves phases")
+    parser.add_argument("--curves", type=parse_int_list, default=[10, 100, 1000], help="Comma separated numbers of synthetic curves")
+    parser.add_argument("--frames", type=parse_int_list, default=[100, 1000, 10000, 100000], help="Comma separated numbers of synthetic frames")
+    parser.add_argument("--leap-log", action="append", default=[], help="LeapRecorder log to replay (can be repeated)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case. The best time of each phase is reported")
+    parser.add_argument("--max-keys", type=int, default=DEFAULT_MAX_KEYS, help="Skip the synthetic cases with more keyframes")
+    parser.add_argument("--no-numpy", action="store_true", help="Benchmark the pure Python path")
+    parser.add_argument("--fit-handles", action="store_true", help="Fit the Bézier handles of the simplified curves")
+    parser.add_argument("--output", help="File where the JSON records are appended")
+    args = parser.parse_args(argv)
+
+    smf.DEBUG_LOG = False
+    if args.no_numpy:
+        smf.USE_NUMPY = False
+
+    run_info = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(), "machine": platform.machine()}
+    if smf.USE_NUMPY:
+        run_info["numpy_version"] = smf.numpy.__version__
+
+    cases = []
+    for n_curves in args.curves:
+        for n_frames in args.frames:
+            params = {"curves": n_curves, "frames": n_frames}
+            if n_curves * n_frames > args.max_keys:
+                cases.append(("synthetic", None, params))
+            else:
+                cases.append(("synthetic", synthetic_curves(n_curves, n_frames), params))
+    for log_filename in args.leap_log:
+        cases.append(("leap_log", leap_log_curves(log_filename), {"log": os.path.basename(log_filename)}))
+
+    out_file = open(args.output, "a") if args.output else None
+    try:
+        for name, factory, params in cases:
+            if factory is None:
+                record = {"case": name, "skipped": "more than %d keyframes" % args.max_keys}
+                record.update(params)
+            else:
+                record = benchmark(name, factory, args.repeat, params, args.fit_handles)
+            record["run"] = run_info
+            line = json.dumps(record, sort_keys=True)
+            print(line)
+            sys.stdout.flush()
+            if out_file is not None:
+                out_file.write(line + "\n")
+                out_file.flush()
+    finally:
+        if out_file is not None:
+            out_file.close()
+
+
+if __name__ == "__main__":
+    # When run by Blender, the script arguments follow "--"
+    if "--" in sys.argv:
+        main(sys.argv[sys.argv.index("--") + 1:])
+    else:
+        main(sys.argv[1:])
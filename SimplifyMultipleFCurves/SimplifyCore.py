@@ -0,0 +1,245 @@
+#     "Simplify Multiple F-Curves" is a Blender addon to simplify the keyframes of multiple F-Curves at once
+#     retaining an alignment of the keyframes between curves.
+#     Copyright (C) <2018>  <Fabrizio Nunnari>
+# 
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+# 
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+# 
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+NumPy core of the multi-curve simplification.
+This module does not depend on bpy, so that it can be imported by the worker processes
+used to simplify independent groups of curves in parallel.
+The curves are given as NumPy arrays of shape (n_curves, n_frames, 2), see SimplifyMultipleFCurves.curves_data_to_array.
+"""
+
+import time
+
+import numpy
+
+
+def line_distances(p1, p2, points):
+    """Distance of the points, of shape (n_curves, m, 2), to the lines passing through p1 and p2, of shape (n_curves, 2).
+    The same formula of SimplifyMultipleFCurves.altitude() is used, in order to select exactly the same keyframes.
+    For that, the precision of mathutils.Vector is reproduced: the differences between points are computed in single precision,
+    and the cosine passed to the arc cosine is rounded to single precision, as by Vector.angle().
+    Returns an array of shape (n_curves, m).
+    """
+    p1 = p1.astype(numpy.float32)
+    p2 = p2.astype(numpy.float32)
+    points = points.astype(numpy.float32)
+    edge1 = (p2 - p1)[:, numpy.newaxis, :].astype(numpy.float64)     # (n_curves, 1, 2)
+    edge2 = (points - p1[:, numpy.newaxis, :]).astype(numpy.float64)  # (n_curves, m, 2)
+
+    len1 = numpy.sqrt(numpy.sum(edge1 * edge1, axis=2))
+    len2 = numpy.sqrt(numpy.sum(edge2 * edge2, axis=2))
+    dot = numpy.sum(edge1 * edge2, axis=2)
+
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        cos_alpha = (dot / (len1 * len2)).astype(numpy.float32)
+    alpha = numpy.arccos(numpy.clip(cos_alpha, -1.0, 1.0)).astype(numpy.float64)
+    alt = numpy.sin(alpha) * len2
+
+    # Degenerate cases, as in altitude()
+    alt = numpy.where(len1 == 0, len2, alt)
+    alt = numpy.where(len2 == 0, 0.0, alt)
+    return alt
+
+
+def altitudes_array(curves_array, s_idx, e_idx):
+    """Vectorized version of SimplifyMultipleFCurves.altitude() for all the curves at once.
+    Returns an array of shape (n_curves, e_idx-s_idx-1) with the distance of each keyframe in ]s_idx,e_idx[
+    to the line passing through the keyframes at s_idx and e_idx.
+    """
+    return line_distances(curves_array[:, s_idx, :], curves_array[:, e_idx, :], curves_array[:, s_idx+1:e_idx, :])
+
+
+def max_offset_array(curves_array) -> float:
+    """Vectorized version of SimplifyMultipleFCurves.get_max_offset():
+    the max distance of a keyframe from the line connecting the extreme keyframes of its curve."""
+    if curves_array.ndim != 3 or curves_array.shape[0] == 0 or curves_array.shape[1] < 2:
+        return 0
+    n_frames = curves_array.shape[1]
+    # The first keyframe has distance 0. The last is included, as in get_max_offset.
+    offsets = line_distances(curves_array[:, 0, :], curves_array[:, n_frames-1, :], curves_array[:, 1:, :])
+    return max(0, float(numpy.max(offsets)))
+
+
+def normalization_scale(values) -> float:
+    """The divisor applied by SimplifyMultipleFCurves.normalizeCurvesInfo to the values of a curve. 1.0 if they are not scaled.
+    The same scan is used: the reference value is the last one whose absolute value exceeds the current reference, with its sign."""
+    max_val = 0.0
+    for val in values:
+        if abs(val) > max_val:
+            max_val = val
+    if max_val > 0:
+        return max_val
+    return 1.0
+
+
+def normalize_array(curves_array):
+    """Normalization and max offset in one pass over the array, without building the normalized curves_data.
+    The values are scaled as in SimplifyMultipleFCurves.normalizeCurvesInfo, and rounded to single precision as stored by its mathutils.Vector.
+    Returns the pair (normalized array, max offset of the normalized curves).
+    """
+    scales = numpy.array([normalization_scale(values) for values in curves_array[:, :, 1].tolist()], dtype=numpy.float64)
+    normalized = numpy.empty_like(curves_array)
+    normalized[:, :, 0] = curves_array[:, :, 0]
+    normalized[:, :, 1] = (curves_array[:, :, 1] / scales[:, numpy.newaxis]).astype(numpy.float32)
+    return normalized, max_offset_array(normalized)
+
+
+def simplify_curves_array(curves_array, threshold_error, indices):
+    """Same as SimplifyMultipleFCurves.simplify_curves_R, but working on the NumPy array returned by curves_data_to_array.
+    For each segment, the errors of all the curves are computed in one vectorized step,
+    and the segments still to split are kept in an explicit stack instead of recursing.
+    Append to the indices list the indices to keep for the reconstruction.
+    """
+    n_frames = curves_array.shape[1]
+    stack = [(0, n_frames-1)]
+    while stack:
+        s_idx, e_idx = stack.pop()
+        if e_idx - s_idx < 2:
+            continue
+
+        alt = altitudes_array(curves_array, s_idx, e_idx)
+        # argmax returns the first maximum, scanning curve by curve, like the loops of simplify_curves_R
+        curve_num, offset = numpy.unravel_index(numpy.argmax(alt), alt.shape)
+        if alt[curve_num, offset] > threshold_error:
+            big_error_idx = s_idx + 1 + int(offset)
+            indices.append(big_error_idx)
+            stack.append((s_idx, big_error_idx))
+            stack.append((big_error_idx, e_idx))
+
+
+def keep_errors_array(curves_array):
+    """Computes the keep errors of the SimplifyMultipleFCurves.SimplificationHierarchy:
+    for each keyframe index, the error below which the simplification keeps it.
+    Returns a list of n_frames floats. The borders are always kept (infinite error).
+    """
+    n_frames = curves_array.shape[1]
+    keep_errors = [0.0] * n_frames
+    keep_errors[0] = float('inf')
+    keep_errors[n_frames-1] = float('inf')
+
+    # Split all the segments, down to the single keyframes
+    stack = [(0, n_frames-1, float('inf'))]
+    while stack:
+        s_idx, e_idx, parent_error = stack.pop()
+        if e_idx - s_idx < 2:
+            continue
+
+        alt = altitudes_array(curves_array, s_idx, e_idx)
+        curve_num, offset = numpy.unravel_index(numpy.argmax(alt), alt.shape)
+        error = float(alt[curve_num, offset])
+        split_idx = s_idx + 1 + int(offset)
+
+        keep_error = min(error, parent_error)
+        keep_errors[split_idx] = keep_error
+        stack.append((s_idx, split_idx, keep_error))
+        stack.append((split_idx, e_idx, keep_error))
+
+    return keep_errors
+
+
+def fit_handles_array(curves_array, indices, regularization):
+    """Least squares fit of the Bézier handles of the segments between the kept indices, against all the samples of the curves.
+    The times of the handles are at 1/3 and 2/3 of each segment, so that the Bézier time is linear in the frame time,
+    and only the values of the two handles of each segment must be fitted: a 2x2 linear system per segment and curve.
+    The systems of all the segments and curves are accumulated and solved at once.
+    The handles of the borders, outside of the segments, mirror the inner handle of their keyframe.
+    regularization is the weight pulling the handles towards the ones of a straight segment,
+    see SimplifyMultipleFCurves.HANDLES_FIT_REGULARIZATION.
+    Returns the pair of arrays (handles_left, handles_right), of shape (n_curves, len(indices), 2).
+    """
+    indices = numpy.asarray(indices, dtype=numpy.intp)
+    n_curves = curves_array.shape[0]
+    n_kept = len(indices)
+
+    # The times are aligned among the curves
+    times = curves_array[0, :, 0]
+    values = curves_array[:, :, 1]
+
+    handles_left = numpy.empty((n_curves, n_kept, 2))
+    handles_right = numpy.empty((n_curves, n_kept, 2))
+    handles_left[:, :, 0] = times[indices] - 1.0
+    handles_left[:, :, 1] = values[:, indices]
+    handles_right[:, :, 0] = times[indices] + 1.0
+    handles_right[:, :, 1] = values[:, indices]
+    if n_kept < 2:
+        return handles_left, handles_right
+
+    s_idx = indices[:-1]
+    e_idx = indices[1:]
+    t0 = times[s_idx]
+    dt = times[e_idx] - t0
+    v0 = values[:, s_idx]     # (n_curves, n_segments)
+    v1 = values[:, e_idx]
+
+    # Segment of each sample. The sample of a kept index starts its segment, the last one closes the last segment.
+    frames = numpy.arange(indices[0], indices[-1] + 1)
+    segment = numpy.searchsorted(indices, frames, side='right') - 1
+    segment[-1] = len(s_idx) - 1
+    starts = s_idx - indices[0]
+
+    # Bernstein basis at the samples
+    u = (times[frames] - t0[segment]) / dt[segment]
+    w = 1.0 - u
+    b0 = w * w * w
+    b1 = 3.0 * w * w * u
+    b2 = 3.0 * w * u * u
+    b3 = u * u * u
+
+    # Normal equations of: b1 * y1 + b2 * y2 = value - b0 * v0 - b3 * v1
+    target = values[:, frames] - b0 * v0[:, segment] - b3 * v1[:, segment]
+    a11 = numpy.add.reduceat(b1 * b1, starts) + regularization
+    a12 = numpy.add.reduceat(b1 * b2, starts)
+    a22 = numpy.add.reduceat(b2 * b2, starts) + regularization
+    r1 = numpy.add.reduceat(target * b1, starts, axis=1) + regularization * (v0 + (v1 - v0) / 3.0)
+    r2 = numpy.add.reduceat(target * b2, starts, axis=1) + regularization * (v1 - (v1 - v0) / 3.0)
+
+    det = a11 * a22 - a12 * a12
+    y1 = (a22 * r1 - a12 * r2) / det
+    y2 = (a11 * r2 - a12 * r1) / det
+
+    handles_right[:, :-1, 0] = t0 + dt / 3.0
+    handles_right[:, :-1, 1] = y1
+    handles_left[:, 1:, 0] = times[e_idx] - dt / 3.0
+    handles_left[:, 1:, 1] = y2
+
+    # Borders
+    handles_left[:, 0, :] = 2.0 * curves_array[:, indices[0], :] - handles_right[:, 0, :]
+    handles_right[:, -1, :] = 2.0 * curves_array[:, indices[-1], :] - handles_left[:, -1, :]
+
+    return handles_left, handles_right
+
+
+#
+# Worker process entry points. They return the pair (result, computation time in seconds).
+#
+
+def simplify_task(curves_array, threshold_error):
+    """Returns the sorted indices kept by the simplification of the curves with the given error."""
+    start = time.time()
+    n_frames = curves_array.shape[1]
+    indices = [0, n_frames-1]
+    simplify_curves_array(curves_array, threshold_error=threshold_error, indices=indices)
+    indices.sort()
+    return indices, time.time() - start
+
+
+def keep_errors_task(curves_array):
+    """Returns the keep errors of the curves, see keep_errors_array."""
+    start = time.time()
+    keep_errors = keep_errors_array(curves_array)
+    return keep_errors, time.time() - start
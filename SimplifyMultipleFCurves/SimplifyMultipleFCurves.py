@@ -18,11 +18,38 @@
 
 import bpy
 from bpy.props import *  # for properties
+from bpy.app.handlers import persistent
 import mathutils         # for Vector
 
 import sys
+import os
+import array
+import re
 import math
 import time             # for performance timing
+import bisect
+import heapq
+import multiprocessing
+import multiprocessing.spawn
+
+# NumPy is optional: without it, the pure Python simplification is used.
+# The NumPy core is in SimplifyCore.py, next to this file. It does not import bpy, so that worker processes can import it.
+try:
+    import numpy
+    _script_dir = os.path.dirname(os.path.abspath(__file__))
+    if _script_dir not in sys.path:
+        sys.path.append(_script_dir)
+    import SimplifyCore
+    from SimplifyCore import simplify_curves_array, keep_errors_array, normalize_array, max_offset_array, fit_handles_array
+    USE_NUMPY = True
+except ImportError:
+    USE_NUMPY = False
+
+# MakeHumanTools is optional: it is used to group the curves by body part.
+try:
+    from MakeHumanTools import BoneSet
+except ImportError:
+    BoneSet = None
 
 
 bl_info = {
@@ -104,6 +131,18 @@ class KFInfo:
         out.hasTangentsData = False
         return out
         
+    @classmethod
+    def fromValues(cls, co, interpolation, handle_left, handle_left_type, handle_right, handle_right_type):
+        out = cls()
+        out.co = mathutils.Vector((co[0], co[1]))
+        out.hasTangentsData = True
+        out.interpolation = interpolation
+        out.handle_left = mathutils.Vector((handle_left[0], handle_left[1]))
+        out.handle_left_type = handle_left_type
+        out.handle_right = mathutils.Vector((handle_right[0], handle_right[1]))
+        out.handle_right_type = handle_right_type
+        return out
+
     @classmethod
     def fromKeyFrame(cls, kf):
         out = cls()
@@ -117,124 +156,277 @@ class KFInfo:
         return out
 
 
+# Values of the keyframe enum properties, stored by CurveKeyframes as their index in these tuples
+INTERPOLATION_MODES = ('CONSTANT', 'LINEAR', 'BEZIER', 'SINE', 'QUAD', 'CUBIC', 'QUART', 'QUINT', 'EXPO', 'CIRC', 'BACK', 'BOUNCE', 'ELASTIC')
+HANDLE_TYPES = ('FREE', 'VECTOR', 'ALIGNED', 'AUTO', 'AUTO_CLAMPED')
+
+INTERPOLATION_INDEX = {mode: i for i, mode in enumerate(INTERPOLATION_MODES)}
+HANDLE_TYPE_INDEX = {handle_type: i for i, handle_type in enumerate(HANDLE_TYPES)}
+
+
+class CurveKeyframes:
+    """Compact storage of the keyframes of a curve, in place of a list of KFInfo.
+    Struct of arrays: single precision floats for times, values and handles (as stored by mathutils.Vector),
+    and one byte per keyframe for the tangents flag, the interpolation and the handle types.
+    Handles are flat arrays (x0, y0, x1, y1, ...).
+    Indexing and iteration return KFInfo instances, built on demand.
+    """
+
+    __slots__ = ("times", "values", "has_tangents", "interpolations",
+                 "handles_left", "handle_left_types", "handles_right", "handle_right_types")
+
+    def __init__(self, n_keyframes):
+        """All the keyframes are initialized at time and value 0, without tangents."""
+        zeros = bytes(n_keyframes)
+        self.times = array.array('f', zeros * 4)
+        self.values = array.array('f', zeros * 4)
+        self.has_tangents = array.array('B', zeros)
+        self.interpolations = array.array('B', zeros)
+        self.handles_left = array.array('f', zeros * 8)
+        self.handle_left_types = array.array('B', zeros)
+        self.handles_right = array.array('f', zeros * 8)
+        self.handle_right_types = array.array('B', zeros)
+
+    @classmethod
+    def fromCoords(cls, times, values):
+        """Keyframes without tangents, as built by KFInfo.fromCoords()."""
+        out = cls(len(times))
+        out.times = array.array('f', times)
+        out.values = array.array('f', values)
+        return out
+
+    def setKeyframe(self, idx, co, interpolation, handle_left, handle_left_type, handle_right, handle_right_type):
+        """Stores at idx a keyframe with tangents, as built by KFInfo.fromValues()."""
+        self.times[idx], self.values[idx] = co
+        self.has_tangents[idx] = 1
+        self.interpolations[idx] = INTERPOLATION_INDEX[interpolation]
+        self.handles_left[2*idx], self.handles_left[2*idx+1] = handle_left
+        self.handle_left_types[idx] = HANDLE_TYPE_INDEX[handle_left_type]
+        self.handles_right[2*idx], self.handles_right[2*idx+1] = handle_right
+        self.handle_right_types[idx] = HANDLE_TYPE_INDEX[handle_right_type]
+
+    def co(self, idx):
+        """The coordinates of the keyframe at idx, as a mathutils.Vector."""
+        return mathutils.Vector((self.times[idx], self.values[idx]))
+
+    def __len__(self):
+        return len(self.times)
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += len(self.times)
+        if not self.has_tangents[idx]:
+            return KFInfo.fromCoords(vector=(self.times[idx], self.values[idx]))
+        return KFInfo.fromValues(co=(self.times[idx], self.values[idx]),
+                                 interpolation=INTERPOLATION_MODES[self.interpolations[idx]],
+                                 handle_left=self.handles_left[2*idx:2*idx+2],
+                                 handle_left_type=HANDLE_TYPES[self.handle_left_types[idx]],
+                                 handle_right=self.handles_right[2*idx:2*idx+2],
+                                 handle_right_type=HANDLE_TYPES[self.handle_right_types[idx]])
+
+    def __iter__(self):
+        for idx in range(len(self.times)):
+            yield self[idx]
+
+
+# Interpolation modes evaluated in batch by interpolate_curve(). Segments with other modes are evaluated by FCurve.evaluate().
+INTERPOLATION_CODES = {'CONSTANT': 0, 'LINEAR': 1, 'BEZIER': 2}
+
+# Bisection steps to find the Bézier parameter of a time. 40 steps are below the float precision of the keyframes.
+BEZIER_ITERATIONS = 40
+
+
+def extract_keyframes(curve):
+    """Bulk extraction of the keyframes of a curve, with foreach_get instead of one bpy access per keyframe attribute.
+    Returns the tuple (times, values, handles_left, handles_right). Handles are flat sequences (x0, y0, x1, y1, ...).
+    They are NumPy arrays if NumPy is available, lists otherwise.
+    """
+    kframes = curve.keyframe_points
+    n = len(kframes)
+    if USE_NUMPY:
+        co = numpy.empty(n * 2, dtype=numpy.float32)
+        handles_left = numpy.empty(n * 2, dtype=numpy.float32)
+        handles_right = numpy.empty(n * 2, dtype=numpy.float32)
+    else:
+        co = [0.0] * (n * 2)
+        handles_left = [0.0] * (n * 2)
+        handles_right = [0.0] * (n * 2)
+    kframes.foreach_get("co", co)
+    kframes.foreach_get("handle_left", handles_left)
+    kframes.foreach_get("handle_right", handles_right)
+    return co[0::2], co[1::2], handles_left, handles_right
+
+
+def bezier_values(t, x1, y1, x2, y2, x3, y3, x4, y4):
+    """Vectorized evaluation of F-Curve Bézier segments at the times t, as done by Blender:
+    the handles are shortened so that each segment is a function of time (see correct_bezpart() in Blender),
+    then the parameter of each time is found by bisection.
+    (x1,y1) and (x4,y4) are the keyframes, (x2,y2) the right handle of the first, (x3,y3) the left handle of the second.
+    """
+    # Shorten the handles if they overlap in time
+    h1x = x1 - x2
+    h1y = y1 - y2
+    h2x = x4 - x3
+    h2y = y4 - y3
+    handles_len = numpy.abs(h1x) + numpy.abs(h2x)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        fac = numpy.where(handles_len > x4 - x1, (x4 - x1) / handles_len, 1.0)
+    x2 = x1 - fac * h1x
+    y2 = y1 - fac * h1y
+    x3 = x4 - fac * h2x
+    y3 = y4 - fac * h2y
+
+    def cubic(p1, p2, p3, p4, u):
+        v = 1.0 - u
+        return v * v * v * p1 + 3.0 * v * v * u * p2 + 3.0 * v * u * u * p3 + u * u * u * p4
+
+    lo = numpy.zeros(t.shape)
+    hi = numpy.ones(t.shape)
+    for _ in range(BEZIER_ITERATIONS):
+        u = (lo + hi) * 0.5
+        below = cubic(x1, x2, x3, x4, u) < t
+        lo = numpy.where(below, u, lo)
+        hi = numpy.where(below, hi, u)
+
+    return cubic(y1, y2, y3, y4, (lo + hi) * 0.5)
+
+
+def interpolate_curve(curve, times, values, handles_left, handles_right, interpolations, sample_times):
+    """Returns the values of the curve at the sample_times (a NumPy array of times without a keyframe in the curve).
+    Constant, linear and Bézier segments, and constant extrapolation, are evaluated in batch on the extracted keyframes.
+    The rest (other interpolations, linear extrapolation, modifiers) falls back to FCurve.evaluate().
+    """
+    n = len(times)
+    if n == 0 or len(curve.modifiers) > 0:
+        return numpy.array([curve.evaluate(t) for t in sample_times], dtype=numpy.float64)
+
+    times = numpy.asarray(times, dtype=numpy.float64)
+    values = numpy.asarray(values, dtype=numpy.float64)
+    hl = numpy.asarray(handles_left, dtype=numpy.float64)
+    hr = numpy.asarray(handles_right, dtype=numpy.float64)
+    codes = numpy.array([INTERPOLATION_CODES.get(i, -1) for i in interpolations], dtype=numpy.int8)
+
+    out = numpy.empty(len(sample_times), dtype=numpy.float64)
+    # Index of the keyframe starting the segment of each sample (-1 before the first keyframe)
+    seg = numpy.searchsorted(times, sample_times, side='right') - 1
+
+    before = seg < 0
+    after = seg >= n - 1
+    inside = ~(before | after)
+
+    # Extrapolation
+    out[before] = values[0]
+    out[after] = values[n - 1]
+    fallback = numpy.zeros(len(sample_times), dtype=bool)
+    if curve.extrapolation != 'CONSTANT':
+        fallback |= before | after
+
+    # Interpolation
+    i = numpy.where(inside, seg, 0)
+    j = numpy.minimum(i + 1, n - 1)
+    code = codes[i]
+
+    constant = inside & (code == 0)
+    out[constant] = values[i[constant]]
+
+    linear = inside & (code == 1)
+    if numpy.any(linear):
+        il = i[linear]
+        jl = j[linear]
+        fac = (sample_times[linear] - times[il]) / (times[jl] - times[il])
+        out[linear] = values[il] + fac * (values[jl] - values[il])
+
+    bezier = inside & (code == 2)
+    if numpy.any(bezier):
+        ib = i[bezier]
+        jb = j[bezier]
+        out[bezier] = bezier_values(sample_times[bezier],
+                                    times[ib], values[ib], hr[2 * ib], hr[2 * ib + 1],
+                                    hl[2 * jb], hl[2 * jb + 1], times[jb], values[jb])
+
+    fallback |= inside & (code < 0)
+    for k in numpy.nonzero(fallback)[0]:
+        out[k] = curve.evaluate(float(sample_times[k]))
+
+    return out
+
+
 def scanCurvesInfo(fcurves, sframe, eframe):
     """Stores the curves information within the specified time range (in frames on the timeline).
     Returns a pair:
-        First, dictionary with key=(FCurveInfo)The source FCurve information, and data=(KFInfo[]) a list of KFInfo with curve data.
+        First, dictionary with key=(FCurveInfo)The source FCurve information, and data=(CurveKeyframes) the curve data.
         Second, the number of keyframes stored for each curve (i.e., the size common to all the the vectors referenced by the dictionay values)
+    The keyframe times of all the curves are aligned: if a curve has no keyframe at a time where another curve has, its value is interpolated.
     """
 
-    n_keyframes = 0
-
-    # Prepare the output dictionary    
     out_dict = {}
-    # Prepare a temporary association between a curve and its key in the output dictionary
-    curve_to_key_map = {}
 
+    #
+    # Bulk extraction of the keyframes within the range
+    curves_kframes = []
     for curve in fcurves:
-        k = FCurveInfo(data_path=curve.data_path, array_index=curve.array_index)
-        out_dict[k] = []
-        curve_to_key_map[curve] = k
-
-    # Prepare the array of indices that will, in parallel, scan through the keyframes of the curves.
-    idxs = [-1 for i in range(len(fcurves))]
-    # idxs = []
-    for i, curve in enumerate(fcurves):
+        times, values, handles_left, handles_right = extract_keyframes(curve)
         kframes = curve.keyframe_points
-        idx = 0
-        while idx < len(kframes):
-            time = kframes[idx].co[0]
-
-            # if the time of the next keyframe is already within the required range, stop here.
-            if time < sframe:
-                idxs[i] = idx
-            else:
-                break
-
-            idx += 1    # next kframe
-            
-        # log("First start kf for curve " + str(i) + " = " + str(idxs[i]))
-        # log("Curve Info: " + str(curve_info))
-
-    # Scan the curves in parallel, advancing to the next keyframe with lower timestamp among all curves.
-    # When a new keyframe is found, the value is taken from all curves.
-    # If a curve has not a keyframe for that time, its value is evaluated.
-    done = False
-    while not done:
-
-        # Take the minimum of the next times among the curves
-        next_min_time = sys.maxsize # let's say "infinite"
-        for i, curve in enumerate(fcurves):
-            # log_curves_info([curve])
-            kframes = curve.keyframe_points
-            idx = idxs[i]
-            if idx < len(kframes) - 1:     # if there is still a "next keyframe"
-                next_time = kframes[idx+1].co[0]    # take time of next keyframe
-                # if the next time is the new minimum AND still inside the desired range.
-                if next_time < next_min_time and next_time <= eframe:      # store the minimum of them
-                    # log("  Next min time found in curve " + str(i) + " at idx " + str(idx+1) + ":" + str(next_time))
-                    next_min_time = next_time
-
-        # log("Next min time is " + str(next_min_time) )
-
-        # If a valid next_min_time is found: advance indices and store the keyframe values.
-        if next_min_time != sys.maxsize:
-            #
-            # Take note of the new KF count
-            n_keyframes += 1
-
-            #
-            # Advance all the indices pointing to the next min time
-            for i, curve in enumerate(fcurves):
-                kframes = curve.keyframe_points
-                idx = idxs[i]
-                if idx < len(kframes) -1:
-                    if kframes[idx+1].co[0] <= next_min_time:
-                        # log("Advancing frame to " + str(idx+1) + " for curve " + str(i)) # + ": ", end="")
-                        idxs[i] += 1                            # advance the kexframe
-
-            #
-            # Store value or interpolate
-            for i, curve in enumerate(fcurves):
-                kframes = curve.keyframe_points
-                idx = idxs[i]
-                curve_info = curve_to_key_map[curve]
-
-                # What's the time of the current keyframe?
-                time_at_index = None
-                if idx >= 0 and idx < len(kframes):
-                    time_at_index = kframes[idx].co[0]
-
-                # log("STORE crv " + str(i) + ", idx " + str(idx) + ", t " + str(time_at_index))
-
-                if time_at_index == next_min_time:   # we are on time, store vertex info
-                    new_kf_info = KFInfo.fromKeyFrame(kf=kframes[idx])
-                    
-                    # curve_data_key = curve_to_key_map[curve]
-                    val = kframes[idx].co[1]
-    
-                    # UPDATE MIN/MAX
-                    # log("->"+str(val))
-                    if val > curve_info.max_val:
-                        # log("bigger than "+str(curve_info.max_val))
-                        curve_info.max_val = val            
-                    if val < curve_info.min_val:
-                        # log("smaller than "+str(curve_info.min_val))
-                        curve_info.min_val = val
-    
-                else:                                   # otherwise we interpolate the value
-                    val = curve.evaluate(next_min_time)
-                    p = mathutils.Vector((next_min_time, val))
-                    new_kf_info = KFInfo.fromCoords(vector=p)
-            
-                # log("Adding " + str(newKFInfo.co) + " hasTng=" + str(newKFInfo.hasTangentsData))
-            
-                # Finally, store the value
-                out_dict[curve_info].append(new_kf_info)
+        # The enum attributes can't be retrieved with foreach_get
+        interpolations = [kf.interpolation for kf in kframes]
+        handle_types = [(kf.handle_left_type, kf.handle_right_type) for kf in kframes]
+        first = bisect.bisect_left(times, sframe)
+        last = bisect.bisect_right(times, eframe)
+        curves_kframes.append((times, values, handles_left, handles_right, interpolations, handle_types, first, last))
 
+    #
+    # k-way merge of the (sorted) keyframe times of all the curves, without duplicates
+    aligned_times = []
+    for t in heapq.merge(*[[float(x) for x in ck[0][ck[6]:ck[7]]] for ck in curves_kframes]):
+        if len(aligned_times) == 0 or t != aligned_times[-1]:
+            aligned_times.append(t)
+    n_keyframes = len(aligned_times)
+    if USE_NUMPY:
+        aligned_array = numpy.array(aligned_times, dtype=numpy.float64)
+
+    #
+    # For each curve: keyframes at the aligned times are stored with their tangents, the other times are interpolated
+    for curve, ck in zip(fcurves, curves_kframes):
+        times, values, handles_left, handles_right, interpolations, handle_types, first, last = ck
+        curve_info = FCurveInfo(data_path=curve.data_path, array_index=curve.array_index)
+
+        # Position, in aligned_times, of each keyframe of the curve within the range (both are sorted)
+        own_positions = {}
+        pos = 0
+        for idx in range(first, last):
+            t = float(times[idx])
+            while aligned_times[pos] != t:
+                pos += 1
+            own_positions[pos] = idx
+
+        missing = [pos for pos in range(n_keyframes) if pos not in own_positions]
+        if USE_NUMPY:
+            missing_values = interpolate_curve(curve, times, values, handles_left, handles_right, interpolations,
+                                               aligned_array[missing])
         else:
-            # In this case, all the indices reached the end of the curves, and none was able to record a new "min_time"
-            done = True
+            missing_values = [curve.evaluate(aligned_times[pos]) for pos in missing]
+        missing_values = dict(zip(missing, missing_values))
+
+        kframes_info = CurveKeyframes(n_keyframes)
+        kframes_info.times = array.array('f', aligned_times)
+        for pos in missing:
+            kframes_info.values[pos] = float(missing_values[pos])
+
+        for pos, idx in own_positions.items():
+            val = float(values[idx])
+            kframes_info.setKeyframe(pos, co=(float(times[idx]), val),
+                                     interpolation=interpolations[idx],
+                                     handle_left=(float(handles_left[2*idx]), float(handles_left[2*idx+1])),
+                                     handle_left_type=handle_types[idx][0],
+                                     handle_right=(float(handles_right[2*idx]), float(handles_right[2*idx+1])),
+                                     handle_right_type=handle_types[idx][1])
+            # UPDATE MIN/MAX
+            if val > curve_info.max_val:
+                curve_info.max_val = val
+            if val < curve_info.min_val:
+                curve_info.min_val = val
+
+        out_dict[curve_info] = kframes_info
 
     return out_dict, n_keyframes
 
@@ -243,7 +435,7 @@ def scanCurvesInfo(fcurves, sframe, eframe):
 #
 def normalizeCurvesInfo(curves_data):
     """Normalize all the curves in parallel. Every curve keyframe value will range in [0,1].
-    curves_info is expected to be a dictionary with key=(FCurveInfo)The source FCurve information, and data=(KFInfo[]) a list of KFInfo with curve data.
+    curves_info is expected to be a dictionary with key=(FCurveInfo)The source FCurve information, and data=(CurveKeyframes) the curve data.
     Each curve will be normalized according to its min/max value.
     Outputs a dictionary with the same structure of the input one. The keys will be shared, the data vectors will be replaced by new instances."""
 
@@ -258,8 +450,7 @@ def normalizeCurvesInfo(curves_data):
         # Look for max absolute value in current data
         max_val = 0.0
 
-        for kfinfo in kframesinfo:            
-            val = kfinfo.co[1]
+        for val in kframesinfo.values:
             # UPDATE MAX
             if abs(val) > max_val:
                 max_val = val            
@@ -268,18 +459,12 @@ def normalizeCurvesInfo(curves_data):
 
         #
         # Now normalize all values towards [0,1]
-        new_frames = []        
-        for kfinfo in kframesinfo:
-            if max_val>0:
-                new_val = kfinfo.co[1] / max_val
-            else:
-                new_val = kfinfo.co[1]
-
-            p = mathutils.Vector((kfinfo.co[0], new_val))
-            new_kf = KFInfo.fromCoords(p)
-            new_frames.append(new_kf)
+        if max_val>0:
+            new_values = [val / max_val for val in kframesinfo.values]
+        else:
+            new_values = kframesinfo.values
 
-        out_dict[curve_info] = new_frames
+        out_dict[curve_info] = CurveKeyframes.fromCoords(kframesinfo.times, new_values)
 
     return out_dict
 
@@ -312,17 +497,37 @@ def get_max_offset(curves_data) -> float:
         if len(frames_info) < 2:
             return 0
         
-        p1 = frames_info[0].co
-        p2 = frames_info[len(frames_info)-1].co
+        p1 = frames_info.co(0)
+        p2 = frames_info.co(len(frames_info)-1)
         
-        for kfinfo in frames_info:
-            offset = altitude(p1, p2, kfinfo.co)
+        for idx in range(len(frames_info)):
+            offset = altitude(p1, p2, frames_info.co(idx))
             if offset > max_offset:
                 max_offset = offset
     
     return max_offset
 
 
+def prepare_simplification(curves_data, normalize):
+    """Normalizes the curves (if requested) and computes their max offset, the reference for the simplification error.
+    Returns the triple (curves data, curves array, max offset) to give to simplify_curves or SimplificationHierarchy.
+    With NumPy, normalization and max offset are computed in one vectorized pass on the curves array,
+    and the returned curves data is the input one: the normalized KFInfo are not built.
+    Without NumPy, the curves array is None and the curves data is normalized by normalizeCurvesInfo.
+    """
+    if USE_NUMPY:
+        curves_array = curves_data_to_array(curves_data)
+        if normalize:
+            curves_array, max_offset = normalize_array(curves_array)
+        else:
+            max_offset = max_offset_array(curves_array)
+        return curves_data, curves_array, max_offset
+
+    if normalize:
+        curves_data = normalizeCurvesInfo(curves_data)
+    return curves_data, None, get_max_offset(curves_data)
+
+
 def simplify_curves_R(curves_data, s_idx, e_idx, threshold_error, indices):
     """Applies a modified version of the Ramer–Douglas–Peucker algorithm to simplify multiple curves in parallel.
     See http://en.wikipedia.org/wiki/Ramer%E2%80%93Douglas%E2%80%93Peucker_algorithm
@@ -343,7 +548,7 @@ def simplify_curves_R(curves_data, s_idx, e_idx, threshold_error, indices):
         # For all the indices within the range
         for idx in range(s_idx+1, e_idx):
             # log("Considering index " + str(idx) + ": " + str(kframes[idx].co))
-            error = altitude(point1=kframes[s_idx].co, point2=kframes[e_idx].co, pointn=kframes[idx].co)
+            error = altitude(point1=kframes.co(s_idx), point2=kframes.co(e_idx), pointn=kframes.co(idx))
             # log("Error="+str(error))
             if error > threshold_error:
                 bigErrorFound = True
@@ -362,7 +567,7 @@ def simplify_curves_R(curves_data, s_idx, e_idx, threshold_error, indices):
         
         # error_time = bigErrorCurve.keyframe_points[bigErrorIdx].co[0]
         kframes = curves_data[bigErrorCurve]
-        error_time = kframes[bigErrorIdx].co[0]
+        error_time = kframes.times[bigErrorIdx]
         # log("Biggest Error in curve " + bigErrorCurve.data_path + str(bigErrorCurve.array_index) + ": " + str(bigErrorValue) + " time="+str(error_time) + " (idx " + str(bigErrorIdx) + ")")
 
         # log("RECURSING")
@@ -373,9 +578,23 @@ def simplify_curves_R(curves_data, s_idx, e_idx, threshold_error, indices):
         simplify_curves_R(curves_data, bigErrorIdx, e_idx, threshold_error, indices)
         
 
-def simplify_curves(curves_data, n_frames, error):
+def curves_data_to_array(curves_data):
+    """Converts the curves_data dictionary into a NumPy array of shape (n_curves, n_frames, 2) holding (time, value) pairs.
+    The curves are in the iteration order of the dictionary, the same used by simplify_curves_R.
+    """
+    n_frames = len(next(iter(curves_data.values()))) if len(curves_data) > 0 else 0
+    curves_array = numpy.empty((len(curves_data), n_frames, 2), dtype=numpy.float64)
+    for i, frames_info in enumerate(curves_data.values()):
+        curves_array[i, :, 0] = numpy.frombuffer(frames_info.times, dtype=numpy.float32)
+        curves_array[i, :, 1] = numpy.frombuffer(frames_info.values, dtype=numpy.float32)
+    return curves_array
+
+
+def simplify_curves(curves_data, n_frames, error, curves_array=None):
     """Applies a modified version of the Ramer–Douglas–Peucker algorithm to simplify multiple curves in parallel.
     See http://en.wikipedia.org/wiki/Ramer%E2%80%93Douglas%E2%80%93Peucker_algorithm
+
+    If NumPy is available, curves_array can be given to avoid converting the curves_data at each call (see curves_data_to_array).
     
     Returns the array of the indices to keep for the reconstruction.
     """
@@ -394,9 +613,14 @@ def simplify_curves(curves_data, n_frames, error):
     # Prepare the vector that will be filled with the indices to keep
     indices_to_keep = [0, n_frames-1]
 
-    # Recurse to retrieve the indices of the keyframes to keep
+    # Retrieve the indices of the keyframes to keep
     # By definition of the function, the first and the last will be kept for sure.
-    simplify_curves_R(curves_data, 0, n_frames-1, threshold_error=error, indices=indices_to_keep)
+    if USE_NUMPY:
+        if curves_array is None:
+            curves_array = curves_data_to_array(curves_data)
+        simplify_curves_array(curves_array, threshold_error=error, indices=indices_to_keep)
+    else:
+        simplify_curves_R(curves_data, 0, n_frames-1, threshold_error=error, indices=indices_to_keep)
     indices_to_keep.sort()
     
     log("Keeping " + str(len(indices_to_keep)) + " keyframes: " + str(indices_to_keep))
@@ -404,70 +628,267 @@ def simplify_curves(curves_data, n_frames, error):
     return indices_to_keep
 
 
-def apply_simplification(selected_curves, sframe, eframe, curves_data, indices_to_keep):
+def max_altitude(curves_data, s_idx, e_idx):
+    """Returns the pair (max error, index) among all the curves for the keyframes in ]s_idx,e_idx[.
+    Ties are resolved as in simplify_curves_R.
+    """
+    max_error = -1
+    max_idx = None
+    for kframes in curves_data.values():
+        p1 = kframes.co(s_idx)
+        p2 = kframes.co(e_idx)
+        for idx in range(s_idx+1, e_idx):
+            error = altitude(point1=p1, point2=p2, pointn=kframes.co(idx))
+            if error > max_error:
+                max_error = error
+                max_idx = idx
+    return max_error, max_idx
+
+
+class SimplificationHierarchy:
+    """The complete split hierarchy of the multi-curve Ramer–Douglas–Peucker simplification, built once.
+    For each keyframe index it stores the 'keep error': simplify_curves keeps the index for all the error thresholds below it.
+    It is the error at which the index splits its segment, limited by the keep errors of the splits above it.
+    Any error threshold, or max number of keyframes, can then be answered without running the simplification again.
+    """
+
+    def __init__(self, curves_data, n_frames, curves_array=None, keep_errors=None):
+        """keep_errors can be given if already computed, e.g., by SimplifyCore.keep_errors_array in a worker process."""
+        self.n_frames = n_frames
+
+        if keep_errors is not None:
+            self.keep_errors = keep_errors
+        elif USE_NUMPY:
+            if curves_array is None:
+                curves_array = curves_data_to_array(curves_data)
+            self.keep_errors = keep_errors_array(curves_array)
+        else:
+            # The borders are always kept
+            self.keep_errors = [0.0] * n_frames
+            self.keep_errors[0] = float('inf')
+            self.keep_errors[n_frames-1] = float('inf')
+
+            # Split all the segments, down to the single keyframes
+            stack = [(0, n_frames-1, float('inf'))]
+            while stack:
+                s_idx, e_idx, parent_error = stack.pop()
+                if e_idx - s_idx < 2:
+                    continue
+
+                error, split_idx = max_altitude(curves_data, s_idx, e_idx)
+
+                keep_error = min(error, parent_error)
+                self.keep_errors[split_idx] = keep_error
+                stack.append((s_idx, split_idx, keep_error))
+                stack.append((split_idx, e_idx, keep_error))
+
+        self.sorted_errors = sorted(self.keep_errors)
+
+    def count_for_error(self, error) -> int:
+        """Number of keyframes kept by simplify_curves with the given error."""
+        return self.n_frames - bisect.bisect_right(self.sorted_errors, error)
+
+    def indices_for_error(self, error):
+        """The same indices returned by simplify_curves with the given error."""
+        return [idx for idx, keep_error in enumerate(self.keep_errors) if keep_error > error]
+
+    def error_for_max_keyframes(self, max_kf) -> float:
+        """The smallest error keeping at most max_kf keyframes (and at least the 2 borders)."""
+        max_kf = max(max_kf, 2)
+        if max_kf >= self.n_frames:
+            return 0.0
+        return self.sorted_errors[self.n_frames - 1 - max_kf]
+
+    def indices_for_max_keyframes(self, max_kf):
+        return self.indices_for_error(self.error_for_max_keyframes(max_kf))
+
+
+# Weight pulling the fitted handles towards the ones of a straight segment.
+# Keeps the fit defined for the segments with less than 2 keyframes in between.
+HANDLES_FIT_REGULARIZATION = 1e-4
+
+
+def fit_curve_handles(kframes, indices):
+    """Pure Python version of SimplifyCore.fit_handles_array for a single curve (a CurveKeyframes).
+    Returns the pair of flat lists (handles_left, handles_right), with the (time, value) pairs of the handles of each kept index."""
+    times = kframes.times
+    values = kframes.values
+    handles_left = []
+    handles_right = []
+    for idx in indices:
+        handles_left.extend((times[idx] - 1.0, values[idx]))
+        handles_right.extend((times[idx] + 1.0, values[idx]))
+    if len(indices) < 2:
+        return handles_left, handles_right
+
+    for seg in range(len(indices) - 1):
+        s_idx, e_idx = indices[seg], indices[seg + 1]
+        t0, v0 = times[s_idx], values[s_idx]
+        t1, v1 = times[e_idx], values[e_idx]
+        dt = t1 - t0
+
+        # Normal equations of: b1 * y1 + b2 * y2 = value - b0 * v0 - b3 * v1, with the Bernstein basis at each keyframe
+        a11 = a12 = a22 = r1 = r2 = 0.0
+        for idx in range(s_idx + 1, e_idx):
+            u = (times[idx] - t0) / dt
+            w = 1.0 - u
+            b1 = 3.0 * w * w * u
+            b2 = 3.0 * w * u * u
+            target = values[idx] - w * w * w * v0 - u * u * u * v1
+            a11 += b1 * b1
+            a12 += b1 * b2
+            a22 += b2 * b2
+            r1 += target * b1
+            r2 += target * b2
+        a11 += HANDLES_FIT_REGULARIZATION
+        a22 += HANDLES_FIT_REGULARIZATION
+        r1 += HANDLES_FIT_REGULARIZATION * (v0 + (v1 - v0) / 3.0)
+        r2 += HANDLES_FIT_REGULARIZATION * (v1 - (v1 - v0) / 3.0)
+
+        det = a11 * a22 - a12 * a12
+        handles_right[seg * 2:seg * 2 + 2] = t0 + dt / 3.0, (a22 * r1 - a12 * r2) / det
+        handles_left[seg * 2 + 2:seg * 2 + 4] = t1 - dt / 3.0, (a11 * r2 - a12 * r1) / det
+
+    # Borders: mirror the inner handle
+    first, last = indices[0], indices[-1]
+    handles_left[0:2] = 2.0 * times[first] - handles_right[0], 2.0 * values[first] - handles_right[1]
+    handles_right[-2:] = 2.0 * times[last] - handles_left[-2], 2.0 * values[last] - handles_left[-1]
+
+    return handles_left, handles_right
+
+
+def fit_bezier_handles(curves_data, indices_to_keep):
+    """Fits the Bézier handles of the simplified curves against all their stored keyframes, see SimplifyCore.fit_handles_array.
+    curves_data must be the original (not normalized) data, as given to apply_simplification.
+    Returns the dictionary from the FCurveInfo to the pair of flat lists (handles_left, handles_right) for the kept indices.
+    """
+    if USE_NUMPY:
+        curves_array = curves_data_to_array(curves_data)
+        handles_left, handles_right = fit_handles_array(curves_array, indices_to_keep, HANDLES_FIT_REGULARIZATION)
+        n_curves = len(curves_data)
+        return dict(zip(curves_data.keys(), zip(handles_left.reshape(n_curves, -1).tolist(),
+                                                handles_right.reshape(n_curves, -1).tolist())))
+
+    return {curve_key: fit_curve_handles(kframes, indices_to_keep) for curve_key, kframes in curves_data.items()}
+
+
+# Keyframe properties copied when the points after the range are moved (see apply_simplification).
+# The enums are copied one keyframe at a time, the selection flags in bulk. Coordinates and handles are written with the new points.
+KEYFRAME_ENUM_PROPERTIES = ["interpolation", "handle_left_type", "handle_right_type"]
+KEYFRAME_SELECT_PROPERTIES = ["select_control_point", "select_left_handle", "select_right_handle"]
+
+
+def apply_simplification(selected_curves, sframe, eframe, curves_data, indices_to_keep, handles=None):
     """Applies the simplification result to the actual curves selection.
-    First delets all the keyframes within the specified range, then re-build the keyframes according to the fcurves_data and the indices to keep.
+    The keyframes within the specified range are replaced by the ones of the fcurves_data at the indices to keep.
+    The keyframe points are rebuilt in bulk: the points in range are reused, the missing ones are appended with add(),
+    all the coordinates are written with one foreach_set(), and the curve is sorted and its handles recomputed by a single update().
+    If there are fewer new points than points in range, the points after the range are moved right after the new points,
+    and the exceeding points are removed from the end of the curve, so that no removal shifts the other points (as TrimFCurves.trim_fcurve).
+    If handles is given (see fit_bezier_handles), the new keyframes get those Bézier handles, of FREE type so that update() keeps them.
+    Otherwise, their handles are computed by Blender according to the user preferences for new keyframes.
     """
 
-    def get_curve(curve_info):
-        """Returns the curve with corresponding key info (data_path and array_index) from the selection.
-        Returns None if the curve cannot be found.
-        """
+    # Map the stored curve keys (data_path and array_index) to the curves of the current selection
+    curves_map = {(c.data_path, c.array_index): c for c in selected_curves}
+
+    if handles is None:
+        edit_prefs = bpy.context.user_preferences.edit
+        new_interpolation = edit_prefs.keyframe_new_interpolation_type
+        new_handle_type = edit_prefs.keyframe_new_handle_type
+    else:
+        new_interpolation = 'BEZIER'
+        new_handle_type = 'FREE'
 
-        out = None        
-        for c in selected_curves:
-            if curve_info.data_path == c.data_path and curve_info.array_index == c.array_index:
-                out = c
-                break
-        return out
-    
     # Update the keyframes of the selected curves
     for curve_key in curves_data.keys():
-        # retrieves the curve with corresponding key info from the selection      
-        curve = get_curve(curve_key)
-        
-        # log("Retrieved from selection: " + str(curve))
-        
+        curve = curves_map.get((curve_key.data_path, curve_key.array_index))
+
         if curve is None:
             log("No data were stored for curve: " + curve_key.data_path + str(curve_key.array_index))
             continue                            # <---- Warning!!! Skip cycle.
-        
-        # log("Before: ", end="")
-        # log_curves_info([curve])
-        
+
         kframes = curve.keyframe_points
+        n_old = len(kframes)
+        co = [0.0] * (n_old * 2)
+        handles_left = [0.0] * (n_old * 2)
+        handles_right = [0.0] * (n_old * 2)
+        kframes.foreach_get("co", co)
+        kframes.foreach_get("handle_left", handles_left)
+        kframes.foreach_get("handle_right", handles_right)
+        times = co[0::2]
+
+        # Range of the keyframes to replace
+        first = bisect.bisect_left(times, sframe)
+        last = bisect.bisect_right(times, eframe)
+        n_range = last - first
+
+        # New points. Handles are placed as by keyframe_points.insert(), one frame away from the point.
+        kfdata = curves_data[curve_key]
+        n_new = len(indices_to_keep)
+        new_co = []
+        new_handles_left = []
+        new_handles_right = []
+        for i in indices_to_keep:
+            t, v = kfdata.times[i], kfdata.values[i]
+            new_co.extend((t, v))
+            new_handles_left.extend((t - 1.0, v))
+            new_handles_right.extend((t + 1.0, v))
+        if handles is not None:
+            new_handles_left, new_handles_right = handles[curve_key]
 
         #
-        # DELETE existing keyframes
-
-        # move to the first valid kf
-        idx = 0
-        while idx < len(kframes):
-            if kframes[idx].co[0] >= sframe:
-                break
-            idx += 1
-        # delete as long as the time is within the range
-        while idx < len(kframes):
-            time = kframes[idx].co[0]
-            if time > eframe:
-                break
-            # log("Deleting kframe " + str(idx))
-            kframes.remove(kframes[idx])
-            
-        #
-        # RE-ADDING FRAMES
+        # RESIZE, reusing the points within the range
+        if n_new > n_range:
+            kframes.add(n_new - n_range)
+            new_slots = list(range(first, last)) + list(range(n_old, n_old + n_new - n_range))
+        else:
+            n_removed = n_range - n_new
+            n_moved = n_old - last
+            moved_enums = {}
+            moved_flags = {}
+            if n_removed > 0 and n_moved > 0:
+                # Properties of the points after the range, in their new slots, starting at first + n_new
+                for prop in KEYFRAME_ENUM_PROPERTIES:
+                    moved_enums[prop] = [getattr(kframes[idx], prop) for idx in range(last, n_old)]
+                for prop in KEYFRAME_SELECT_PROPERTIES:
+                    flags = [False] * n_old
+                    kframes.foreach_get(prop, flags)
+                    moved_flags[prop] = flags[:first + n_new] + flags[last:]
+
+            for idx in range(n_old - 1, n_old - n_removed - 1, -1):
+                kframes.remove(kframes[idx], fast=True)
+
+            # Enums can't be set in bulk. Recorded curves have mostly the same types everywhere: only the differing ones are written.
+            for prop, values in moved_enums.items():
+                for i, value in enumerate(values):
+                    kf = kframes[first + n_new + i]
+                    if getattr(kf, prop) != value:
+                        setattr(kf, prop, value)
+            for prop, flags in moved_flags.items():
+                kframes.foreach_set(prop, flags)
+            new_slots = range(first, first + n_new)
+
+        # Enum properties cannot be set in bulk.
+        # They are set before the handles, so that the fitted handles are not recomputed for the previous handle type.
+        for idx in new_slots:
+            kf = kframes[idx]
+            kf.interpolation = new_interpolation
+            kf.handle_left_type = new_handle_type
+            kf.handle_right_type = new_handle_type
 
-        # log("ADDING FRAMES in: " + curve_key.data_path + str(curve_key.array_index))
-        kfdata = curves_data[curve_key]
+        #
+        # WRITE all the points at once. Points before and after the range are unchanged, the new points fill the reused and appended slots.
+        # The order of the points does not matter: update() sorts them by time.
+        def rebuild(old, new):
+            n_reused = min(n_new, n_range) * 2
+            return old[:first * 2] + new[:n_reused] + old[last * 2:] + new[n_reused:]
 
-        # Single Step: tangent data ignored
-        for i in indices_to_keep:
-            # log("Adding coordinates for index " + str(i) + " " + str(kfdata[i].co))
-            kfinfo = kfdata[i]
-            newkf = kframes.insert(frame=kfinfo.co[0], value=kfinfo.co[1], options={'FAST'})
+        kframes.foreach_set("co", rebuild(co, new_co))
+        kframes.foreach_set("handle_left", rebuild(handles_left, new_handles_left))
+        kframes.foreach_set("handle_right", rebuild(handles_right, new_handles_right))
 
-        # log("After: ", end="")
-        # print_curves_info([curve])
+        curve.update()
 
 
 #########################################################################
@@ -497,6 +918,19 @@ def get_range(curves):
     return min_val, max_val
 
 
+def get_selected_range(selected_fcurves):
+    """Returns the frame range to simplify: the preview range, if used, or the range of the selected curves."""
+    scene = bpy.context.scene
+    if scene.use_preview_range:
+        sframe = scene.frame_preview_start
+        eframe = scene.frame_preview_end
+    else:
+        sframe, eframe = get_range(selected_fcurves)
+        # if(sframe == None):
+        #     operator.report({'ERROR'}, "No curves selected!")
+    return sframe, eframe
+
+
 def get_selected_fcurves(context):
     obj = context.active_object
 
@@ -506,15 +940,7 @@ def get_selected_fcurves(context):
         if fc.select:
             selected_fcurves.append(fc)
 
-    # retrieve range
-    scene = bpy.context.scene
-    if scene.use_preview_range:
-        sframe = scene.frame_preview_start
-        eframe = scene.frame_preview_end
-    else:
-        sframe, eframe = get_range(selected_fcurves)
-        # if(sframe == None):
-        #     operator.report({'ERROR'}, "No curves selected!")
+    sframe, eframe = get_selected_range(selected_fcurves)
 
     log("Selected " + str(len(selected_fcurves)) + " curves in range " + str(sframe) + "-" + str(eframe))
 
@@ -569,6 +995,192 @@ def poll_for_fcurves(context):
     return False
 
 
+#########################################################################
+# Simplification of independent groups of curves
+#########################################################################
+
+# Group of the curves not belonging to a pose bone
+OBJECT_GROUP = "Object"
+
+BONE_PATH_RE = re.compile(r'pose\.bones\["(.+?)"\]')
+
+
+def build_body_parts():
+    """Returns the dictionary from MakeHuman bone names to the name of their body part.
+    Empty if MakeHumanTools is not available."""
+    body_parts = {}
+    if BoneSet is None:
+        return body_parts
+
+    parts = [("arms", BoneSet.MH_ARM_CONTROLLERS),
+             ("hand.R", BoneSet.MH_HAND_CONTROLLERS_R + BoneSet.MH_HAND_BONES_R),
+             ("hand.L", BoneSet.MH_HAND_CONTROLLERS_L + BoneSet.MH_HAND_BONES_L),
+             ("legs", BoneSet.MH_LEG_CONTROLLERS),
+             ("head", BoneSet.MH_HEAD_CONTROLLERS),
+             ("face", BoneSet.MH_FACIAL_CONTROLLERS + BoneSet.MH_EYELID_CONTROLLERS),
+             ("body", BoneSet.MH_BODY_CONTROLLERS)]
+    for part, bones in parts:
+        for bone in bones:
+            body_parts[bone] = part
+    return body_parts
+
+
+MH_BODY_PARTS = build_body_parts()
+
+
+def group_fcurves(fcurves, grouping):
+    """Partitions the curves into groups, according to the simplify_fcurves_groups option ('BONE' or 'BODY_PART').
+    The bones not belonging to a MakeHuman body part form a group each.
+    Returns a list of pairs (group name, list of curves), in selection order.
+    """
+    groups = []
+    group_index = {}
+    for curve in fcurves:
+        match = BONE_PATH_RE.match(curve.data_path)
+        if match is None:
+            name = OBJECT_GROUP
+        else:
+            name = match.group(1)
+            if grouping == 'BODY_PART':
+                name = MH_BODY_PARTS.get(name, name)
+
+        if name not in group_index:
+            group_index[name] = len(groups)
+            groups.append((name, []))
+        groups[group_index[name]][1].append(curve)
+
+    return groups
+
+
+def simplify_group(curves_data, curves_array, n_frames, error):
+    """Serial counterpart of the SimplifyCore worker tasks. The arguments are as returned by prepare_simplification.
+    If error is None, returns the keep errors of the SimplificationHierarchy, otherwise the indices kept by simplify_curves.
+    Returns the pair (result, computation time in seconds)."""
+    start = time.time()
+    if error is None:
+        result = SimplificationHierarchy(curves_data=curves_data, n_frames=n_frames, curves_array=curves_array).keep_errors
+    else:
+        result = simplify_curves(curves_data=curves_data, n_frames=n_frames, error=error, curves_array=curves_array)
+    return result, time.time() - start
+
+
+# The groups are simplified by worker processes only if they have at least this number of keyframes in total.
+# Below it, starting the processes costs more than the simplification.
+MULTIPROCESS_MIN_KEYFRAMES = 200000
+
+
+def simplify_groups_parallel(curves_arrays, error):
+    """Runs the SimplifyCore tasks for the arrays of all the groups in a pool of worker processes.
+    If error is None, the tasks compute the keep errors, otherwise the kept indices.
+    Returns the list of pairs (result, computation time in seconds), in the order of the arrays."""
+
+    # The workers are always spawned: forking would copy the whole multi-threaded Blender process (e.g., with the LeapReceiver thread).
+    # A dedicated context is used, so that the start method of the multiprocessing module is left untouched.
+    mp_context = multiprocessing.get_context('spawn')
+
+    # Inside Blender, sys.executable is Blender itself. Spawned workers must be started with its Python interpreter.
+    # The executable is global to the spawn module: it is restored once the workers are started.
+    python_path = getattr(bpy.app, "binary_path_python", "")
+    previous_executable = multiprocessing.spawn.get_executable()
+    if python_path:
+        multiprocessing.spawn.set_executable(python_path)
+    try:
+        pool = mp_context.Pool(processes=min(len(curves_arrays), multiprocessing.cpu_count()))
+    finally:
+        multiprocessing.spawn.set_executable(previous_executable)
+
+    with pool:
+        if error is None:
+            tasks = [pool.apply_async(SimplifyCore.keep_errors_task, (curves_array,)) for curves_array in curves_arrays]
+        else:
+            tasks = [pool.apply_async(SimplifyCore.simplify_task, (curves_array, error)) for curves_array in curves_arrays]
+        return [task.get() for task in tasks]
+
+
+def simplify_by_groups(operator, context, selected_fcurves, sframe, eframe, max_keyframes=None):
+    """Simplifies each group of curves independently: the keyframes are aligned only among the curves of the same group.
+    If max_keyframes is None, the simplification is by error (simplify_fcurves_error), otherwise by max number of keyframes per group.
+    The curves are scanned and rebuilt on the main thread. If NumPy is available, the simplify_fcurves_multiprocess option is set,
+    and the groups have at least MULTIPROCESS_MIN_KEYFRAMES keyframes, they are simplified in parallel by worker processes.
+    The speedup over the serial computation is reported.
+    """
+    scene = context.scene
+    groups = group_fcurves(selected_fcurves, scene.simplify_fcurves_groups)
+    log("Simplifying " + str(len(groups)) + " groups: " + str([name for name, _ in groups]))
+
+    #
+    # Extract the data of each group
+    before = time.time()
+    groups_data = []    # Tuples (group name, fcurves_data, n_frames, data to simplify, curves array)
+    max_offset = 0.0
+    for name, fcurves in groups:
+        fcurves_data, n_frames = scanCurvesInfo(fcurves=fcurves, sframe=sframe, eframe=eframe)
+        if n_frames < 2:
+            log("Skipping group " + name + ": less than 2 KF in range")
+            continue
+        data, curves_array, group_max_offset = prepare_simplification(fcurves_data, scene.simplify_fcurves_normalize)
+        max_offset = max(max_offset, group_max_offset)
+        groups_data.append((name, fcurves_data, n_frames, data, curves_array))
+    elapsed = time.time() - before
+    log("Storing time (secs): "+str(elapsed))
+
+    if len(groups_data) == 0:
+        operator.report({'ERROR'}, "At least 2 KF must be in selected range!")
+        return {'CANCELLED'}
+
+    # The error is relative to the max offset of all the selected curves, as for the simplification without groups
+    error = None
+    if max_keyframes is None:
+        error = max_offset * scene.simplify_fcurves_error / 100.0
+        log("Simplifying with error: "+str(error))
+
+    #
+    # Simplify
+    before = time.time()
+    results = None
+    n_keyframes = sum(len(fcurves_data) * n_frames for _, fcurves_data, n_frames, _, _ in groups_data)
+    parallel = USE_NUMPY and scene.simplify_fcurves_multiprocess and len(groups_data) > 1 and n_keyframes >= MULTIPROCESS_MIN_KEYFRAMES
+    if parallel:
+        curves_arrays = [curves_array for _, _, _, _, curves_array in groups_data]
+        try:
+            results = simplify_groups_parallel(curves_arrays, error)
+        except (OSError, RuntimeError) as e:
+            log("Multiprocess simplification failed (" + str(e) + "). Running serially.")
+            parallel = False
+    if results is None:
+        results = [simplify_group(data, curves_array, n_frames, error) for _, _, n_frames, data, curves_array in groups_data]
+    wall_time = time.time() - before
+    serial_time = sum(elapsed for _, elapsed in results)
+    log("Simplification time (secs): " + str(wall_time) + " (serial: " + str(serial_time) + ")")
+
+    #
+    # Rebuild the curves
+    before = time.time()
+    for (name, fcurves_data, n_frames, data, _), (result, _) in zip(groups_data, results):
+        if max_keyframes is None:
+            kept_indices = result
+        else:
+            hierarchy = SimplificationHierarchy(curves_data=data, n_frames=n_frames, keep_errors=result)
+            kept_indices = hierarchy.indices_for_max_keyframes(max_keyframes)
+        log("Group " + name + ": keeping " + str(len(kept_indices)) + " of " + str(n_frames) + " KFs")
+        handles = None
+        if scene.simplify_fcurves_fit_handles:
+            handles = fit_bezier_handles(curves_data=fcurves_data, indices_to_keep=kept_indices)
+        apply_simplification(selected_curves=selected_fcurves, sframe=sframe, eframe=eframe,
+                             curves_data=fcurves_data, indices_to_keep=kept_indices, handles=handles)
+    elapsed = time.time() - before
+    log("Reconstruction time (secs): "+str(elapsed))
+
+    if parallel:
+        speedup = serial_time / wall_time if wall_time > 0 else 1.0
+        operator.report({'INFO'}, "Simplified %d groups in %.2fs with %d processes (serial %.2fs, speedup %.1fx)"
+                        % (len(groups_data), wall_time, min(len(groups_data), multiprocessing.cpu_count()), serial_time, speedup))
+    else:
+        operator.report({'INFO'}, "Simplified %d groups in %.2fs" % (len(groups_data), wall_time))
+
+    return {'FINISHED'}
+
+
 ###########################################################################################
 #### ANIMATION CURVES OPERATOR: DESELECT ALL ANIMATION FCURVES FOR THE ACTIVE OBJECT ##################
 ###########################################################################################
@@ -624,6 +1236,9 @@ class GRAPH_OT_SimplifyMultipleCurves(bpy.types.Operator):
         print_curves_info(selected_fcurves)
         log("*"*20)
 
+        if context.scene.simplify_fcurves_groups != 'NONE':
+            return simplify_by_groups(self, context, selected_fcurves, sframe, eframe)
+
         #
         # fill the fcurves_data and fcurves_max_offset fields
         log("==========================> Storing curves <============================")
@@ -642,27 +1257,16 @@ class GRAPH_OT_SimplifyMultipleCurves(bpy.types.Operator):
         if not check_fcurves_data(self, fcurves_data):
             return {'CANCELLED'}
 
-        normalize = context.scene.simplify_fcurves_normalize
-        if normalize:
-            log("==========================> NORMALIZATION <============================")
-            before = time.time()
-            normalized_fcurves_data = normalizeCurvesInfo(fcurves_data)
-            after = time.time()
-            elapsed = after-before
-            log("Normalization time (secs): "+str(elapsed))
-            log("========================================================================")
-
-        # Variable to store the maximum offset among all curves
+        # Normalization (if requested), and the maximum offset among all curves
         # Needed to control the simplification as percentage
+        log("==========================> NORMALIZATION <============================")
         before = time.time()
-        if normalize:
-            fcurves_max_offset = get_max_offset(normalized_fcurves_data)
-        else:
-            fcurves_max_offset = get_max_offset(fcurves_data)
+        simplify_data, curves_array, fcurves_max_offset = prepare_simplification(fcurves_data, context.scene.simplify_fcurves_normalize)
         after = time.time()
         elapsed = after-before
-        log("Computation of max offset time (secs): "+str(elapsed))
+        log("Normalization and max offset time (secs): "+str(elapsed))
         log("Max Error among curves=" + str(fcurves_max_offset))
+        log("========================================================================")
 
         error_pct = context.scene.simplify_fcurves_error
         log("Simplification Error Pct = " + str(error_pct))
@@ -671,19 +1275,25 @@ class GRAPH_OT_SimplifyMultipleCurves(bpy.types.Operator):
 
         log("*"*20)
         before = time.time()
-        if normalize:
-            kept_indices = simplify_curves(curves_data=normalized_fcurves_data, n_frames=fcurves_max_keyframes, error=err)
-        else:
-            kept_indices = simplify_curves(curves_data=fcurves_data, n_frames=fcurves_max_keyframes, error=err)
+        kept_indices = simplify_curves(curves_data=simplify_data, n_frames=fcurves_max_keyframes, error=err, curves_array=curves_array)
         after = time.time()
         elapsed = after-before
         log("Simplification time (secs): "+str(elapsed))
         log("*"*20)
 
+        handles = None
+        if context.scene.simplify_fcurves_fit_handles:
+            before = time.time()
+            handles = fit_bezier_handles(curves_data=fcurves_data, indices_to_keep=kept_indices)
+            after = time.time()
+            elapsed = after-before
+            log("Handles fitting time (secs): "+str(elapsed))
+
         log("+"*20)
         # def apply_simplification(selected_curves, sframe, eframe, curves_data, indices_to_keep):
         before = time.time()        
-        apply_simplification(selected_curves=selected_fcurves, sframe=sframe, eframe=eframe, curves_data=fcurves_data, indices_to_keep=kept_indices)
+        apply_simplification(selected_curves=selected_fcurves, sframe=sframe, eframe=eframe, curves_data=fcurves_data, indices_to_keep=kept_indices,
+                             handles=handles)
         after = time.time()
         elapsed = after-before
         log("Reconstruction time (secs): "+str(elapsed))
@@ -717,6 +1327,10 @@ class GRAPH_OT_SimplifyMultipleCurvesKF(bpy.types.Operator):
         print_curves_info(selected_fcurves)
         log("*"*20)
 
+        if context.scene.simplify_fcurves_groups != 'NONE':
+            return simplify_by_groups(self, context, selected_fcurves, sframe, eframe,
+                                      max_keyframes=context.scene.simplify_fcurves_max_keyframes)
+
         #
         # fill the fcurves_data and fcurves_max_offset fields
         log("==========================> Storing curves <============================")
@@ -736,89 +1350,171 @@ class GRAPH_OT_SimplifyMultipleCurvesKF(bpy.types.Operator):
             # TODO -- insert maybe a report?
             return {'CANCELLED'}
 
-        normalize = context.scene.simplify_fcurves_normalize
-        if normalize:
-            log("==========================> NORMALIZATION <============================")
-            before = time.time()
-            normalized_fcurves_data = normalizeCurvesInfo(fcurves_data)
-            after = time.time()
-            elapsed = after-before
-            log("Normalization time (secs): "+str(elapsed))
-            log("========================================================================")
-
-        # Variable to store the maximum offset among all curves
+        # Normalization (if requested), and the maximum offset among all curves
         # Needed to control the simplification as percentage
+        log("==========================> NORMALIZATION <============================")
         before = time.time()
-        if normalize:
-            fcurves_max_offset = get_max_offset(normalized_fcurves_data)
-        else:
-            fcurves_max_offset = get_max_offset(fcurves_data)
+        simplify_data, curves_array, fcurves_max_offset = prepare_simplification(fcurves_data, context.scene.simplify_fcurves_normalize)
         after = time.time()
         elapsed = after-before
-        log("Computation of max offset time (secs): "+str(elapsed))
+        log("Normalization and max offset time (secs): "+str(elapsed))
         log("Max Error among curves=" + str(fcurves_max_offset))
+        log("========================================================================")
 
         maxkf = context.scene.simplify_fcurves_max_keyframes
         log("Trying to simplify for max #KF " + str(maxkf))
 
-        # The relative precision to use to keep on trying to optimize the search
-        relativePrecision = 0.001
-
-        # The refinement algorithm will stop if the difference in error value between two cycles is less then this value.
-        precision = relativePrecision * fcurves_max_offset
-        log("Precision " + str(precision))
-
-        minErr = 0
-        maxErr = fcurves_max_offset
-        err = minErr
-
-        # We will cycle trying to simplify curves using a crescent error.
-        # an error to maxErr is the safest choice, because with only 2 KF you are surely satisfying the constraint.
-        # an error of 0 is the safest choice to preserve all KF when the KF constraint is higher than the actual number of KFs
-        # In other words. max error is safer, min error is desirable
-        # We start attempting a search at error 0 (max Keyframes), but then move to max error if the 
-        kept_indices = []
-        done = False
-        while not done:
-            log("Trying simplification with error " + str(err))
-
-            if normalize:
-                kept_indices = simplify_curves(curves_data=normalized_fcurves_data, n_frames=fcurves_max_keyframes, error=err)
-            else:
-                kept_indices = simplify_curves(curves_data=fcurves_data, n_frames=fcurves_max_keyframes, error=err)
-            n = len(kept_indices)
-
-            log("--> " + str(n) + " KFs")
-            if n > maxkf:  # we have to increase the error to have less keyframes
-                minErr = err
-            else:               # we can decrease the error to increment the keyframes
-                maxErr = err
-
-            new_err = minErr + ((maxErr - minErr) / 2.0)
-            delta = abs(new_err - err)
-            log("Min/Max " + str(minErr) + " / " + str(maxErr) + ", New_err " + str(new_err) + ", delta " + str(delta))
-            err = new_err            
-            
-            if delta <= precision:
-                # if during the last computation we were exceeding the n of keyframes,
-                # then set the error back in a safe zone
-                if n > maxkf:
-                    err = maxErr
-                    if normalize:
-                        kept_indices = simplify_curves(curves_data=normalized_fcurves_data, n_frames=fcurves_max_keyframes, error=err)
-                    else:
-                        kept_indices = simplify_curves(curves_data=fcurves_data, n_frames=fcurves_max_keyframes, error=err)
-                done = True
-                
-        log("Final err " + str(err))
+        # Build the split hierarchy once, then take the indices with the highest keep errors.
+        # No need to search the error by re-running the simplification.
+        before = time.time()
+        hierarchy = SimplificationHierarchy(curves_data=simplify_data, n_frames=fcurves_max_keyframes, curves_array=curves_array)
+        after = time.time()
+        elapsed = after-before
+        log("Hierarchy building time (secs): "+str(elapsed))
+
+        err = hierarchy.error_for_max_keyframes(maxkf)
+        kept_indices = hierarchy.indices_for_error(err)
+        log("Final err " + str(err) + " --> " + str(len(kept_indices)) + " KFs")
+
+        handles = None
+        if context.scene.simplify_fcurves_fit_handles:
+            handles = fit_bezier_handles(curves_data=fcurves_data, indices_to_keep=kept_indices)
 
         # def apply_simplification(selected_curves, sframe, eframe, curves_data, indices_to_keep):
         apply_simplification(selected_curves=selected_fcurves, sframe=sframe, eframe=eframe,
-                             curves_data=fcurves_data, indices_to_keep=kept_indices)
+                             curves_data=fcurves_data, indices_to_keep=kept_indices, handles=handles)
 
         return {'FINISHED'}
 
 
+#########################################################################
+# ANIMATION CURVES OPERATOR: PREVIEW
+#########################################################################
+class SimplificationPreview:
+    """Keeps the SimplificationHierarchy of the last previewed selection.
+    While it matches the current selection, the panel can show instantly how many keyframes each slider value would keep.
+    The panel compares only the cheap selection_signature() at each redraw. The keyframe values are checked by values_checksum(),
+    computed by the preview operator, and again only after preview_update_handler() has seen an update of the action.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.signature = None
+        self.checksum = None
+        self.action_name = None
+        # Set by check_action_update() when Blender reports an update of the previewed action
+        self.maybe_edited = False
+        self.hierarchy = None
+        self.max_offset = 0.0
+
+    @staticmethod
+    def selected_fcurves(context):
+        obj = context.active_object
+        return [fc for fc in obj.animation_data.action.fcurves if fc.select]
+
+    @staticmethod
+    def selection_signature(context):
+        """A cheap description of the selection. It changes when the curves, their number of keyframes, the range, the normalization,
+        or the grouping change. Returns None if there is no selection."""
+        if not poll_for_fcurves(context):
+            return None
+        selected_fcurves = SimplificationPreview.selected_fcurves(context)
+        sframe, eframe = get_selected_range(selected_fcurves)
+        curves = tuple((fc.data_path, fc.array_index, len(fc.keyframe_points)) for fc in selected_fcurves)
+        return (context.active_object.name, sframe, eframe, context.scene.simplify_fcurves_normalize, context.scene.simplify_fcurves_groups,
+                curves)
+
+    @staticmethod
+    def values_checksum(context):
+        """A hash of the keyframe coordinates of the selected curves, read at once with foreach_get. It changes when the keyframes are edited."""
+        checksums = []
+        for fcurve in SimplificationPreview.selected_fcurves(context):
+            kframes = fcurve.keyframe_points
+            co = array.array('f', bytes(len(kframes) * 2 * 4))
+            kframes.foreach_get("co", co)
+            checksums.append(co.tobytes())
+        return hash(tuple(checksums))
+
+    def store(self, context, hierarchy, max_offset):
+        self.signature = self.selection_signature(context)
+        self.checksum = self.values_checksum(context)
+        self.action_name = context.active_object.animation_data.action.name
+        self.maybe_edited = False
+        self.hierarchy = hierarchy
+        self.max_offset = max_offset
+
+    def lookup(self, context):
+        """Returns the hierarchy if it is still valid for the current selection, otherwise None."""
+        if self.hierarchy is None:
+            return None
+        # The hierarchy is built on all the curves together, while the operators simplify each group separately
+        if context.scene.simplify_fcurves_groups != 'NONE':
+            return None
+        signature = self.selection_signature(context)
+        if signature is None or signature != self.signature:
+            return None
+        if self.maybe_edited:
+            self.maybe_edited = False
+            if self.values_checksum(context) != self.checksum:
+                self.hierarchy = None
+                return None
+        return self.hierarchy
+
+    def check_action_update(self):
+        """Marks the preview when Blender reports an update of its action, e.g., by editing its keyframes."""
+        if self.hierarchy is None or not bpy.data.actions.is_updated:
+            return
+        action = bpy.data.actions.get(self.action_name)
+        if action is not None and action.is_updated:
+            self.maybe_edited = True
+
+
+preview_cache = SimplificationPreview()
+
+
+@persistent
+def preview_update_handler(scene):
+    preview_cache.check_action_update()
+
+
+@persistent
+def preview_load_handler(dummy):
+    preview_cache.clear()
+
+
+class GRAPH_OT_SimplifyMultipleCurvesPreview(bpy.types.Operator):
+    """Analyzes the selected curves once, so that the panel can preview the number of keyframes kept by each slider value."""
+
+    bl_idname = "graph.simplify_multiple_curves_preview"
+    bl_label = "Preview Simplification"
+    bl_description = "Analyze the selected FCurves to preview the number of keyframes kept by the simplification"
+    bl_space_type = "GRAPH_EDITOR"
+    bl_region_type = 'UI'
+
+    @classmethod
+    def poll(cls, context):
+        return poll_for_fcurves(context)
+
+    def execute(self, context):
+        selected_fcurves, sframe, eframe = get_selected_fcurves(context)
+        fcurves_data, fcurves_max_keyframes = scanCurvesInfo(fcurves=selected_fcurves, sframe=sframe, eframe=eframe)
+        if not check_fcurves_data(self, fcurves_data):
+            return {'CANCELLED'}
+
+        simplify_data, curves_array, max_offset = prepare_simplification(fcurves_data, context.scene.simplify_fcurves_normalize)
+
+        before = time.time()
+        hierarchy = SimplificationHierarchy(curves_data=simplify_data, n_frames=fcurves_max_keyframes, curves_array=curves_array)
+        after = time.time()
+        elapsed = after-before
+        log("Hierarchy building time (secs): "+str(elapsed))
+
+        preview_cache.store(context, hierarchy, max_offset)
+        return {'FINISHED'}
+
+
 #################################################
 # ANIMATION CURVES PANEL
 #################################################
@@ -839,16 +1535,38 @@ class GRAPH_OT_SimplifyMultipleCurvesPanel(bpy.types.Panel):
                     n_selected_curves = sum([1 if c.select else 0 for c in action.fcurves])
         self.layout.label("# selected curves: "+str(n_selected_curves))
 
+        # Instant preview, if the selection was analyzed
+        hierarchy = preview_cache.lookup(context)
+
         self.layout.label("Simplify by Max Keyframes:")
         self.layout.prop(context.scene, "simplify_fcurves_max_keyframes")
+        if hierarchy is not None:
+            err = hierarchy.error_for_max_keyframes(context.scene.simplify_fcurves_max_keyframes)
+            err_pct = 0.0
+            if preview_cache.max_offset > 0:
+                err_pct = 100.0 * err / preview_cache.max_offset
+            self.layout.label("Preview: " + str(hierarchy.count_for_error(err)) + " of " + str(hierarchy.n_frames)
+                              + " KFs (error %.2f%%)" % err_pct)
         self.layout.operator("graph.simplify_multiple_curves_kf", text='Simplify')
         self.layout.separator()
         self.layout.label("Simplify by Error:")
         self.layout.prop(context.scene, "simplify_fcurves_error")
+        if hierarchy is not None:
+            err = preview_cache.max_offset * context.scene.simplify_fcurves_error / 100.0
+            self.layout.label("Preview: " + str(hierarchy.count_for_error(err)) + " of " + str(hierarchy.n_frames) + " KFs")
         self.layout.operator("graph.simplify_multiple_curves", text="Simplify")
         self.layout.separator()
+        row = self.layout.row()
+        row.enabled = context.scene.simplify_fcurves_groups == 'NONE'
+        row.operator("graph.simplify_multiple_curves_preview", text="Update Preview")
+        self.layout.separator()
         self.layout.label("Options:")
         self.layout.prop(context.scene, "simplify_fcurves_normalize")
+        self.layout.prop(context.scene, "simplify_fcurves_fit_handles")
+        self.layout.prop(context.scene, "simplify_fcurves_groups")
+        row = self.layout.row()
+        row.enabled = context.scene.simplify_fcurves_groups != 'NONE'
+        row.prop(context.scene, "simplify_fcurves_multiprocess")
         self.layout.separator()
         self.layout.label("Tools:")
         self.layout.operator("graph.deselect_fcurves")
@@ -880,17 +1598,44 @@ def register():
                                description="If True, the curves are normalized in the range 0-1 before performing the simplification."
                                            "In this way, curves with bigger amplitudes do not _eat_ the small ones.")
 
+    bpy.types.Scene.simplify_fcurves_fit_handles =\
+        bpy.props.BoolProperty(name="Fit Handles", default=False,
+                               description="If True, the Bézier handles of the retained keyframes are fitted to the original curves,"
+                                           " so that a higher error keeps the shape with fewer keyframes.")
+
+    bpy.types.Scene.simplify_fcurves_groups =\
+        bpy.props.EnumProperty(name="Groups", default='NONE',
+                               description="Simplify independent groups of curves. The keyframes are aligned only within each group.",
+                               items=[('NONE', "All curves", "The keyframes of all the selected curves are aligned"),
+                                      ('BONE', "Per bone", "Each bone is simplified independently"),
+                                      ('BODY_PART', "Per body part", "Each MakeHuman body part (arms, hands, legs, head, face, body)"
+                                                                     " is simplified independently. Other bones form a group each.")])
+
+    bpy.types.Scene.simplify_fcurves_multiprocess =\
+        bpy.props.BoolProperty(name="Multiprocess", default=False,
+                               description="If True, the groups are simplified in parallel by multiple processes (requires NumPy)."
+                                           " Used only for large selections, where it is faster than the serial simplification.")
+
     # TODO -- insert a property to switch console output
 
     bpy.utils.register_class(GRAPH_OT_DeselectFCurves)
     bpy.utils.register_class(GRAPH_OT_SimplifyMultipleCurves)
     bpy.utils.register_class(GRAPH_OT_SimplifyMultipleCurvesKF)
+    bpy.utils.register_class(GRAPH_OT_SimplifyMultipleCurvesPreview)
     bpy.utils.register_class(GRAPH_OT_SimplifyMultipleCurvesPanel)
 
+    bpy.app.handlers.scene_update_post.append(preview_update_handler)
+    bpy.app.handlers.load_post.append(preview_load_handler)
+
 
 def unregister():
     log("Unregistering Simplify Multiple F-Curves classes...")
+    bpy.app.handlers.scene_update_post.remove(preview_update_handler)
+    bpy.app.handlers.load_post.remove(preview_load_handler)
+    preview_cache.clear()
+
     bpy.utils.unregister_class(GRAPH_OT_SimplifyMultipleCurvesPanel)
+    bpy.utils.unregister_class(GRAPH_OT_SimplifyMultipleCurvesPreview)
     bpy.utils.unregister_class(GRAPH_OT_SimplifyMultipleCurvesKF)
     bpy.utils.unregister_class(GRAPH_OT_SimplifyMultipleCurves)
     bpy.utils.unregister_class(GRAPH_OT_DeselectFCurves)
@@ -898,6 +1643,9 @@ def unregister():
     del bpy.context.scene.simplify_fcurves_error
     del bpy.context.scene.simplify_fcurves_max_keyframes
     del bpy.context.scene.simplify_fcurves_normalize
+    del bpy.context.scene.simplify_fcurves_fit_handles
+    del bpy.context.scene.simplify_fcurves_groups
+    del bpy.context.scene.simplify_fcurves_multiprocess
 
 
 if __name__ == "__main__":
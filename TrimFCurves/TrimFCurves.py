@@ -32,6 +32,59 @@ Trim F-Curves is a Blender addon to trim F-Curves by deleting keyframes outside
 
 import bpy
 
+import bisect
+import time
+
+
+# Keyframe properties copied when the kept keyframes are shifted to the beginning of the curve.
+# The float and boolean ones are copied in bulk, the enums one keyframe at a time.
+KEYFRAME_BULK_PROPERTIES = [("co", 2, 0.0), ("handle_left", 2, 0.0), ("handle_right", 2, 0.0),
+                            ("select_control_point", 1, False), ("select_left_handle", 1, False), ("select_right_handle", 1, False)]
+KEYFRAME_ENUM_PROPERTIES = ["interpolation", "handle_left_type", "handle_right_type"]
+
+
+def trim_fcurve(fcurve, sframe, eframe):
+    """Deletes the keyframes of the fcurve outside the range [sframe,eframe]. Returns the number of deleted keyframes.
+    The keyframes are sorted by time: the range of the kept keyframes is found by bisection.
+    If keyframes are deleted at the beginning, the kept ones are shifted to the beginning of the curve in bulk (foreach_get/foreach_set).
+    The exceeding keyframes are then removed from the end, so that no keyframe is moved by the removal.
+    """
+    keyframes = fcurve.keyframe_points
+    n_keyframes = len(keyframes)
+
+    co = [0.0] * (n_keyframes * 2)
+    keyframes.foreach_get("co", co)
+    times = co[0::2]
+    first = bisect.bisect_left(times, sframe)
+    last = bisect.bisect_right(times, eframe)
+    n_kept = last - first
+
+    if(n_kept == n_keyframes):
+        return 0
+
+    if(first > 0 and n_kept > 0):
+        # Enums can't be set in bulk. They are copied before the handles, so that the handles are not recomputed for the old types.
+        # Recorded curves have mostly the same types everywhere: only the differing ones are written.
+        for prop in KEYFRAME_ENUM_PROPERTIES:
+            values = [getattr(keyframes[i], prop) for i in range(last)]
+            for i in range(n_kept):
+                if(values[first + i] != values[i]):
+                    setattr(keyframes[i], prop, values[first + i])
+
+        for prop, size, default in KEYFRAME_BULK_PROPERTIES:
+            if(prop == "co"):
+                values = co
+            else:
+                values = [default] * (n_keyframes * size)
+                keyframes.foreach_get(prop, values)
+            keyframes.foreach_set(prop, values[first * size:last * size] + values[n_kept * size:])
+
+    for i in range(n_keyframes - 1, n_kept - 1, -1):
+        keyframes.remove(keyframes[i], fast=True)
+
+    fcurve.update()
+    return n_keyframes - n_kept
+
 #########################################################################
 #### OPERATOR: TRIM FCURVES                            ##################
 #########################################################################
@@ -84,21 +137,13 @@ class TrimFCurves(bpy.types.Operator):
             eframe = scene.frame_end
             
         #
-        # Cycle to delete outside keyframes, for each curve
+        # Delete outside keyframes, for each curve
+        start_time = time.time()
+        n_removed = 0
         for fcurve in selected_fcurves:
-            i = 0
-            keyframes = fcurve.keyframe_points
-            # Run through the keyframes, and delete the ones outside the range.
-            while(i < len(keyframes)):
-                kf = keyframes[i]
-                frame = kf.co[0]
-                if(frame < sframe or frame > eframe):
-                    # delete the keyframe and keep the index at this position
-                    #print("Removing keyframe at position " + str(frame))
-                    keyframes.remove(kf)
-                else:
-                    # else advance in the keyframes vector
-                    i += 1
+            n_removed += trim_fcurve(fcurve, sframe, eframe)
+
+        print("Trimmed " + str(len(selected_fcurves)) + " curves: removed " + str(n_removed) + " keyframes in " + str(time.time() - start_time) + " secs")
 
         return {'FINISHED'}
     